@@ -1,4 +1,7 @@
+from django import forms
 from django.contrib import admin
+from django.core.exceptions import ValidationError
+
 from .models import (
     Train,
     TrainType,
@@ -7,15 +10,206 @@ from .models import (
     Ticket,
     Order,
     Route,
-    Station
+    Station,
+    Tariff,
+    FareBand,
+    Schedule,
+    ScheduleException,
+    ArchivedJourney,
+    ArchivedTicket,
 )
+from .inventory import check_capacity
+from .pagination import EstimatedCountPaginator
+from .scheduling import crew_conflicts
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """Changelist that never runs an exact COUNT(*) over the whole table"""
+
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    list_per_page = 50
+
+
+@admin.register(Station)
+class StationAdmin(admin.ModelAdmin):
+    list_display = ("name", "latitude", "longitude")
+    search_fields = ("name",)
+    ordering = ("name",)
+
+
+@admin.register(Route)
+class RouteAdmin(admin.ModelAdmin):
+    list_display = ("id", "source", "destination")
+    list_select_related = ("source", "destination")
+    autocomplete_fields = ("source", "destination")
+    search_fields = ("source__name", "destination__name")
+
+
+@admin.register(TrainType)
+class TrainTypeAdmin(admin.ModelAdmin):
+    search_fields = ("name",)
+
+
+@admin.register(Train)
+class TrainAdmin(admin.ModelAdmin):
+    class TrainForm(forms.ModelForm):
+        def clean(self):
+            """Reject shrinking the train below the tickets sold"""
+            cleaned_data = super().clean()
+            cargo_num = cleaned_data.get("cargo_num")
+            places_in_cargo = cleaned_data.get("places_in_cargo")
+            if cargo_num is not None and places_in_cargo is not None:
+                check_capacity(self.instance, cargo_num, places_in_cargo)
+            return cleaned_data
+
+    form = TrainForm
+    list_display = ("name", "train_type", "cargo_num", "places_in_cargo")
+    list_select_related = ("train_type",)
+    list_filter = ("train_type",)
+    autocomplete_fields = ("train_type",)
+    search_fields = ("name",)
+
+
+@admin.register(Crew)
+class CrewAdmin(admin.ModelAdmin):
+    list_display = ("first_name", "last_name")
+    search_fields = ("first_name", "last_name")
+
+
+@admin.register(Journey)
+class JourneyAdmin(LargeTableAdmin):
+    class JourneyForm(forms.ModelForm):
+        def clean(self):
+            """Reject crew members busy on an overlapping journey"""
+            cleaned_data = super().clean()
+            crew = cleaned_data.get("crew")
+            departure_time = cleaned_data.get("departure_time")
+            arrival_time = cleaned_data.get("arrival_time")
+            if not crew or departure_time is None or arrival_time is None:
+                return cleaned_data
+
+            conflicts = crew_conflicts(
+                [member.id for member in crew],
+                departure_time,
+                arrival_time,
+                self.instance.pk,
+            )
+            if conflicts:
+                raise ValidationError(
+                    {
+                        "crew": [
+                            f"Crew member {crew_id} is already assigned "
+                            f"to journey {journey_id}."
+                            for crew_id, journey_id in conflicts
+                        ]
+                    }
+                )
+            return cleaned_data
+
+    form = JourneyForm
+    list_display = (
+        "id",
+        "train",
+        "route",
+        "departure_time",
+        "arrival_time",
+        "tickets_sold",
+        "capacity",
+    )
+    list_select_related = ("train", "route__source", "route__destination")
+    # indexed by journey_train_departure_idx; a route filter would render
+    # every route with two station lookups each
+    list_filter = ("train",)
+    date_hierarchy = "departure_time"
+    autocomplete_fields = ("route", "train", "crew")
+    raw_id_fields = ("schedule",)
+    readonly_fields = ("capacity", "tickets_sold")
+
+
+@admin.register(Order)
+class OrderAdmin(LargeTableAdmin):
+    class TicketInline(admin.TabularInline):
+        model = Ticket
+        raw_id_fields = ("journey",)
+        extra = 0
+
+    list_display = ("id", "user", "created_at")
+    list_select_related = ("user",)
+    raw_id_fields = ("user",)
+    search_fields = ("=user__email",)
+    ordering = ("-id",)
+    inlines = (TicketInline,)
+
+
+@admin.register(Ticket)
+class TicketAdmin(LargeTableAdmin):
+    list_display = ("id", "journey", "order", "cargo", "seat", "price")
+    list_select_related = ("journey__train", "order")
+    raw_id_fields = ("journey", "order")
+    # the model's ordering goes through the journey's and joins the train
+    ordering = ("-id",)
+
+
+@admin.register(Tariff)
+class TariffAdmin(admin.ModelAdmin):
+    list_display = (
+        "__str__",
+        "base_fare",
+        "price_per_km",
+        "first_class_multiplier",
+    )
+    list_select_related = ("train_type",)
+
+
+@admin.register(FareBand)
+class FareBandAdmin(admin.ModelAdmin):
+    list_display = ("name", "start_time", "end_time", "multiplier")
+
+
+@admin.register(Schedule)
+class ScheduleAdmin(admin.ModelAdmin):
+    class ExceptionInline(admin.TabularInline):
+        model = ScheduleException
+        extra = 0
+
+    list_display = (
+        "__str__",
+        "route",
+        "valid_from",
+        "valid_until",
+    )
+    list_select_related = ("train", "route__source", "route__destination")
+    list_filter = ("train",)
+    autocomplete_fields = ("route", "train")
+    inlines = (ExceptionInline,)
+
+
+@admin.register(ScheduleException)
+class ScheduleExceptionAdmin(admin.ModelAdmin):
+    list_display = ("schedule", "date")
+    list_select_related = ("schedule__train",)
+    raw_id_fields = ("schedule",)
+
+
+@admin.register(ArchivedJourney)
+class ArchivedJourneyAdmin(LargeTableAdmin):
+    list_display = (
+        "id",
+        "train",
+        "route",
+        "departure_time",
+        "tickets_sold",
+        "archived_at",
+    )
+    list_select_related = ("train", "route__source", "route__destination")
+    raw_id_fields = ("route", "train", "schedule", "crew")
+    ordering = ("-id",)
 
 
-admin.site.register(Train)
-admin.site.register(TrainType)
-admin.site.register(Journey)
-admin.site.register(Crew)
-admin.site.register(Ticket)
-admin.site.register(Order)
-admin.site.register(Route)
-admin.site.register(Station)
+@admin.register(ArchivedTicket)
+class ArchivedTicketAdmin(LargeTableAdmin):
+    list_display = ("id", "journey", "order", "cargo", "seat", "price")
+    list_select_related = ("journey__train", "order")
+    raw_id_fields = ("journey", "order")
+    ordering = ("-id",)
@@ -0,0 +1,138 @@
+"""
+Automatic seat allocation for group bookings.
+
+Each cargo's taken seats are an integer bitmap (bit ``seat - 1``), so its
+free seats split into runs with a few bit operations per run. A group
+asking to sit together gets the smallest free run that still fits it
+(best fit), which keeps long runs for larger groups; if no single run is
+long enough, the group is spread over the longest runs instead. Other
+groups take the lowest free seats.
+"""
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+
+from . import rollups
+from .models import Journey, Order, Ticket
+
+
+ATTEMPTS = 3
+MAX_GROUP_SIZE = 50
+
+
+class AllocationError(Exception):
+    pass
+
+
+def taken_bitmaps(journey):
+    """``{cargo: bitmap}`` of taken seats for every cargo of the train"""
+    bitmaps = dict.fromkeys(range(1, journey.train.cargo_num + 1), 0)
+    # tickets left in cargos the train no longer has block nothing
+    tickets = Ticket.objects.filter(
+        journey=journey,
+        cargo__range=(1, journey.train.cargo_num),
+        seat__gte=1,
+    ).values_list("cargo", "seat")
+    for cargo, seat in tickets:
+        bitmaps[cargo] |= 1 << (seat - 1)
+    return bitmaps
+
+
+def free_runs(taken, places):
+    """``(first_seat, length)`` of each run of free seats, in seat order"""
+    free = ~taken & ((1 << places) - 1)
+    runs = []
+    while free:
+        start = (free & -free).bit_length() - 1
+        shifted = free >> start
+        length = (shifted ^ (shifted + 1)).bit_length() - 1
+        runs.append((start + 1, length))
+        free &= ~(((1 << length) - 1) << start)
+    return runs
+
+
+def choose_seats(bitmaps, places, count, together=True):
+    """
+    ``(seats, contiguous)`` where seats are ``(cargo, seat)`` pairs.
+
+    Raises ``AllocationError`` when fewer than ``count`` seats are free.
+    """
+    runs = [
+        (length, cargo, start)
+        for cargo, taken in sorted(bitmaps.items())
+        for start, length in free_runs(taken, places)
+    ]
+    free = sum(length for length, _, _ in runs)
+    if free < count:
+        raise AllocationError(f"Only {free} free seats left.")
+
+    if together:
+        fitting = [run for run in runs if run[0] >= count]
+        if fitting:
+            _, cargo, start = min(fitting)
+            seats = [(cargo, seat) for seat in range(start, start + count)]
+            return seats, True
+        runs.sort(key=lambda run: (-run[0], run[1], run[2]))
+    else:
+        runs.sort(key=lambda run: (run[1], run[2]))
+
+    seats = []
+    for length, cargo, start in runs:
+        take = min(length, count - len(seats))
+        seats.extend((cargo, seat) for seat in range(start, start + take))
+        if len(seats) == count:
+            break
+    return seats, is_contiguous(seats)
+
+
+def is_contiguous(seats):
+    first_cargo, first_seat = seats[0]
+    return all(
+        cargo == first_cargo and seat == first_seat + i
+        for i, (cargo, seat) in enumerate(seats)
+    )
+
+
+def allocate(journey_id, user, count, together=True, cargo_class=None):
+    """
+    Book ``count`` free seats on the journey in one new order.
+
+    The journey row is locked while seats are chosen, so concurrent
+    allocations queue up; a clash with a single ticket booked in the
+    meantime is retried with a fresh seat map, and reported as
+    ``AllocationError`` once the attempts run out.
+    """
+    for attempt in range(ATTEMPTS):
+        try:
+            with transaction.atomic():
+                journey = (
+                    Journey.objects.select_for_update(of=("self",))
+                    .select_related("train")
+                    .get(pk=journey_id)
+                )
+                bitmaps = taken_bitmaps(journey)
+                if cargo_class is not None:
+                    bitmaps = {
+                        cargo: taken
+                        for cargo, taken in bitmaps.items()
+                        if journey.train.cargo_class(cargo) == cargo_class
+                    }
+                seats, contiguous = choose_seats(
+                    bitmaps, journey.train.places_in_cargo, count, together
+                )
+
+                order = Order.objects.create(user=user)
+                with rollups.batched():
+                    for cargo, seat in seats:
+                        Ticket(
+                            cargo=cargo,
+                            seat=seat,
+                            journey=journey,
+                            order=order,
+                        ).save()
+                return order, contiguous
+        except (IntegrityError, ValidationError):
+            # someone booked one of the chosen seats after we read them
+            if attempt == ATTEMPTS - 1:
+                raise AllocationError(
+                    "The seats keep being booked by others, try again."
+                )
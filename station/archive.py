@@ -0,0 +1,124 @@
+"""
+Archival of completed journeys.
+
+Journeys that arrived more than ``ARCHIVE_RETENTION_DAYS`` ago are moved,
+with their crew links and tickets, into ``ArchivedJourney`` and
+``ArchivedTicket``, so the hot tables (and the ticket seat index) only
+hold inventory that can still change. Rows keep their ids, and orders
+keep showing archived tickets next to live ones.
+
+Each batch is its own short transaction. Its journeys are locked with
+``SKIP LOCKED``, so a journey that is being booked is simply picked up
+by a later run. Deleting the moved rows is not a cancellation: while
+``archiving()`` is true, the signal receivers leave seat counters,
+rollups, outbox events and live seat streams alone.
+"""
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import ArchivedJourney, ArchivedTicket, Journey, Ticket
+from .scheduling import crew_changed
+
+
+DEFAULT_RETENTION_DAYS = 180
+BATCH_SIZE = 100
+JOURNEY_FIELDS = (
+    "id",
+    "route_id",
+    "train_id",
+    "departure_time",
+    "arrival_time",
+    "schedule_id",
+    "capacity",
+    "tickets_sold",
+)
+TICKET_FIELDS = ("id", "cargo", "seat", "journey_id", "order_id", "price")
+
+_archiving = ContextVar("station_archiving", default=False)
+
+
+def archiving():
+    """True while archived rows are being removed from the hot tables"""
+    return _archiving.get()
+
+
+@contextmanager
+def archiving_rows():
+    token = _archiving.set(True)
+    try:
+        yield
+    finally:
+        _archiving.reset(token)
+
+
+def retention_cutoff(days=None):
+    if days is None:
+        days = getattr(
+            settings, "ARCHIVE_RETENTION_DAYS", DEFAULT_RETENTION_DAYS
+        )
+    return timezone.now() - timedelta(days=days)
+
+
+def archivable(cutoff):
+    return Journey.objects.filter(arrival_time__lt=cutoff).order_by("id")
+
+
+def archive_batch(cutoff, batch_size=BATCH_SIZE):
+    """Move up to ``batch_size`` journeys, return how many were moved"""
+    with transaction.atomic():
+        journey_ids = list(
+            archivable(cutoff)
+            .select_for_update(skip_locked=True)
+            .values_list("id", flat=True)[:batch_size]
+        )
+        if not journey_ids:
+            return 0
+
+        ArchivedJourney.objects.bulk_create(
+            ArchivedJourney(**row)
+            for row in Journey.objects.filter(id__in=journey_ids).values(
+                *JOURNEY_FIELDS
+            )
+        )
+        assignments = list(
+            Journey.crew.through.objects.filter(
+                journey_id__in=journey_ids
+            ).values_list("journey_id", "crew_id")
+        )
+        ArchivedJourney.crew.through.objects.bulk_create(
+            ArchivedJourney.crew.through(
+                archivedjourney_id=journey_id, crew_id=crew_id
+            )
+            for journey_id, crew_id in assignments
+        )
+        tickets = Ticket.objects.filter(journey_id__in=journey_ids)
+        ArchivedTicket.objects.bulk_create(
+            (ArchivedTicket(**row) for row in tickets.values(*TICKET_FIELDS)),
+            batch_size=1000,
+        )
+
+        with archiving_rows():
+            Journey.objects.filter(id__in=journey_ids).delete()
+        if assignments:
+            crew_changed({crew_id for _, crew_id in assignments})
+        return len(journey_ids)
+
+
+def archive_journeys(cutoff, batch_size=BATCH_SIZE, pause=0, log=None):
+    """Archive every journey that arrived before ``cutoff``"""
+    total = 0
+    while True:
+        moved = archive_batch(cutoff, batch_size)
+        if not moved:
+            return total
+        total += moved
+        if log:
+            log(total)
+        if pause:
+            time.sleep(pause)
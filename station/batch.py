@@ -0,0 +1,179 @@
+"""
+Multi-get and batched reads.
+
+``?ids=1,2,3`` restricts any station list endpoint to those primary keys.
+``POST /batch/`` runs several GET sub-requests in one HTTP call: they
+reuse the batch request's authentication and skip per-view throttling
+(the batch itself is throttled once). A path listed twice is run once and
+its response repeated.
+
+Sub-requests also share an identity map keyed by model and primary key.
+Every object a detail view loads is added to it, with the related objects
+joined into the same query, so ``/journeys/1/`` followed by
+``/trains/3/`` reads train 3 once. An object is only reused by a view
+whose queryset has no filters that could have excluded it, that adds no
+annotations the object lacks and that would not have to load deferred
+fields.
+"""
+import copy
+import json
+from urllib.parse import urlsplit
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import models
+from django.http import QueryDict
+from django.urls import Resolver404, resolve
+from rest_framework.exceptions import ValidationError
+
+
+MAX_IDS = 100
+
+
+def parse_ids(value):
+    try:
+        ids = [int(part) for part in value.split(",") if part.strip()]
+    except ValueError:
+        raise ValidationError({"ids": "Expected comma separated integers."})
+
+    if len(ids) > MAX_IDS:
+        raise ValidationError({"ids": f"At most {MAX_IDS} ids are allowed."})
+    return ids
+
+
+class BatchState:
+    """Per-batch shared state handed to every sub-request"""
+
+    def __init__(self):
+        self.objects = {}
+        self.responses = {}
+
+    def remember(self, obj):
+        """Add ``obj`` and the related objects loaded with it to the map"""
+        key = (obj._meta.concrete_model, obj.pk)
+        if self.objects.get(key) is obj:
+            return
+        self.objects[key] = obj
+        for related in obj._state.fields_cache.values():
+            if isinstance(related, models.Model):
+                self.remember(related)
+
+    def lookup(self, queryset, pk):
+        """Object ``pk`` loaded earlier, if ``queryset`` returns it as is"""
+        try:
+            pk = queryset.model._meta.pk.to_python(pk)
+        except DjangoValidationError:
+            return None
+        obj = self.objects.get((queryset.model._meta.concrete_model, pk))
+        if (
+            obj is None
+            or queryset.query.where
+            or obj.get_deferred_fields()
+            or any(
+                name not in vars(obj) for name in queryset.query.annotations
+            )
+        ):
+            return None
+        return obj
+
+
+def batch_state(request):
+    return getattr(getattr(request, "_request", request), "_batch", None)
+
+
+class MultiGetMixin:
+    """Viewset mixin adding ``?ids=`` and batch sub-request support"""
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        ids = self.request.query_params.get("ids")
+        if ids and hasattr(queryset, "model"):
+            queryset = queryset.filter(pk__in=parse_ids(ids))
+        return queryset
+
+    def check_throttles(self, request):
+        if batch_state(request) is None:
+            super().check_throttles(request)
+
+    def get_object(self):
+        state = batch_state(self.request)
+        if state is None or self.lookup_field != "pk":
+            return super().get_object()
+
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        obj = state.lookup(
+            self.filter_queryset(self.get_queryset()),
+            self.kwargs[lookup_url_kwarg],
+        )
+        if obj is None:
+            obj = super().get_object()
+            state.remember(obj)
+        else:
+            self.check_object_permissions(self.request, obj)
+        return obj
+
+
+def _sub_request(request, path, query, state):
+    sub = copy.copy(request._request)
+    sub.method = "GET"
+    sub.path = sub.path_info = path
+    sub.GET = QueryDict(query)
+    sub.META = {
+        **request._request.META,
+        "REQUEST_METHOD": "GET",
+        "PATH_INFO": path,
+        "QUERY_STRING": query,
+    }
+    # bodies are decoded into the batch response, so never compress them
+    sub.META.pop("HTTP_ACCEPT_ENCODING", None)
+    sub._force_auth_user = request.user
+    sub._force_auth_token = request.auth
+    sub._batch = state
+    return sub
+
+
+def _response_body(response):
+    if hasattr(response, "data"):
+        return response.data
+    if response.streaming:
+        return json.loads(b"".join(response.streaming_content))
+    return json.loads(response.content) if response.content else None
+
+
+def run_batch(request, sub_requests, allowed_namespace, excluded_view):
+    """
+    Execute GET sub-requests and return their statuses and bodies.
+
+    ``sub_requests`` are dicts with a ``path``; identical paths are only
+    executed once per batch.
+    """
+    state = BatchState()
+    results = []
+    for sub_request in sub_requests:
+        url = sub_request["path"]
+        if url not in state.responses:
+            state.responses[url] = _run_one(
+                request, url, state, allowed_namespace, excluded_view
+            )
+        results.append(state.responses[url])
+
+    return results
+
+
+def _run_one(request, url, state, allowed_namespace, excluded_view):
+    parts = urlsplit(url)
+    try:
+        match = resolve(parts.path)
+    except Resolver404:
+        match = None
+
+    if (
+        match is None
+        or not hasattr(match.func, "cls")
+        or match.namespace != allowed_namespace
+        or match.url_name == excluded_view
+    ):
+        return {"status": 404, "body": {"detail": "Not found."}}
+
+    sub = _sub_request(request, parts.path, parts.query, state)
+    response = match.func(sub, *match.args, **match.kwargs)
+    return {"status": response.status_code, "body": _response_body(response)}
@@ -0,0 +1,168 @@
+"""
+Fare engine.
+
+A fare is ``(base_fare + distance * price_per_km) * class * band``, where
+the tariff comes from the train type (falling back to the default tariff),
+the class multiplier from the cargo class and the band multiplier from the
+departure time. Distances and tariffs are kept in a process-local fare
+table that is rebuilt when the ``fares`` stamp (see ``station.versions``)
+moves, i.e. after tariffs, bands, routes or stations change.
+"""
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.utils import timezone
+
+from . import versions
+from .models import Tariff, FareBand, Route
+
+
+CENT = Decimal("0.01")
+NAME = "fares"
+
+_fare_table = {}
+
+
+def invalidate_fare_table():
+    _fare_table.clear()
+
+
+def changed():
+    """Bump the stamp so every process drops its fare table"""
+    versions.bump(NAME)
+    invalidate_fare_table()
+
+
+def fare_table():
+    version = versions.current(NAME)
+    if _fare_table.get("version") != version:
+        _fare_table.clear()
+        _fare_table["version"] = version
+    return _fare_table
+
+
+def _tariffs():
+    table = fare_table()
+    if "tariffs" not in table:
+        table["tariffs"] = {
+            tariff.train_type_id: tariff for tariff in Tariff.objects.all()
+        }
+    return table["tariffs"]
+
+
+def _bands():
+    table = fare_table()
+    if "bands" not in table:
+        table["bands"] = list(FareBand.objects.all())
+    return table["bands"]
+
+
+def _distances(route_ids):
+    """Route distances in km, computing only the ones not yet cached"""
+    distances = fare_table().setdefault("distances", {})
+    missing = set(route_ids) - distances.keys()
+
+    if missing:
+        routes = Route.objects.filter(id__in=missing).select_related(
+            "source", "destination"
+        )
+        for route in routes:
+            distances[route.id] = Decimal(str(route.distance))
+
+    return distances
+
+
+def _base_fares(keys):
+    """Base (standard class, no band) fares by ``(route_id, train_type_id)``"""
+    base_fares = fare_table().setdefault("base_fares", {})
+    missing = {key for key in keys if key not in base_fares}
+
+    if missing:
+        tariffs = _tariffs()
+        distances = _distances(route_id for route_id, _ in missing)
+
+        for route_id, train_type_id in missing:
+            tariff = tariffs.get(train_type_id) or tariffs.get(None)
+            if tariff is None or route_id not in distances:
+                base_fares[route_id, train_type_id] = None
+                continue
+
+            base_fares[route_id, train_type_id] = (
+                tariff.base_fare + distances[route_id] * tariff.price_per_km
+            )
+
+    return base_fares
+
+
+def _band_multiplier(departure_time):
+    local_time = timezone.localtime(departure_time).time()
+    for band in _bands():
+        if band.covers(local_time):
+            return band.multiplier
+    return Decimal("1")
+
+
+def _class_multiplier(train_type_id, cargo_class):
+    if cargo_class != Tariff.FIRST_CLASS:
+        return Decimal("1")
+
+    tariffs = _tariffs()
+    tariff = tariffs.get(train_type_id) or tariffs.get(None)
+    return tariff.first_class_multiplier if tariff else Decimal("1")
+
+
+def _price(base_fare, journey, cargo_class):
+    if base_fare is None:
+        return None
+
+    price = (
+        base_fare
+        * _class_multiplier(journey.train.train_type_id, cargo_class)
+        * _band_multiplier(journey.departure_time)
+    )
+    return price.quantize(CENT, rounding=ROUND_HALF_UP)
+
+
+def quote_journeys(journeys, cargo_class=Tariff.STANDARD_CLASS):
+    """
+    Price every journey in one pass.
+
+    Journeys must have ``train`` loaded. Returns prices in the order of
+    ``journeys``; a price is ``None`` when no tariff applies.
+    """
+    journeys = list(journeys)
+    base_fares = _base_fares(
+        {
+            (journey.route_id, journey.train.train_type_id)
+            for journey in journeys
+        }
+    )
+
+    return [
+        _price(
+            base_fares[journey.route_id, journey.train.train_type_id],
+            journey,
+            cargo_class,
+        )
+        for journey in journeys
+    ]
+
+
+def quote_tickets(tickets):
+    """Set ``price`` on unsaved tickets according to their cargo class"""
+    tickets = list(tickets)
+    base_fares = _base_fares(
+        {
+            (ticket.journey.route_id, ticket.journey.train.train_type_id)
+            for ticket in tickets
+        }
+    )
+
+    for ticket in tickets:
+        journey = ticket.journey
+        ticket.price = _price(
+            base_fares[journey.route_id, journey.train.train_type_id],
+            journey,
+            journey.train.cargo_class(ticket.cargo),
+        )
+
+    return tickets
@@ -0,0 +1,131 @@
+"""
+Sparse fieldsets.
+
+``?fields=id,name`` keeps only the listed fields of a GET response and
+``?omit=image`` drops fields. The trimmed field set also shapes the query:
+model columns behind dropped fields are deferred, and joins, prefetches or
+annotations a viewset declares in ``field_querysets`` are only added when
+a field that needs them is rendered.
+"""
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import SAFE_METHODS
+
+
+def _param_names(value):
+    return {name.strip() for name in value.split(",") if name.strip()}
+
+
+def _model_path(model, source):
+    """``train.image`` -> ``train__image`` if it names a concrete column"""
+    parts = source.split(".")
+    for i, part in enumerate(parts):
+        try:
+            field = model._meta.get_field(part)
+        except FieldDoesNotExist:
+            return None
+
+        if not field.concrete or field.primary_key:
+            return None
+        if i == len(parts) - 1:
+            return None if field.is_relation else "__".join(parts)
+        if not field.many_to_one and not field.one_to_one:
+            return None
+        model = field.related_model
+
+    return None
+
+
+class SparseFieldsetMixin:
+    """Viewset mixin adding ``?fields=`` and ``?omit=`` to GET requests"""
+
+    # serializer field name -> callable(queryset) applied only when that
+    # field is rendered, e.g. an annotation the field reads
+    field_querysets = {}
+    # serializer field name -> model paths it reads besides its source
+    field_requires = {}
+    # model paths that are never deferred
+    required_paths = ()
+
+    def _all_field_names(self):
+        serializer_class = self.get_serializer_class()
+        return list(serializer_class().fields)
+
+    def sparse_fields(self):
+        """Names of the fields to render, or ``None`` to render all"""
+        if self.request is None or self.request.method not in SAFE_METHODS:
+            return None
+
+        if not hasattr(self, "_sparse_fields"):
+            fields = self.request.query_params.get("fields")
+            omit = self.request.query_params.get("omit")
+            self._sparse_fields = None
+
+            if fields or omit:
+                all_fields = self._all_field_names()
+                requested = _param_names(fields) if fields else set()
+                omitted = _param_names(omit) if omit else set()
+
+                unknown = (requested | omitted) - set(all_fields)
+                if unknown:
+                    raise ValidationError(
+                        {"fields": f"Unknown fields: {sorted(unknown)}"}
+                    )
+
+                self._sparse_fields = [
+                    name
+                    for name in all_fields
+                    if (not requested or name in requested)
+                    and name not in omitted
+                ]
+
+        return self._sparse_fields
+
+    def get_serializer(self, *args, **kwargs):
+        serializer = super().get_serializer(*args, **kwargs)
+        fields = self.sparse_fields()
+
+        if fields is not None:
+            target = getattr(serializer, "child", serializer)
+            for name in list(target.fields):
+                if name not in fields:
+                    target.fields.pop(name)
+
+        return serializer
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        if not hasattr(queryset, "model"):
+            return queryset
+
+        fields = self.sparse_fields()
+        if self.field_querysets:
+            rendered = set(
+                self._all_field_names() if fields is None else fields
+            )
+            for name, apply in self.field_querysets.items():
+                if name in rendered:
+                    queryset = apply(queryset)
+
+        if fields is not None:
+            queryset = queryset.defer(*self._deferred_paths(queryset, fields))
+
+        return queryset
+
+    def _deferred_paths(self, queryset, fields):
+        serializer_fields = self.get_serializer_class()().fields
+        needed = set(self.required_paths)
+        dropped = set()
+
+        for name in fields:
+            needed.update(self.field_requires.get(name, ()))
+
+        for name, field in serializer_fields.items():
+            if field.source == "*":
+                continue
+            path = _model_path(queryset.model, field.source)
+            if path is None:
+                continue
+            (needed if name in fields else dropped).add(path)
+
+        return dropped - needed
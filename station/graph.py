@@ -0,0 +1,156 @@
+"""
+Rail network graph.
+
+Stations are nodes and routes are directed edges weighted by the route's
+distance. The graph is kept in compressed sparse row form: the edges
+leaving station ``i`` are ``targets[offsets[i]:offsets[i + 1]]`` with the
+matching ``weights``, ``route_ids`` and ``sources`` (used to walk a path
+back), all flat ``array`` buffers.
+
+Shortest-path and reachability queries run Dijkstra once per source and
+keep the resulting tree (distance and incoming edge per node) in a small
+LRU, so repeated questions from the same station are answered without
+touching the database. The graph and its trees are process-local and are
+rebuilt when the ``graph`` stamp (see ``station.versions``) moves, i.e.
+after routes or stations change.
+"""
+import heapq
+from array import array
+from collections import OrderedDict
+
+from . import versions
+from .models import Route, Station
+
+
+MAX_TREES = 256
+UNREACHABLE = float("inf")
+NAME = "graph"
+
+_graph = None
+
+
+def invalidate_graph():
+    global _graph
+    _graph = None
+
+
+def changed():
+    """Bump the stamp so every process rebuilds its graph"""
+    versions.bump(NAME)
+    invalidate_graph()
+
+
+def get_graph():
+    global _graph
+
+    graph = _graph
+    version = versions.current(NAME)
+    if graph is None or graph.version != version:
+        graph = _graph = StationGraph.build()
+        graph.version = version
+    return graph
+
+
+class StationGraph:
+    def __init__(self, station_ids, edges):
+        """``edges`` are ``(source_id, destination_id, km, route_id)``"""
+        self.station_ids = array("q", sorted(station_ids))
+        self.index = {
+            station_id: i for i, station_id in enumerate(self.station_ids)
+        }
+
+        edges = sorted(
+            (self.index[source], self.index[destination], km, route_id)
+            for source, destination, km, route_id in edges
+            if source in self.index and destination in self.index
+        )
+        self.offsets = array("l", [0] * (len(self.station_ids) + 1))
+        self.sources = array("l")
+        self.targets = array("l")
+        self.weights = array("d")
+        self.route_ids = array("q")
+
+        for source, target, km, route_id in edges:
+            self.offsets[source + 1] += 1
+            self.sources.append(source)
+            self.targets.append(target)
+            self.weights.append(km)
+            self.route_ids.append(route_id)
+        for i in range(len(self.station_ids)):
+            self.offsets[i + 1] += self.offsets[i]
+
+        self._trees = OrderedDict()
+        self.version = None
+
+    @classmethod
+    def build(cls):
+        routes = Route.objects.select_related("source", "destination")
+        edges = (
+            (route.source_id, route.destination_id, route.distance, route.id)
+            for route in routes
+        )
+        return cls(Station.objects.values_list("id", flat=True), edges)
+
+    def __contains__(self, station_id):
+        return station_id in self.index
+
+    def tree(self, station_id):
+        """``(distances, edges)``: per node distance and incoming edge"""
+        source = self.index[station_id]
+        if source in self._trees:
+            self._trees.move_to_end(source)
+            return self._trees[source]
+
+        size = len(self.station_ids)
+        distances = array("d", [UNREACHABLE] * size)
+        edges = array("l", [-1] * size)
+        distances[source] = 0.0
+        heap = [(0.0, source)]
+
+        while heap:
+            distance, node = heapq.heappop(heap)
+            if distance > distances[node]:
+                continue
+            for edge in range(self.offsets[node], self.offsets[node + 1]):
+                target = self.targets[edge]
+                candidate = distance + self.weights[edge]
+                if candidate < distances[target]:
+                    distances[target] = candidate
+                    edges[target] = edge
+                    heapq.heappush(heap, (candidate, target))
+
+        tree = self._trees[source] = distances, edges
+        if len(self._trees) > MAX_TREES:
+            self._trees.popitem(last=False)
+        return tree
+
+    def shortest_path(self, source_id, target_id):
+        """``(km, station_ids, route_ids)`` or ``None`` if unreachable"""
+        distances, edges = self.tree(source_id)
+        target = self.index[target_id]
+        if distances[target] == UNREACHABLE:
+            return None
+
+        stations = [target]
+        routes = []
+        node = target
+        while edges[node] != -1:
+            edge = edges[node]
+            routes.append(self.route_ids[edge])
+            node = self.sources[edge]
+            stations.append(node)
+
+        return (
+            round(distances[target], 2),
+            [self.station_ids[node] for node in reversed(stations)],
+            routes[::-1],
+        )
+
+    def reachable(self, source_id):
+        """``{station_id: km}`` for every station reachable from source"""
+        distances, _ = self.tree(source_id)
+        return {
+            self.station_ids[node]: round(distance, 2)
+            for node, distance in enumerate(distances)
+            if distance != UNREACHABLE and self.station_ids[node] != source_id
+        }
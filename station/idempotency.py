@@ -0,0 +1,174 @@
+"""
+Idempotency keys for create endpoints.
+
+A client that sends an ``Idempotency-Key`` header gets the stored response
+of the first request with that key for as long as the key lives, instead of
+running the create again. A duplicate that arrives while the first request
+is still running waits for it and replays its response; a key left in
+flight for longer than ``IDEMPOTENCY_CLAIM_LEASE`` (its request crashed)
+is taken over by the next request with the same body.
+"""
+import hashlib
+import json
+import time
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.utils.encoders import JSONEncoder
+
+from .models import IdempotencyKey
+
+
+HEADER = "Idempotency-Key"
+POLL_INTERVAL = 0.05
+
+
+def fingerprint(request):
+    digest = hashlib.sha256()
+    digest.update(request.method.encode())
+    digest.update(request.path.encode())
+    digest.update(
+        json.dumps(request.data, sort_keys=True, cls=JSONEncoder).encode()
+    )
+    return digest.hexdigest()
+
+
+def claim(user, key, request_fingerprint):
+    """
+    Return ``(record, created)`` for the key.
+
+    ``created`` is true when this request owns the key and must run the
+    create; otherwise ``record`` belongs to an earlier request.
+    """
+    now = timezone.now()
+    record = IdempotencyKey.objects.filter(user=user, key=key).first()
+    if record is not None and record.expires_at <= now:
+        record.delete()
+        record = None
+
+    if record is not None:
+        if take_over(record, request_fingerprint, now):
+            return record, True
+        return record, False
+
+    try:
+        with transaction.atomic():
+            return (
+                IdempotencyKey.objects.create(
+                    user=user,
+                    key=key,
+                    fingerprint=request_fingerprint,
+                    expires_at=now + settings.IDEMPOTENCY_KEY_TTL,
+                ),
+                True,
+            )
+    except IntegrityError:
+        return IdempotencyKey.objects.get(user=user, key=key), False
+
+
+def take_over(record, request_fingerprint, now):
+    """
+    Claim an in-flight key whose request died without finishing.
+
+    The key is free again once its claim is older than
+    ``IDEMPOTENCY_CLAIM_LEASE``; of several retries racing for it, one wins.
+    """
+    if (
+        not record.in_flight
+        or record.fingerprint != request_fingerprint
+        or record.claimed_at > now - settings.IDEMPOTENCY_CLAIM_LEASE
+    ):
+        return False
+
+    taken = IdempotencyKey.objects.filter(
+        pk=record.pk, status_code__isnull=True, claimed_at=record.claimed_at
+    ).update(claimed_at=now)
+    record.claimed_at = now
+    return bool(taken)
+
+
+def wait_for(record, timeout):
+    deadline = time.monotonic() + timeout
+    while record.in_flight and time.monotonic() < deadline:
+        time.sleep(POLL_INTERVAL)
+        try:
+            record.refresh_from_db()
+        except IdempotencyKey.DoesNotExist:
+            return None
+    return record
+
+
+def purge_expired():
+    return IdempotencyKey.objects.filter(
+        expires_at__lte=timezone.now()
+    ).delete()[0]
+
+
+class IdempotentCreateMixin:
+    """Honour the ``Idempotency-Key`` header on ``create``"""
+
+    def create(self, request, *args, **kwargs):
+        key = request.headers.get(HEADER)
+        if not key or not request.user.is_authenticated:
+            return super().create(request, *args, **kwargs)
+
+        max_length = IdempotencyKey._meta.get_field("key").max_length
+        if len(key) > max_length:
+            return Response(
+                {
+                    "detail": f"{HEADER} must be at most {max_length} "
+                    f"characters long."
+                },
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        request_fingerprint = fingerprint(request)
+        record, created = claim(request.user, key, request_fingerprint)
+
+        if not created:
+            return self.replay(record, request_fingerprint)
+
+        try:
+            response = super().create(request, *args, **kwargs)
+        except Exception:
+            record.delete()
+            raise
+
+        if response.status_code >= 500:
+            record.delete()
+            return response
+
+        record.status_code = response.status_code
+        record.response = json.loads(
+            json.dumps(response.data, cls=JSONEncoder)
+        )
+        record.save(update_fields=["status_code", "response"])
+        return response
+
+    def replay(self, record, request_fingerprint):
+        if record.fingerprint != request_fingerprint:
+            return Response(
+                {"detail": f"{HEADER} was already used for another request."},
+                status=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            )
+
+        record = wait_for(record, settings.IDEMPOTENCY_WAIT_TIMEOUT)
+        if record is None:
+            return Response(
+                {"detail": "The original request failed, please retry."},
+                status=status.HTTP_409_CONFLICT,
+            )
+        if record.in_flight:
+            return Response(
+                {"detail": "The original request is still in progress."},
+                status=status.HTTP_409_CONFLICT,
+            )
+
+        return Response(
+            record.response,
+            status=record.status_code,
+            headers={"Idempotent-Replayed": "true"},
+        )
@@ -0,0 +1,134 @@
+"""
+Resized variants of train images.
+
+An upload is stored as is and the request returns right away. Once the
+transaction commits, a worker thread opens the original with Pillow and
+writes one file per entry of ``VARIANTS`` next to it, e.g.
+``uploads/trains/ic-1.jpg`` gets ``ic-1.thumbnail.jpg``,
+``ic-1.medium.jpg`` and ``ic-1.webp.webp``. The variant names are then
+stored in ``Train.image_variants`` together with the original they were
+made from, so variants of a replaced image are never served.
+
+``IMAGE_VARIANTS["WORKERS"]`` threads share the work; with 0 the variants
+are generated inline when the transaction commits. Until they exist,
+serializers fall back to the original.
+"""
+import io
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from PIL import Image, ImageOps, UnidentifiedImageError
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, connection, transaction
+
+from .models import Train
+
+logger = logging.getLogger(__name__)
+
+# name -> (longest side in pixels, Pillow format, file extension)
+VARIANTS = {
+    "thumbnail": (160, "JPEG", "jpg"),
+    "medium": (640, "JPEG", "jpg"),
+    "webp": (640, "WEBP", "webp"),
+}
+QUALITY = 85
+DEFAULT_WORKERS = 2
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def workers():
+    return getattr(settings, "IMAGE_VARIANTS", {}).get(
+        "WORKERS", DEFAULT_WORKERS
+    )
+
+
+def executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=workers(), thread_name_prefix="train-images"
+            )
+        return _executor
+
+
+def variant_name(name, variant):
+    stem, _ = os.path.splitext(name)
+    return f"{stem}.{variant}.{VARIANTS[variant][2]}"
+
+
+def current_variants(train):
+    """``{variant: storage name}`` made from the current image, or ``{}``"""
+    variants = train.image_variants or {}
+    if not train.image or variants.get("source") != train.image.name:
+        return {}
+    return {name: variants[name] for name in VARIANTS if name in variants}
+
+
+def needs_variants(train):
+    return bool(train.image) and not current_variants(train)
+
+
+def _render(image, size, image_format):
+    image = image.copy()
+    image.thumbnail((size, size), Image.Resampling.LANCZOS)
+    if image_format == "JPEG" and image.mode != "RGB":
+        image = image.convert("RGB")
+    buffer = io.BytesIO()
+    image.save(buffer, format=image_format, quality=QUALITY)
+    return ContentFile(buffer.getvalue())
+
+
+def generate_variants(train_id, name):
+    """
+    Write the variants of image ``name`` and record them on the train.
+
+    Nothing is recorded if the train's image changed in the meantime; the
+    upload that replaced it schedules its own variants.
+    """
+    try:
+        with default_storage.open(name) as file:
+            image = ImageOps.exif_transpose(Image.open(file))
+            image.load()
+    except (OSError, UnidentifiedImageError):
+        logger.warning("Cannot read train image %s", name, exc_info=True)
+        return None
+
+    variants = {"source": name}
+    for variant, (size, image_format, _) in VARIANTS.items():
+        path = variant_name(name, variant)
+        default_storage.delete(path)
+        variants[variant] = default_storage.save(
+            path, _render(image, size, image_format)
+        )
+
+    updated = Train.objects.filter(pk=train_id, image=name).update(
+        image_variants=variants
+    )
+    return variants if updated else None
+
+
+def _run(train_id, name):
+    # worker threads get their own connections, close them between jobs
+    close_old_connections()
+    try:
+        generate_variants(train_id, name)
+    except Exception:
+        logger.exception("Generating variants of %s failed", name)
+    finally:
+        connection.close()
+
+
+def schedule_variants(train):
+    """Generate the variants of the train's image after the commit"""
+    job = partial(generate_variants, train.pk, train.image.name)
+    if workers():
+        job = partial(executor().submit, _run, train.pk, train.image.name)
+    transaction.on_commit(job)
@@ -0,0 +1,128 @@
+"""
+Denormalized seat inventory.
+
+``Journey.tickets_sold`` and ``Journey.capacity`` let journeys report
+their free places without joining tickets. ``capacity`` is copied from the
+train whenever the journey or its train is saved. ``tickets_sold`` is
+moved by atomic ``F()`` updates from the ticket signal receivers and
+``Ticket.objects.bulk_create``, in the same transaction as the ticket
+rows. A check constraint keeps it between 0 and ``capacity``.
+
+Raw saves (``loaddata``) recount the affected journey instead, and
+``reconcile`` repairs any drift, e.g. after raw SQL or ``update()`` calls
+that bypass the ORM hooks.
+"""
+from collections import Counter
+
+from django.core.exceptions import ValidationError
+from django.db.models import Count, F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from .models import Journey, Ticket, Train
+
+
+def adjust(counts):
+    """Apply ``{journey_id: delta}`` to ``tickets_sold``"""
+    for journey_id, delta in counts.items():
+        if delta:
+            Journey.objects.filter(pk=journey_id).update(
+                tickets_sold=F("tickets_sold") + delta
+            )
+
+
+def tickets_added(tickets, sign=1):
+    counts = Counter()
+    for ticket in tickets:
+        counts[ticket.journey_id] += sign
+    adjust(counts)
+
+
+def ticket_moved(old_journey_id, new_journey_id):
+    adjust({old_journey_id: -1, new_journey_id: 1})
+
+
+def check_capacity(train, cargo_num, places_in_cargo):
+    """
+    Reject shrinking ``train`` below the tickets sold on one of its journeys.
+
+    Locks the train's journeys, so call it in the transaction that saves
+    the new size; ticket sales lock their journey too, so none can slip in
+    between.
+    """
+    capacity = cargo_num * places_in_cargo
+    if train.pk is None or (
+        capacity >= train.cargo_num * train.places_in_cargo
+    ):
+        return
+
+    sold = (
+        Journey.objects.select_for_update()
+        .filter(train=train)
+        .order_by("id")
+        .values_list("id", "tickets_sold")
+    )
+    overbooked = [
+        f"Journey {journey_id} already has {tickets_sold} tickets sold, "
+        f"more than the {capacity} places left."
+        for journey_id, tickets_sold in sold
+        if tickets_sold > capacity
+    ]
+    if overbooked:
+        raise ValidationError(overbooked)
+
+
+def train_resized(train):
+    Journey.objects.filter(train=train).update(
+        capacity=train.cargo_num * train.places_in_cargo
+    )
+
+
+def _actual_sold():
+    return Coalesce(
+        Subquery(
+            Ticket.objects.filter(journey=OuterRef("pk"))
+            .order_by()
+            .values("journey")
+            .annotate(count=Count("pk"))
+            .values("count")
+        ),
+        Value(0),
+    )
+
+
+def _actual_capacity():
+    return Coalesce(
+        Subquery(
+            Train.objects.filter(pk=OuterRef("train_id")).values(
+                capacity=F("cargo_num") * F("places_in_cargo")
+            )
+        ),
+        Value(0),
+    )
+
+
+def drifted(journey_ids=None):
+    """Journeys whose counters disagree with their tickets and train"""
+    queryset = Journey.objects.all()
+    if journey_ids is not None:
+        queryset = queryset.filter(pk__in=journey_ids)
+
+    return (
+        queryset.order_by()
+        .annotate(
+            actual_sold=_actual_sold(), actual_capacity=_actual_capacity()
+        )
+        .exclude(
+            tickets_sold=F("actual_sold"), capacity=F("actual_capacity")
+        )
+    )
+
+
+def reconcile(journey_ids=None):
+    """Recount drifted journeys, returning how many were fixed"""
+    ids = list(drifted(journey_ids).values_list("pk", flat=True))
+    if ids:
+        Journey.objects.filter(pk__in=ids).update(
+            tickets_sold=_actual_sold(), capacity=_actual_capacity()
+        )
+    return len(ids)
@@ -0,0 +1,246 @@
+"""
+Live seat availability over server-sent events.
+
+``GET /api/station/journeys/<id>/seats/stream/`` keeps the connection open
+and pushes a ``snapshot`` event with the full seat map, then a ``delta``
+event with the seats taken and released each time tickets change. Browser
+``EventSource`` cannot send headers, so the access token may also be
+passed as ``?token=``. The stream is async and needs an ASGI server
+(uvicorn in docker-compose); under WSGI every watcher would hold a worker.
+
+Every journey being watched in a process has one ``JourneyPublisher``
+that reads the seat map and fans it out to all of its subscribers, so the
+database cost does not grow with the number of watchers. Publishers only
+read the seat map when told that the journey's tickets changed: the
+ticket signals call ``changed()``, which on PostgreSQL sends a
+``NOTIFY`` that reaches the listener thread of every process once the
+transaction commits. Other databases only notify the current process.
+"""
+import asyncio
+import json
+import logging
+import select
+import threading
+import time
+from functools import partial
+
+from asgiref.sync import sync_to_async
+from django.db import connection, transaction
+
+from .models import Journey, Ticket
+
+
+logger = logging.getLogger(__name__)
+
+KEEPALIVE_INTERVAL = 15
+QUEUE_SIZE = 64
+CHANNEL = "station_seats"
+LISTEN_TIMEOUT = 30
+RECONNECT_DELAY = 5
+
+_publishers = {}
+_listener = None
+_listener_lock = threading.Lock()
+
+
+def seat_state(journey_id):
+    """``(tickets_available, {(cargo, seat), ...})`` or ``None``"""
+    journey = (
+        Journey.objects.select_related("train")
+        .only("train__cargo_num", "train__places_in_cargo")
+        .filter(pk=journey_id)
+        .first()
+    )
+    if journey is None:
+        return None
+
+    taken = set(
+        Ticket.objects.filter(journey_id=journey_id).values_list(
+            "cargo", "seat"
+        )
+    )
+    capacity = journey.train.cargo_num * journey.train.places_in_cargo
+    return capacity - len(taken), taken
+
+
+def _seats(places):
+    return [{"cargo": cargo, "seat": seat} for cargo, seat in sorted(places)]
+
+
+def snapshot_event(journey_id, state):
+    tickets_available, taken = state
+    return "snapshot", {
+        "journey": journey_id,
+        "tickets_available": tickets_available,
+        "taken_places": _seats(taken),
+    }
+
+
+def delta_event(journey_id, old, new):
+    return "delta", {
+        "journey": journey_id,
+        "tickets_available": new[0],
+        "taken": _seats(new[1] - old[1]),
+        "released": _seats(old[1] - new[1]),
+    }
+
+
+def format_event(name, data):
+    return f"event: {name}\ndata: {json.dumps(data)}\n\n"
+
+
+class JourneyPublisher:
+    """Reads one journey's seat map and fans changes out to subscribers"""
+
+    def __init__(self, journey_id, loop):
+        self.journey_id = journey_id
+        self.loop = loop
+        self.subscribers = set()
+        self.changed = asyncio.Event()
+        self.state = None
+        self.task = None
+
+    def subscribe(self):
+        queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+        self.subscribers.add(queue)
+        if self.state is not None:
+            queue.put_nowait(snapshot_event(self.journey_id, self.state))
+        if self.task is None:
+            self.task = self.loop.create_task(self.run())
+        return queue
+
+    def unsubscribe(self, queue):
+        self.subscribers.discard(queue)
+        if not self.subscribers:
+            if self.task is not None:
+                self.task.cancel()
+            if _publishers.get(self.journey_id) is self:
+                del _publishers[self.journey_id]
+
+    def notify(self):
+        self.loop.call_soon_threadsafe(self.changed.set)
+
+    def publish(self, event):
+        for queue in self.subscribers:
+            if queue.full():
+                # a slow reader lost deltas, resynchronize it instead
+                while not queue.empty():
+                    queue.get_nowait()
+                event_for_queue = snapshot_event(self.journey_id, self.state)
+            else:
+                event_for_queue = event
+            queue.put_nowait(event_for_queue)
+
+    async def run(self):
+        while True:
+            self.changed.clear()
+            state = await sync_to_async(seat_state)(self.journey_id)
+
+            if state is None:
+                self.publish(("closed", {"journey": self.journey_id}))
+                return
+
+            if self.state is None:
+                self.state = state
+                self.publish(snapshot_event(self.journey_id, state))
+            elif state != self.state:
+                old, self.state = self.state, state
+                self.publish(delta_event(self.journey_id, old, state))
+
+            await self.changed.wait()
+
+
+def get_publisher(journey_id):
+    start_listener()
+    loop = asyncio.get_running_loop()
+    publisher = _publishers.get(journey_id)
+    if publisher is None or publisher.loop is not loop:
+        publisher = _publishers[journey_id] = JourneyPublisher(
+            journey_id, loop
+        )
+    return publisher
+
+
+def notify(journey_id):
+    """Wake the journey's publisher, safe to call from any thread"""
+    publisher = _publishers.get(journey_id)
+    if publisher is None:
+        return
+    try:
+        publisher.notify()
+    except RuntimeError:
+        logger.debug("Publisher loop for journey %s is closed", journey_id)
+
+
+def notify_all():
+    for journey_id in list(_publishers):
+        notify(journey_id)
+
+
+def changed(journey_id):
+    """Tell the journey's watchers in every process, once committed"""
+    if connection.vendor == "postgresql":
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT pg_notify(%s, %s)", [CHANNEL, str(journey_id)]
+            )
+    else:
+        transaction.on_commit(partial(notify, journey_id))
+
+
+def start_listener():
+    """Start this process's ``LISTEN`` thread on PostgreSQL"""
+    global _listener
+    if connection.vendor != "postgresql":
+        return
+    with _listener_lock:
+        if _listener is None or not _listener.is_alive():
+            _listener = threading.Thread(
+                target=listen, name="seat-listener", daemon=True
+            )
+            _listener.start()
+
+
+def listen():
+    while True:
+        try:
+            _listen()
+        except Exception:
+            logger.warning("Seat listener disconnected", exc_info=True)
+        finally:
+            connection.close()
+        time.sleep(RECONNECT_DELAY)
+
+
+def _listen():
+    with connection.cursor() as cursor:
+        cursor.execute(f"LISTEN {CHANNEL}")
+    # changes made while not listening were missed, reread every seat map
+    notify_all()
+
+    raw = connection.connection
+    while True:
+        if not select.select([raw], [], [], LISTEN_TIMEOUT)[0]:
+            continue
+        raw.poll()
+        while raw.notifies:
+            notify(int(raw.notifies.pop(0).payload))
+
+
+async def event_stream(journey_id, keepalive=KEEPALIVE_INTERVAL):
+    publisher = get_publisher(journey_id)
+    queue = publisher.subscribe()
+    try:
+        yield "retry: 3000\n\n"
+        while True:
+            try:
+                name, data = await asyncio.wait_for(queue.get(), keepalive)
+            except asyncio.TimeoutError:
+                yield ": keepalive\n\n"
+                continue
+
+            yield format_event(name, data)
+            if name == "closed":
+                return
+    finally:
+        publisher.unsubscribe(queue)
@@ -0,0 +1,55 @@
+from django.core.management.base import BaseCommand
+
+from station.archive import (
+    BATCH_SIZE,
+    archivable,
+    archive_journeys,
+    retention_cutoff,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Move completed journeys older than the retention window, with "
+        "their tickets and crew, into the archive tables"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days",
+            type=int,
+            help="Retention window in days "
+            "(default: settings.ARCHIVE_RETENTION_DAYS)",
+        )
+        parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+        parser.add_argument(
+            "--pause",
+            type=float,
+            default=0,
+            help="Seconds to sleep between batches",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Only count the journeys that would be archived",
+        )
+
+    def handle(self, *args, **options):
+        cutoff = retention_cutoff(options["days"])
+
+        if options["dry_run"]:
+            count = archivable(cutoff).count()
+            self.stdout.write(
+                f"{count} journey(s) arrived before {cutoff:%Y-%m-%d %H:%M}"
+            )
+            return
+
+        archived = archive_journeys(
+            cutoff,
+            options["batch_size"],
+            options["pause"],
+            log=lambda total: self.stdout.write(f"Archived {total}..."),
+        )
+        self.stdout.write(
+            self.style.SUCCESS(f"Archived {archived} journey(s)")
+        )
@@ -0,0 +1,48 @@
+from django.core.management.base import BaseCommand
+
+from station.scheduling import (
+    train_timetable_conflicts,
+    crew_timetable_conflicts,
+)
+
+
+class Command(BaseCommand):
+    help = "Find every train and crew scheduling conflict in the timetable"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--limit",
+            type=int,
+            default=100,
+            help="Maximum number of conflicts to print per kind",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=10000,
+            help="Rows fetched per database round trip",
+        )
+
+    def handle(self, *args, **options):
+        total = 0
+        for label, conflicts in [
+            ("Train", train_timetable_conflicts(options["chunk_size"])),
+            ("Crew member", crew_timetable_conflicts(options["chunk_size"])),
+        ]:
+            count = 0
+            for resource_id, journey_id, other_journey_id in conflicts:
+                count += 1
+                if count <= options["limit"]:
+                    self.stdout.write(
+                        f"{label} {resource_id}: journeys {journey_id} "
+                        f"and {other_journey_id} overlap"
+                    )
+            self.stdout.write(f"{label} conflicts: {count}")
+            total += count
+
+        if total:
+            self.stdout.write(
+                self.style.ERROR(f"Found {total} scheduling conflicts")
+            )
+        else:
+            self.stdout.write(self.style.SUCCESS("No scheduling conflicts"))
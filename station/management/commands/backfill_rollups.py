@@ -0,0 +1,28 @@
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from station.rollups import backfill
+
+
+def parse_date(value):
+    try:
+        return datetime.strptime(value, "%Y-%m-%d").date()
+    except ValueError:
+        raise CommandError(f"Invalid date {value!r}, expected YYYY-MM-DD")
+
+
+class Command(BaseCommand):
+    help = "Rebuild route and train type daily rollups from tickets"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--from", dest="start", type=parse_date, help="First date"
+        )
+        parser.add_argument(
+            "--to", dest="end", type=parse_date, help="Last date"
+        )
+
+    def handle(self, *args, **options):
+        rows = backfill(options["start"], options["end"])
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {rows} rollup rows"))
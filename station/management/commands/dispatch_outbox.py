@@ -0,0 +1,50 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from station.outbox import load_sinks, run_dispatcher, purge_dispatched
+
+
+class Command(BaseCommand):
+    help = "Deliver pending order and ticket events to the configured sinks"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=100,
+            help="Events per sink call",
+        )
+        parser.add_argument(
+            "--poll-interval",
+            type=float,
+            default=1.0,
+            help="Seconds to wait when the outbox is drained",
+        )
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Exit once the outbox is drained",
+        )
+        parser.add_argument(
+            "--purge-after-days",
+            type=int,
+            help="Delete events dispatched more than this many days ago",
+        )
+
+    def handle(self, *args, **options):
+        if options["purge_after_days"] is not None:
+            purged = purge_dispatched(
+                timedelta(days=options["purge_after_days"])
+            )
+            self.stdout.write(f"Purged {purged} dispatched events")
+
+        run_dispatcher(
+            load_sinks(),
+            batch_size=options["batch_size"],
+            poll_interval=options["poll_interval"],
+            once=options["once"],
+            on_error=lambda exc: self.stderr.write(
+                f"Dispatch failed, will retry: {exc!r}"
+            ),
+        )
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from station.snapshot import CHUNK_SIZE, dump
+
+
+class Command(BaseCommand):
+    help = (
+        "Write a columnar snapshot of the station data for fast_load "
+        "(gzip-compressed when the path ends in .gz)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path")
+        parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        counts = dump(options["path"], options["chunk_size"])
+        for model, rows in counts.items():
+            self.stdout.write(f"{model}: {rows}")
+        self.stdout.write(
+            self.style.SUCCESS(f"Dumped {sum(counts.values())} rows")
+        )
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from station.snapshot import SnapshotError, load
+
+
+class Command(BaseCommand):
+    help = (
+        "Bulk-load a fast_dump snapshot into empty tables, matching "
+        "stations, trains, train types, fare bands and users by name/email"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path")
+
+    def handle(self, *args, **options):
+        try:
+            counts = load(options["path"])
+        except SnapshotError as error:
+            raise CommandError(error)
+
+        for model, rows in counts.items():
+            self.stdout.write(f"{model}: {rows}")
+        self.stdout.write(
+            self.style.SUCCESS(f"Loaded {sum(counts.values())} rows")
+        )
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from station.images import generate_variants, needs_variants
+from station.models import Train
+
+
+class Command(BaseCommand):
+    help = "Generate missing resized variants of train images"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--all",
+            action="store_true",
+            help="Regenerate variants that already exist too",
+        )
+
+    def handle(self, *args, **options):
+        done = 0
+        for train in Train.objects.exclude(image="").exclude(image=None):
+            if options["all"] or needs_variants(train):
+                if generate_variants(train.pk, train.image.name):
+                    done += 1
+        self.stdout.write(
+            self.style.SUCCESS(f"Generated variants of {done} image(s)")
+        )
@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+
+from station.idempotency import purge_expired
+
+
+class Command(BaseCommand):
+    help = "Delete expired idempotency keys"
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"Purged {purge_expired()} expired keys")
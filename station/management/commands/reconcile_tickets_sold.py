@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from station.inventory import drifted, reconcile
+
+
+class Command(BaseCommand):
+    help = "Recount Journey.tickets_sold and capacity where they drifted"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Only report the journeys that would be fixed",
+        )
+
+    def handle(self, *args, **options):
+        if options["dry_run"]:
+            for journey in drifted():
+                self.stdout.write(
+                    f"Journey {journey.pk}: sold {journey.tickets_sold} -> "
+                    f"{journey.actual_sold}, capacity {journey.capacity} "
+                    f"-> {journey.actual_capacity}"
+                )
+            return
+
+        fixed = reconcile()
+        self.stdout.write(
+            self.style.SUCCESS(f"Reconciled {fixed} journey(s)")
+        )
@@ -0,0 +1,110 @@
+import json
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from station.traffic import (
+    HttpTarget,
+    InProcessTarget,
+    compare,
+    load_requests,
+    replay,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Replay requests captured by TrafficCaptureMiddleware and report "
+        "latency percentiles, error rates and query counts per route"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("capture", help="JSONL file to replay")
+        parser.add_argument("--concurrency", type=int, default=1)
+        parser.add_argument(
+            "--limit", type=int, help="Replay only the first N requests"
+        )
+        parser.add_argument(
+            "--include-writes",
+            action="store_true",
+            help="Also replay POST/PUT/PATCH/DELETE requests",
+        )
+        parser.add_argument(
+            "--user",
+            help="Email of the user authenticated requests run as "
+            "(in-process replay)",
+        )
+        parser.add_argument(
+            "--base-url",
+            help="Replay against a running server instead of in-process",
+        )
+        parser.add_argument(
+            "--token", help="JWT access token for --base-url replays"
+        )
+        parser.add_argument(
+            "--output", help="Write the report to this JSON file"
+        )
+        parser.add_argument(
+            "--baseline", help="Compare with a report saved by --output"
+        )
+
+    def handle(self, *args, **options):
+        records = list(
+            load_requests(options["capture"], options["include_writes"])
+        )
+        if options["limit"]:
+            records = records[: options["limit"]]
+        if not records:
+            raise CommandError("No replayable requests in the capture")
+
+        if options["base_url"]:
+            target = HttpTarget(options["base_url"], options["token"])
+        else:
+            target = InProcessTarget(self.get_user(options["user"]))
+
+        report = replay(records, target, options["concurrency"])
+        self.print_report(report)
+
+        if options["output"]:
+            with open(options["output"], "w") as file:
+                json.dump(report, file, indent=2)
+        if options["baseline"]:
+            with open(options["baseline"]) as file:
+                self.print_changes(compare(json.load(file), report))
+
+    def get_user(self, email):
+        if email is None:
+            return None
+        try:
+            return get_user_model().objects.get(email=email)
+        except get_user_model().DoesNotExist:
+            raise CommandError(f"No user {email}")
+
+    def print_report(self, report):
+        self.stdout.write(
+            f"{report['requests']} requests in {report['seconds']:.2f} s "
+            f"({report['throughput']:.1f}/s)"
+        )
+        self.stdout.write(
+            f"{'route':<44} {'n':>5} {'err':>6} {'p50':>8} {'p95':>8} "
+            f"{'p99':>8} {'queries':>7}"
+        )
+        for route, stats in report["routes"].items():
+            queries = stats["queries"]
+            self.stdout.write(
+                f"{route:<44} {stats['requests']:>5} "
+                f"{stats['error_rate']:>6.1%} "
+                f"{stats['p50_ms']:>6.1f}ms {stats['p95_ms']:>6.1f}ms "
+                f"{stats['p99_ms']:>6.1f}ms "
+                f"{'-' if queries is None else f'{queries:.1f}':>7}"
+            )
+
+    def print_changes(self, changes):
+        self.stdout.write("\nChange against baseline:")
+        for route, metrics in changes.items():
+            parts = [
+                f"{metric} {before if before is None else round(before, 2)}"
+                f" -> {after if after is None else round(after, 2)}"
+                for metric, (before, after) in metrics.items()
+            ]
+            self.stdout.write(f"{route}: " + ", ".join(parts))
@@ -0,0 +1,141 @@
+import logging
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import (
+    setup_databases,
+    setup_test_environment,
+    teardown_databases,
+    teardown_test_environment,
+)
+from django.utils import timezone
+
+from station.models import Journey, Route, Station, Train
+from station.stress import check_invariants, plan_orders, run_stress
+
+
+class Command(BaseCommand):
+    help = (
+        "Fire concurrent orders for overlapping seats at one journey in a "
+        "throwaway test database and check that nothing was oversold. "
+        "Run it against PostgreSQL: SQLite's in-memory test database "
+        "locks whole tables and turns most contention into errors."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=20)
+        parser.add_argument("--orders", type=int, default=200)
+        parser.add_argument("--seats-per-order", type=int, default=2)
+        parser.add_argument(
+            "--hot-seats",
+            type=int,
+            default=20,
+            help="Orders pick their seats among this many seats",
+        )
+        parser.add_argument("--users", type=int, default=10)
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument(
+            "--keepdb",
+            action="store_true",
+            help="Reuse the test database between runs",
+        )
+
+    def handle(self, *args, **options):
+        if options["seats_per_order"] > options["hot_seats"]:
+            raise CommandError("--seats-per-order exceeds --hot-seats")
+
+        # rejected orders are expected here, keep 4xx warnings quiet
+        logging.getLogger("django.request").setLevel(logging.ERROR)
+        setup_test_environment()
+        old_config = setup_databases(
+            verbosity=0, interactive=False, keepdb=options["keepdb"]
+        )
+        try:
+            report, problems = self.run(options)
+        finally:
+            teardown_databases(
+                old_config, verbosity=0, keepdb=options["keepdb"]
+            )
+            teardown_test_environment()
+
+        self.print_report(report)
+        if problems:
+            raise CommandError(
+                "Booking invariants violated:\n" + "\n".join(problems)
+            )
+        if report["errors"]:
+            raise CommandError(
+                f"{report['errors']} order(s) failed with an error "
+                "instead of being booked or rejected"
+            )
+        if not report["booked"]:
+            raise CommandError("No order was booked")
+        self.stdout.write(self.style.SUCCESS("No seat sold twice"))
+
+    def run(self, options):
+        users = [
+            get_user_model().objects.create_user(
+                f"stress{i}@example.com", "stresspass", is_staff=True
+            )
+            for i in range(options["users"])
+        ]
+        train = Train.objects.create(
+            name=f"Stress {timezone.now():%H%M%S%f}",
+            cargo_num=4,
+            places_in_cargo=max(1, options["hot_seats"] // 4 + 1),
+        )
+        departure = timezone.now() + timedelta(days=1)
+        journey = Journey.objects.create(
+            route=Route.objects.create(
+                source=Station.objects.create(
+                    name=f"{train.name} A", latitude=1, longitude=1
+                ),
+                destination=Station.objects.create(
+                    name=f"{train.name} B", latitude=2, longitude=2
+                ),
+            ),
+            train=train,
+            departure_time=departure,
+            arrival_time=departure + timedelta(hours=2),
+        )
+
+        plan = plan_orders(
+            journey,
+            users,
+            options["orders"],
+            options["seats_per_order"],
+            options["hot_seats"],
+            options["seed"],
+        )
+        report = run_stress(journey, plan, options["workers"])
+        problems, report["unconfirmed"] = check_invariants(
+            journey,
+            users,
+            options["seats_per_order"],
+            report["booked_orders"],
+        )
+        return report, problems
+
+    def print_report(self, report):
+        def ms(seconds):
+            return "-" if seconds is None else f"{seconds * 1000:.1f} ms"
+
+        latency = report["latency"]
+        lines = [
+            f"Orders:      {report['orders']} in {report['seconds']:.2f} s "
+            f"({report['throughput']:.1f}/s)",
+            f"Booked:      {report['booked']}",
+            f"Conflicts:   {report['conflicts']} "
+            f"({report['conflict_rate']:.1%})",
+            f"Throttled:   {report['throttled']}",
+            f"Errors:      {report['errors']} "
+            f"({len(report['unconfirmed'])} booked despite the error)",
+            f"Lock wait:   {ms(report['lock_wait'])} total",
+            f"Latency:     p50 {ms(latency['p50'])}, "
+            f"p95 {ms(latency['p95'])}, p99 {ms(latency['p99'])}, "
+            f"max {ms(latency['max'])}",
+        ]
+        for status, data in report["error_samples"]:
+            lines.append(f"  error {status}: {data}")
+        self.stdout.write("\n".join(lines))
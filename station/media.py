@@ -0,0 +1,224 @@
+"""
+Serving uploaded media.
+
+``MediaStorage`` puts a hash of each file's content into its URL, e.g.
+``/media/3f2a9c0e51b7d4a8/uploads/trains/ic-1.thumbnail.jpg``. A hashed
+URL always names the same bytes, so it is served with a far-future
+``Cache-Control: immutable``; when the file changes its URL changes and
+the old one redirects to the new one. URLs without a hash keep working
+but must be revalidated.
+
+``serve`` answers ``If-None-Match`` with 304 and single ``Range``
+requests with 206, streaming the file in ``CHUNK_SIZE`` blocks. With
+``MEDIA_SERVING["SENDFILE"]`` set to ``"x-sendfile"`` (Apache, lighttpd)
+or ``"x-accel-redirect"`` (nginx, which must map ``ACCEL_PREFIX`` to
+``MEDIA_ROOT`` as an internal location) the view only checks the request
+and the front server sends the bytes, ranges included.
+"""
+import hashlib
+import mimetypes
+import os
+import re
+import threading
+from urllib.parse import urljoin
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files.storage import FileSystemStorage
+from django.http import (
+    FileResponse,
+    Http404,
+    HttpResponse,
+    HttpResponseNotModified,
+    HttpResponseRedirect,
+    StreamingHttpResponse,
+)
+from django.urls import re_path
+from django.utils._os import safe_join
+from django.utils.encoding import filepath_to_uri
+from django.utils.http import parse_etags
+from django.views.decorators.http import require_safe
+
+DEFAULT_MEDIA_SERVING = {
+    "SENDFILE": None,
+    "ACCEL_PREFIX": "/protected-media/",
+}
+DIGEST_LENGTH = 16
+CHUNK_SIZE = 64 * 1024
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "public, no-cache"
+RANGE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+# absolute path -> (mtime_ns, size, digest)
+_digests = {}
+_digests_lock = threading.Lock()
+
+
+def media_serving_settings():
+    return {
+        **DEFAULT_MEDIA_SERVING,
+        **getattr(settings, "MEDIA_SERVING", {}),
+    }
+
+
+def content_digest(path):
+    """Hash of the file's content, ``None`` if there is no such file"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+
+    key = (stat.st_mtime_ns, stat.st_size)
+    cached = _digests.get(path)
+    if cached is not None and cached[:2] == key:
+        return cached[2]
+
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for block in iter(lambda: file.read(CHUNK_SIZE), b""):
+            digest.update(block)
+    digest = digest.hexdigest()[:DIGEST_LENGTH]
+    with _digests_lock:
+        _digests[path] = (*key, digest)
+    return digest
+
+
+class MediaStorage(FileSystemStorage):
+    """File system storage whose URLs carry a hash of the content"""
+
+    def url(self, name):
+        digest = content_digest(self.path(name)) if name else None
+        if digest is None:
+            return super().url(name)
+        return urljoin(
+            self.base_url, f"{digest}/{filepath_to_uri(name).lstrip('/')}"
+        )
+
+
+def byte_range(header, size):
+    """``(start, end)`` of a single ``Range``, ``None`` to send it all"""
+    match = RANGE.match(header.replace(" ", ""))
+    if match is None:
+        # malformed or several ranges: sending the whole file is allowed
+        return None
+
+    first, last = match.groups()
+    if not first:
+        if not last:
+            return None
+        start, end = max(size - int(last), 0), size - 1
+    else:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+        if last and int(last) < start:
+            return None
+    if start >= size or size == 0:
+        raise ValueError("unsatisfiable range")
+    return start, end
+
+
+def read_range(path, start, end):
+    with open(path, "rb") as file:
+        file.seek(start)
+        remaining = end - start + 1
+        while remaining:
+            block = file.read(min(CHUNK_SIZE, remaining))
+            if not block:
+                return
+            remaining -= len(block)
+            yield block
+
+
+def _sendfile(path, name, options):
+    response = HttpResponse()
+    if options["SENDFILE"] == "x-accel-redirect":
+        response["X-Accel-Redirect"] = options["ACCEL_PREFIX"] + (
+            filepath_to_uri(name)
+        )
+    else:
+        response["X-Sendfile"] = path
+    # the front server sets them from the file
+    del response["Content-Type"]
+    return response
+
+
+@require_safe
+def serve(request, path, digest=None):
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, path)
+    except SuspiciousFileOperation:
+        raise Http404("No such file")
+    current = content_digest(full_path) if os.path.isfile(full_path) else None
+    if current is None:
+        raise Http404("No such file")
+
+    if digest is not None and digest != current:
+        # the file changed since that URL was handed out
+        return HttpResponseRedirect(
+            urljoin(settings.MEDIA_URL, f"{current}/{filepath_to_uri(path)}")
+        )
+
+    etag = f'"{current}"'
+    headers = {
+        "ETag": etag,
+        "Cache-Control": IMMUTABLE if digest else REVALIDATE,
+    }
+    if etag in parse_etags(request.headers.get("If-None-Match", "")):
+        response = HttpResponseNotModified()
+        for header, value in headers.items():
+            response[header] = value
+        return response
+
+    options = media_serving_settings()
+    if options["SENDFILE"]:
+        response = _sendfile(full_path, path, options)
+    else:
+        response = _stream(request, full_path, etag)
+    for header, value in headers.items():
+        response[header] = value
+    return response
+
+
+def _stream(request, path, etag):
+    size = os.path.getsize(path)
+    content_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+
+    requested = request.headers.get("Range")
+    if_range = request.headers.get("If-Range")
+    if requested and (if_range is None or if_range == etag):
+        try:
+            span = byte_range(requested, size)
+        except ValueError:
+            response = HttpResponse(status=416)
+            response["Content-Range"] = f"bytes */{size}"
+            return response
+        if span is not None:
+            start, end = span
+            response = StreamingHttpResponse(
+                read_range(path, start, end),
+                status=206,
+                content_type=content_type,
+            )
+            response["Content-Range"] = f"bytes {start}-{end}/{size}"
+            response["Content-Length"] = end - start + 1
+            response["Accept-Ranges"] = "bytes"
+            return response
+
+    response = FileResponse(open(path, "rb"), content_type=content_type)
+    response.block_size = CHUNK_SIZE
+    response["Accept-Ranges"] = "bytes"
+    return response
+
+
+def media_urlpatterns():
+    """Routes for ``MEDIA_URL``, with and without a content hash"""
+    prefix = re.escape(settings.MEDIA_URL.strip("/"))
+    return [
+        re_path(
+            rf"^{prefix}/(?P<digest>[0-9a-f]{{{DIGEST_LENGTH}}})/"
+            r"(?P<path>.+)$",
+            serve,
+            name="media-hashed",
+        ),
+        re_path(rf"^{prefix}/(?P<path>.+)$", serve, name="media"),
+    ]
@@ -0,0 +1,84 @@
+# Generated by Django 5.0.1 on 2026-10-19 08:14
+
+import django.db.models.deletion
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("station", "0007_alter_train_name_alter_route_unique_together"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="FareBand",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("name", models.CharField(max_length=255, unique=True)),
+                ("start_time", models.TimeField()),
+                ("end_time", models.TimeField()),
+                ("multiplier", models.DecimalField(decimal_places=2, max_digits=4)),
+            ],
+            options={
+                "ordering": ["start_time"],
+            },
+        ),
+        migrations.AddField(
+            model_name="ticket",
+            name="price",
+            field=models.DecimalField(
+                blank=True, decimal_places=2, max_digits=10, null=True
+            ),
+        ),
+        migrations.AddField(
+            model_name="train",
+            name="first_class_cargo_num",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.CreateModel(
+            name="Tariff",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "base_fare",
+                    models.DecimalField(
+                        decimal_places=2, default=Decimal("0"), max_digits=8
+                    ),
+                ),
+                ("price_per_km", models.DecimalField(decimal_places=4, max_digits=8)),
+                (
+                    "first_class_multiplier",
+                    models.DecimalField(
+                        decimal_places=2, default=Decimal("1.5"), max_digits=4
+                    ),
+                ),
+                (
+                    "train_type",
+                    models.OneToOneField(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="tariff",
+                        to="station.traintype",
+                    ),
+                ),
+            ],
+        ),
+    ]
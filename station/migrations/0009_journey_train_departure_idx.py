@@ -0,0 +1,18 @@
+# Generated by Django 5.0.1 on 2026-10-19 08:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("station", "0008_fares"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="journey",
+            index=models.Index(
+                fields=["train", "departure_time"], name="journey_train_departure_idx"
+            ),
+        ),
+    ]
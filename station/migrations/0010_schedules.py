@@ -0,0 +1,102 @@
+# Generated by Django 5.0.1 on 2026-10-19 08:18
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("station", "0009_journey_train_departure_idx"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ScheduleException",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("date", models.DateField()),
+            ],
+        ),
+        migrations.CreateModel(
+            name="Schedule",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("departure_time", models.TimeField()),
+                ("duration", models.DurationField()),
+                (
+                    "weekdays",
+                    models.PositiveSmallIntegerField(
+                        default=127,
+                        help_text="Bit mask of running days, Monday is bit 0",
+                    ),
+                ),
+                ("valid_from", models.DateField()),
+                ("valid_until", models.DateField()),
+                (
+                    "route",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="schedules",
+                        to="station.route",
+                    ),
+                ),
+                (
+                    "train",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="schedules",
+                        to="station.train",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["departure_time"],
+            },
+        ),
+        migrations.AddField(
+            model_name="journey",
+            name="schedule",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="journeys",
+                to="station.schedule",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="journey",
+            constraint=models.UniqueConstraint(
+                fields=("schedule", "departure_time"), name="unique_schedule_occurrence"
+            ),
+        ),
+        migrations.AddField(
+            model_name="scheduleexception",
+            name="schedule",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="exceptions",
+                to="station.schedule",
+            ),
+        ),
+        migrations.AlterUniqueTogether(
+            name="scheduleexception",
+            unique_together={("schedule", "date")},
+        ),
+    ]
@@ -0,0 +1,89 @@
+# Generated by Django 5.0.1 on 2026-10-19 08:20
+
+import django.db.models.deletion
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("station", "0010_schedules"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="RouteDailyStats",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("date", models.DateField()),
+                ("journeys", models.IntegerField(default=0)),
+                ("seats_offered", models.IntegerField(default=0)),
+                ("tickets_sold", models.IntegerField(default=0)),
+                (
+                    "revenue",
+                    models.DecimalField(
+                        decimal_places=2, default=Decimal("0"), max_digits=14
+                    ),
+                ),
+                (
+                    "route",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="daily_stats",
+                        to="station.route",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name_plural": "route daily stats",
+                "ordering": ["date", "route"],
+                "unique_together": {("route", "date")},
+            },
+        ),
+        migrations.CreateModel(
+            name="TrainTypeDailyStats",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("date", models.DateField()),
+                ("journeys", models.IntegerField(default=0)),
+                ("seats_offered", models.IntegerField(default=0)),
+                ("tickets_sold", models.IntegerField(default=0)),
+                (
+                    "revenue",
+                    models.DecimalField(
+                        decimal_places=2, default=Decimal("0"), max_digits=14
+                    ),
+                ),
+                (
+                    "train_type",
+                    models.ForeignKey(
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="daily_stats",
+                        to="station.traintype",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name_plural": "train type daily stats",
+                "ordering": ["date", "train_type"],
+                "unique_together": {("train_type", "date")},
+            },
+        ),
+    ]
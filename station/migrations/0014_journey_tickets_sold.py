@@ -0,0 +1,53 @@
+# Generated by Django 5.0.1 on 2026-10-19 08:34
+
+from django.db import migrations, models
+from django.db.models import Count, F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def count_tickets(apps, schema_editor):
+    Journey = apps.get_model("station", "Journey")
+    Ticket = apps.get_model("station", "Ticket")
+    Train = apps.get_model("station", "Train")
+
+    sold = (
+        Ticket.objects.filter(journey=OuterRef("pk"))
+        .order_by()
+        .values("journey")
+        .annotate(count=Count("pk"))
+        .values("count")
+    )
+    capacity = Train.objects.filter(pk=OuterRef("train_id")).values(
+        capacity=F("cargo_num") * F("places_in_cargo")
+    )
+    Journey.objects.update(
+        tickets_sold=Coalesce(Subquery(sold), Value(0)),
+        capacity=Coalesce(Subquery(capacity), Value(0)),
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("station", "0013_idempotency_keys"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="journey",
+            name="capacity",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="journey",
+            name="tickets_sold",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(count_tickets, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="journey",
+            constraint=models.CheckConstraint(
+                check=models.Q(("tickets_sold__lte", models.F("capacity"))),
+                name="journey_tickets_sold_within_capacity",
+            ),
+        ),
+    ]
@@ -0,0 +1,93 @@
+# Generated by Django 5.0.1 on 2026-10-19 08:54
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("station", "0014_journey_tickets_sold"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ArchivedJourney",
+            fields=[
+                ("id", models.BigIntegerField(primary_key=True, serialize=False)),
+                ("departure_time", models.DateTimeField()),
+                ("arrival_time", models.DateTimeField()),
+                ("capacity", models.PositiveIntegerField(default=0)),
+                ("tickets_sold", models.PositiveIntegerField(default=0)),
+                ("archived_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "crew",
+                    models.ManyToManyField(
+                        blank=True, related_name="archived_journeys", to="station.crew"
+                    ),
+                ),
+                (
+                    "route",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="archived_journeys",
+                        to="station.route",
+                    ),
+                ),
+                (
+                    "schedule",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="archived_journeys",
+                        to="station.schedule",
+                    ),
+                ),
+                (
+                    "train",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="archived_journeys",
+                        to="station.train",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name_plural": "archived journeys",
+                "ordering": ["-departure_time"],
+            },
+        ),
+        migrations.CreateModel(
+            name="ArchivedTicket",
+            fields=[
+                ("id", models.BigIntegerField(primary_key=True, serialize=False)),
+                ("cargo", models.IntegerField()),
+                ("seat", models.IntegerField()),
+                (
+                    "price",
+                    models.DecimalField(
+                        blank=True, decimal_places=2, max_digits=10, null=True
+                    ),
+                ),
+                (
+                    "journey",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="tickets",
+                        to="station.archivedjourney",
+                    ),
+                ),
+                (
+                    "order",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="archived_tickets",
+                        to="station.order",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["journey", "cargo", "seat"],
+            },
+        ),
+    ]
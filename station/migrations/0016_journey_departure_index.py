@@ -0,0 +1,16 @@
+# Generated by Django 5.0.1 on 2026-10-19 08:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("station", "0015_archive"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="journey",
+            index=models.Index(fields=["departure_time"], name="journey_departure_idx"),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.0.1 on 2026-10-19 10:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("station", "0016_journey_departure_index"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="train",
+            name="image_variants",
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
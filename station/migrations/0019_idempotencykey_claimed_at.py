@@ -0,0 +1,18 @@
+# Generated by Django 5.0.1 on 2026-10-19 12:40
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("station", "0018_cacheversion"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="idempotencykey",
+            name="claimed_at",
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.0.1 on 2026-10-19 13:05
+
+from django.db import migrations, models
+from django.db.models import Count
+
+COUNTERS = ("journeys", "seats_offered", "tickets_sold", "revenue")
+
+
+def merge_untyped_days(apps, schema_editor):
+    TrainTypeDailyStats = apps.get_model("station", "TrainTypeDailyStats")
+
+    untyped = TrainTypeDailyStats.objects.filter(train_type__isnull=True)
+    dates = (
+        untyped.order_by()
+        .values("date")
+        .annotate(rows=Count("pk"))
+        .filter(rows__gt=1)
+        .values_list("date", flat=True)
+    )
+    for date in dates:
+        first, *rest = untyped.filter(date=date).order_by("pk")
+        for row in rest:
+            for name in COUNTERS:
+                setattr(first, name, getattr(first, name) + getattr(row, name))
+        first.save(update_fields=COUNTERS)
+        untyped.filter(pk__in=[row.pk for row in rest]).delete()
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("station", "0019_idempotencykey_claimed_at"),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_untyped_days, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="traintypedailystats",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("train_type__isnull", True)),
+                fields=("date",),
+                name="traintype_stats_unique_untyped_date",
+            ),
+        ),
+    ]
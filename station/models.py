@@ -1,10 +1,14 @@
 import os
 import uuid
+from datetime import datetime
+from decimal import Decimal
+
 from geopy.distance import geodesic
 
 from django.core.exceptions import ValidationError
-from django.db import models
+from django.db import models, transaction
 from django.conf import settings
+from django.utils import timezone
 from django.utils.text import slugify
 
 
@@ -77,10 +81,21 @@ class Train(models.Model):
     image = models.ImageField(
         null=True, upload_to=train_image_file_path
     )
+    # resized copies of ``image``, written by station.images
+    image_variants = models.JSONField(
+        default=dict, blank=True, editable=False
+    )
+    first_class_cargo_num = models.PositiveIntegerField(default=0)
 
     def __str__(self):
         return self.name
 
+    def cargo_class(self, cargo):
+        """Cargos 1..first_class_cargo_num are first class"""
+        if cargo <= self.first_class_cargo_num:
+            return Tariff.FIRST_CLASS
+        return Tariff.STANDARD_CLASS
+
     class Meta:
         ordering = ["name"]
 
@@ -100,6 +115,73 @@ class Crew(models.Model):
         verbose_name_plural = "crew"
 
 
+class Schedule(models.Model):
+    """Recurring service; its journeys are created on first booking"""
+
+    ALL_WEEKDAYS = 0b1111111
+
+    route = models.ForeignKey(
+        Route, on_delete=models.CASCADE, related_name="schedules"
+    )
+    train = models.ForeignKey(
+        Train, on_delete=models.CASCADE, related_name="schedules"
+    )
+    departure_time = models.TimeField()
+    duration = models.DurationField()
+    weekdays = models.PositiveSmallIntegerField(
+        default=ALL_WEEKDAYS,
+        help_text="Bit mask of running days, Monday is bit 0",
+    )
+    valid_from = models.DateField()
+    valid_until = models.DateField()
+
+    def runs_on(self, date, exception_dates=None):
+        if exception_dates is None:
+            exception_dates = {
+                exception.date for exception in self.exceptions.all()
+            }
+        return (
+            self.valid_from <= date <= self.valid_until
+            and bool(self.weekdays & (1 << date.weekday()))
+            and date not in exception_dates
+        )
+
+    def departure_on(self, date):
+        return timezone.make_aware(
+            datetime.combine(date, self.departure_time)
+        )
+
+    def build_journey(self, date):
+        """Unsaved journey for the occurrence on ``date``"""
+        departure_time = self.departure_on(date)
+        return Journey(
+            route=self.route,
+            train=self.train,
+            schedule=self,
+            departure_time=departure_time,
+            arrival_time=departure_time + self.duration,
+        )
+
+    def __str__(self):
+        return f"{self.train.name} at {self.departure_time}"
+
+    class Meta:
+        ordering = ["departure_time"]
+
+
+class ScheduleException(models.Model):
+    schedule = models.ForeignKey(
+        Schedule, on_delete=models.CASCADE, related_name="exceptions"
+    )
+    date = models.DateField()
+
+    def __str__(self):
+        return f"{self.schedule} does not run on {self.date}"
+
+    class Meta:
+        unique_together = ("schedule", "date")
+
+
 class Journey(models.Model):
     route = models.ForeignKey(
         Route, on_delete=models.CASCADE, related_name="journey_routes"
@@ -110,12 +192,68 @@ class Journey(models.Model):
     departure_time = models.DateTimeField()
     arrival_time = models.DateTimeField()
     crew = models.ManyToManyField(Crew, blank=True)
+    schedule = models.ForeignKey(
+        Schedule,
+        on_delete=models.SET_NULL,
+        related_name="journeys",
+        null=True,
+        blank=True,
+    )
+    # kept in step with tickets by station.inventory
+    capacity = models.PositiveIntegerField(default=0, editable=False)
+    tickets_sold = models.PositiveIntegerField(default=0, editable=False)
+
+    def clean(self):
+        from .scheduling import train_conflicts
+
+        if self.departure_time is None or self.arrival_time is None:
+            # reported by the field validation
+            return
+
+        if self.arrival_time <= self.departure_time:
+            raise ValidationError(
+                {"arrival_time": "Arrival must be after departure."}
+            )
+
+        overlapping = train_conflicts(
+            self.train_id, self.departure_time, self.arrival_time, self.id
+        )
+        if overlapping.exists():
+            raise ValidationError(
+                {
+                    "train": "Train is already assigned "
+                    "to an overlapping journey."
+                }
+            )
+
+    def save(self, *args, **kwargs):
+        self.capacity = self.train.cargo_num * self.train.places_in_cargo
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return f"{self.train.name} ({self.departure_time})"
 
     class Meta:
         ordering = ["-departure_time", "train__name"]
+        indexes = [
+            models.Index(
+                fields=["train", "departure_time"],
+                name="journey_train_departure_idx",
+            ),
+            models.Index(
+                fields=["departure_time"], name="journey_departure_idx"
+            ),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["schedule", "departure_time"],
+                name="unique_schedule_occurrence",
+            ),
+            models.CheckConstraint(
+                check=models.Q(tickets_sold__lte=models.F("capacity")),
+                name="journey_tickets_sold_within_capacity",
+            ),
+        ]
 
 
 class Order(models.Model):
@@ -125,6 +263,16 @@ class Order(models.Model):
     )
 
 
+class TicketQuerySet(models.QuerySet):
+    def bulk_create(self, objs, *args, **kwargs):
+        from .inventory import tickets_added
+
+        with transaction.atomic(using=self.db):
+            objs = super().bulk_create(objs, *args, **kwargs)
+            tickets_added(objs)
+        return objs
+
+
 class Ticket(models.Model):
     cargo = models.IntegerField()
     seat = models.IntegerField()
@@ -134,6 +282,11 @@ class Ticket(models.Model):
     order = models.ForeignKey(
         Order, on_delete=models.CASCADE, related_name="tickets"
     )
+    price = models.DecimalField(
+        max_digits=10, decimal_places=2, null=True, blank=True
+    )
+
+    objects = TicketQuerySet.as_manager()
 
     def clean(self):
         for ticket_attr_value, ticket_attr_name, train_attr_name in [
@@ -159,9 +312,15 @@ class Ticket(models.Model):
         update_fields=None,
     ):
         self.full_clean()
-        super(Ticket, self).save(
-            force_insert, force_update, using, update_fields
-        )
+        if self.price is None:
+            from .fares import quote_tickets
+
+            quote_tickets([self])
+        # the journey's tickets_sold is bumped by a post_save receiver
+        with transaction.atomic(using=using):
+            super(Ticket, self).save(
+                force_insert, force_update, using, update_fields
+            )
 
     def __str__(self):
         return f"{str(self.journey)} (cargo: {self.cargo}, seat: {self.seat})"
@@ -169,3 +328,227 @@ class Ticket(models.Model):
     class Meta:
         unique_together = ("journey", "cargo", "seat")
         ordering = ["journey", "cargo", "seat"]
+
+
+class Tariff(models.Model):
+    STANDARD_CLASS = "standard"
+    FIRST_CLASS = "first"
+
+    train_type = models.OneToOneField(
+        TrainType,
+        on_delete=models.CASCADE,
+        related_name="tariff",
+        null=True,
+        blank=True,
+    )
+    base_fare = models.DecimalField(
+        max_digits=8, decimal_places=2, default=Decimal("0")
+    )
+    price_per_km = models.DecimalField(max_digits=8, decimal_places=4)
+    first_class_multiplier = models.DecimalField(
+        max_digits=4, decimal_places=2, default=Decimal("1.5")
+    )
+
+    def __str__(self):
+        if self.train_type_id is None:
+            return "Default tariff"
+        return f"Tariff for {self.train_type}"
+
+
+class FareBand(models.Model):
+    """Departure-time band; a band with start > end wraps past midnight"""
+
+    name = models.CharField(max_length=255, unique=True)
+    start_time = models.TimeField()
+    end_time = models.TimeField()
+    multiplier = models.DecimalField(max_digits=4, decimal_places=2)
+
+    def covers(self, time):
+        if self.start_time <= self.end_time:
+            return self.start_time <= time < self.end_time
+        return time >= self.start_time or time < self.end_time
+
+    def __str__(self):
+        return f"{self.name} ({self.start_time}-{self.end_time})"
+
+    class Meta:
+        ordering = ["start_time"]
+
+
+class RouteDailyStats(models.Model):
+    """Incrementally maintained per-route, per-day sales rollup"""
+
+    route = models.ForeignKey(
+        Route, on_delete=models.CASCADE, related_name="daily_stats"
+    )
+    date = models.DateField()
+    journeys = models.IntegerField(default=0)
+    seats_offered = models.IntegerField(default=0)
+    tickets_sold = models.IntegerField(default=0)
+    revenue = models.DecimalField(
+        max_digits=14, decimal_places=2, default=Decimal("0")
+    )
+
+    @property
+    def load_factor(self):
+        if not self.seats_offered:
+            return None
+        return round(self.tickets_sold / self.seats_offered, 4)
+
+    class Meta:
+        unique_together = ("route", "date")
+        ordering = ["date", "route"]
+        verbose_name_plural = "route daily stats"
+
+
+class TrainTypeDailyStats(models.Model):
+    """Incrementally maintained per-train-type, per-day sales rollup"""
+
+    train_type = models.ForeignKey(
+        TrainType,
+        on_delete=models.CASCADE,
+        related_name="daily_stats",
+        null=True,
+    )
+    date = models.DateField()
+    journeys = models.IntegerField(default=0)
+    seats_offered = models.IntegerField(default=0)
+    tickets_sold = models.IntegerField(default=0)
+    revenue = models.DecimalField(
+        max_digits=14, decimal_places=2, default=Decimal("0")
+    )
+
+    class Meta:
+        unique_together = ("train_type", "date")
+        constraints = [
+            # NULLs are distinct in unique_together: one untyped row a day
+            models.UniqueConstraint(
+                fields=["date"],
+                condition=models.Q(train_type__isnull=True),
+                name="traintype_stats_unique_untyped_date",
+            ),
+        ]
+        ordering = ["date", "train_type"]
+        verbose_name_plural = "train type daily stats"
+
+
+class OutboxEvent(models.Model):
+    """Order/ticket event written in the same transaction as the change"""
+
+    event_type = models.CharField(max_length=64)
+    payload = models.JSONField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    available_at = models.DateTimeField(default=timezone.now)
+    dispatched_at = models.DateTimeField(null=True, blank=True)
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+
+    def __str__(self):
+        return f"{self.event_type} #{self.id}"
+
+    class Meta:
+        ordering = ["id"]
+        indexes = [
+            models.Index(
+                fields=["available_at"],
+                condition=models.Q(dispatched_at__isnull=True),
+                name="outbox_pending_idx",
+            ),
+        ]
+
+
+class IdempotencyKey(models.Model):
+    """Stored outcome of a create request, replayed for retries"""
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE
+    )
+    key = models.CharField(max_length=255)
+    fingerprint = models.CharField(max_length=64)
+    status_code = models.PositiveSmallIntegerField(null=True)
+    response = models.JSONField(null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    # when the request running the create took the key
+    claimed_at = models.DateTimeField(default=timezone.now)
+    expires_at = models.DateTimeField(db_index=True)
+
+    @property
+    def in_flight(self):
+        return self.status_code is None
+
+    def __str__(self):
+        return self.key
+
+    class Meta:
+        unique_together = ("user", "key")
+
+
+class ArchivedJourney(models.Model):
+    """Completed journey moved out of Journey by station.archive"""
+
+    id = models.BigIntegerField(primary_key=True)
+    route = models.ForeignKey(
+        Route, on_delete=models.CASCADE, related_name="archived_journeys"
+    )
+    train = models.ForeignKey(
+        Train, on_delete=models.CASCADE, related_name="archived_journeys"
+    )
+    departure_time = models.DateTimeField()
+    arrival_time = models.DateTimeField()
+    crew = models.ManyToManyField(
+        Crew, blank=True, related_name="archived_journeys"
+    )
+    schedule = models.ForeignKey(
+        Schedule,
+        on_delete=models.SET_NULL,
+        related_name="archived_journeys",
+        null=True,
+        blank=True,
+    )
+    capacity = models.PositiveIntegerField(default=0)
+    tickets_sold = models.PositiveIntegerField(default=0)
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    @property
+    def tickets_available(self):
+        return self.capacity - self.tickets_sold
+
+    def __str__(self):
+        return f"{self.train.name} ({self.departure_time})"
+
+    class Meta:
+        ordering = ["-departure_time"]
+        verbose_name_plural = "archived journeys"
+
+
+class ArchivedTicket(models.Model):
+    """Ticket of an archived journey; still part of its order's history"""
+
+    id = models.BigIntegerField(primary_key=True)
+    cargo = models.IntegerField()
+    seat = models.IntegerField()
+    journey = models.ForeignKey(
+        ArchivedJourney, on_delete=models.CASCADE, related_name="tickets"
+    )
+    order = models.ForeignKey(
+        Order, on_delete=models.CASCADE, related_name="archived_tickets"
+    )
+    price = models.DecimalField(
+        max_digits=10, decimal_places=2, null=True, blank=True
+    )
+
+    def __str__(self):
+        return f"{str(self.journey)} (cargo: {self.cargo}, seat: {self.seat})"
+
+    class Meta:
+        ordering = ["journey", "cargo", "seat"]
+
+
+class CacheVersion(models.Model):
+    """Version stamp of a process-local cache, bumped when its data changes"""
+
+    name = models.CharField(max_length=50, primary_key=True)
+    version = models.PositiveBigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.name} v{self.version}"
@@ -0,0 +1,209 @@
+"""
+Transactional outbox for order and ticket events.
+
+Events are inserted by signal handlers in the transaction that changes the
+order or ticket, so booking never waits on a downstream system. The
+``dispatch_outbox`` command drains pending events in id order and hands
+each batch to every sink configured in ``settings.OUTBOX_SINKS``.
+
+Delivery is at least once: an event is marked dispatched only after every
+sink accepted its batch, so consumers must de-duplicate on ``id``. Batches
+are claimed in a short transaction of their own and marked in another, so
+no row lock is held while a sink is slow.
+"""
+import json
+import time
+import urllib.request
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import OutboxEvent
+
+
+MAX_RETRY_DELAY = 300
+# longer than any sink may take to accept a batch
+CLAIM_TIMEOUT = timedelta(minutes=5)
+
+
+def record(event_type, payload):
+    return OutboxEvent.objects.create(
+        event_type=event_type,
+        payload=json.loads(json.dumps(payload, cls=DjangoJSONEncoder)),
+    )
+
+
+def order_payload(order):
+    return {
+        "id": order.id,
+        "user_id": order.user_id,
+        "created_at": order.created_at,
+    }
+
+
+def ticket_payload(ticket):
+    return {
+        "id": ticket.id,
+        "order_id": ticket.order_id,
+        "journey_id": ticket.journey_id,
+        "cargo": ticket.cargo,
+        "seat": ticket.seat,
+        "price": ticket.price,
+    }
+
+
+def event_data(event):
+    return {
+        "id": event.id,
+        "type": event.event_type,
+        "created_at": event.created_at,
+        "payload": event.payload,
+    }
+
+
+class JsonlSink:
+    """Appends one JSON object per event to a local file"""
+
+    def __init__(self, path):
+        self.path = Path(path)
+
+    def send(self, events):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, "a", encoding="utf-8") as file:
+            for event in events:
+                line = json.dumps(event_data(event), cls=DjangoJSONEncoder)
+                file.write(line + "\n")
+
+
+class HttpSink:
+    """POSTs each batch as a JSON array; any non-2xx response is a failure"""
+
+    def __init__(self, url, timeout=10, headers=None):
+        self.url = url
+        self.timeout = timeout
+        self.headers = headers or {}
+
+    def send(self, events):
+        body = json.dumps(
+            [event_data(event) for event in events], cls=DjangoJSONEncoder
+        ).encode()
+        request = urllib.request.Request(
+            self.url,
+            data=body,
+            method="POST",
+            headers={"Content-Type": "application/json", **self.headers},
+        )
+        with urllib.request.urlopen(request, timeout=self.timeout):
+            pass
+
+
+def load_sinks(config=None):
+    if config is None:
+        config = getattr(settings, "OUTBOX_SINKS", [])
+    return [
+        import_string(sink["BACKEND"])(**sink.get("OPTIONS", {}))
+        for sink in config
+    ]
+
+
+def retry_delay(attempts):
+    return min(2**attempts, MAX_RETRY_DELAY)
+
+
+def claim_batch(batch_size=100):
+    """
+    Take up to ``batch_size`` due events for ``CLAIM_TIMEOUT``.
+
+    The claim is committed at once, so no lock is held while sinks run;
+    events of a dispatcher that dies before marking them become due again
+    when the claim runs out.
+    """
+    with transaction.atomic():
+        events = list(
+            OutboxEvent.objects.select_for_update(skip_locked=True)
+            .filter(
+                dispatched_at__isnull=True,
+                available_at__lte=timezone.now(),
+            )
+            .order_by("id")[:batch_size]
+        )
+        if events:
+            OutboxEvent.objects.filter(
+                id__in=[event.id for event in events]
+            ).update(available_at=timezone.now() + CLAIM_TIMEOUT)
+    return events
+
+
+def dispatch_batch(sinks, batch_size=100):
+    """
+    Send one batch of due events to all sinks.
+
+    Returns the number of events dispatched; raises the sink error after
+    scheduling the batch for a retry with exponential backoff.
+    """
+    events = claim_batch(batch_size)
+    if not events:
+        return 0
+
+    pending = OutboxEvent.objects.filter(id__in=[event.id for event in events])
+    try:
+        for sink in sinks:
+            sink.send(events)
+    except Exception as exc:
+        attempts = max(event.attempts for event in events) + 1
+        pending.update(
+            attempts=attempts,
+            available_at=timezone.now()
+            + timedelta(seconds=retry_delay(attempts)),
+            last_error=repr(exc)[:1000],
+        )
+        raise
+
+    pending.update(dispatched_at=timezone.now())
+    return len(events)
+
+
+def run_dispatcher(
+    sinks,
+    batch_size=100,
+    poll_interval=1.0,
+    once=False,
+    on_error=None,
+):
+    """
+    Drain the outbox until it is empty (``once``) or forever.
+
+    Full batches are followed immediately by the next one; a failing sink
+    makes the loop back off exponentially so it does not hammer a
+    downstream system that is already struggling.
+    """
+    failures = 0
+    while True:
+        try:
+            sent = dispatch_batch(sinks, batch_size)
+        except Exception as exc:
+            failures += 1
+            if on_error:
+                on_error(exc)
+            if once:
+                return
+            time.sleep(retry_delay(failures))
+            continue
+
+        failures = 0
+        if sent == batch_size:
+            continue
+        if once:
+            return
+        time.sleep(poll_interval)
+
+
+def purge_dispatched(older_than):
+    return OutboxEvent.objects.filter(
+        dispatched_at__lt=timezone.now() - older_than
+    ).delete()[0]
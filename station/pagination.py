@@ -0,0 +1,187 @@
+"""
+Row counts that stay cheap on very large tables.
+
+On PostgreSQL an exact ``COUNT(*)`` reads every matching row. Past
+``ESTIMATE_THRESHOLD`` rows the planner's estimate is used instead: the
+table's ``reltuples`` for an unfiltered queryset, the row estimate of its
+``EXPLAIN`` plan otherwise. Small results get an exact count.
+
+``EstimatedCountPaginator`` applies this to admin changelists, where
+other databases fall back to exact counts. ``EstimatedCountPagination``
+applies it to API lists, where other databases count at most
+``COUNT_CAP`` rows and report e.g. ``"1000+"`` beyond that.
+"""
+import json
+
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models.query import QuerySet
+from django.utils.functional import cached_property
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+ESTIMATE_THRESHOLD = 100_000
+COUNT_CAP = 1000
+
+
+def planner_estimate(queryset):
+    """Estimated row count, ``None`` when the database cannot tell"""
+    connection = connections[queryset.db]
+    if connection.vendor != "postgresql":
+        return None
+
+    query = queryset.order_by().query
+    with connection.cursor() as cursor:
+        if not query.where and not query.distinct and not query.is_sliced:
+            cursor.execute(
+                "SELECT reltuples::bigint FROM pg_class "
+                "WHERE oid = %s::regclass",
+                [queryset.model._meta.db_table],
+            )
+            row = cursor.fetchone()
+            # -1 until the table has been vacuumed or analyzed
+            if row and row[0] >= 0:
+                return row[0]
+
+        sql, params = query.sql_with_params()
+        cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+def estimated_count(queryset, threshold=ESTIMATE_THRESHOLD):
+    estimate = planner_estimate(queryset)
+    if estimate is None or estimate < threshold:
+        return queryset.count()
+    return estimate
+
+
+class EstimatedCountPaginator(Paginator):
+    """Paginator whose count is estimated for very large querysets"""
+
+    @cached_property
+    def count(self):
+        if not hasattr(self.object_list, "query"):
+            return super().count
+        return estimated_count(self.object_list)
+
+
+class EstimatedCountPagination(PageNumberPagination):
+    """
+    Page-number pagination, used only when ``page`` or ``page_size`` is
+    given, so unpaginated clients keep getting plain lists.
+
+    One extra row is fetched to know whether a next page exists, so the
+    count does not drive the links. ``count_exact`` tells whether
+    ``count`` is exact; ``?count=exact`` asks for an exact count.
+    """
+
+    page_size = 50
+    page_size_query_param = "page_size"
+    max_page_size = 500
+    count_query_param = "count"
+    display_page_controls = False
+
+    def paginate_queryset(self, queryset, request, view=None):
+        params = request.query_params
+        if (
+            self.page_query_param not in params
+            and self.page_size_query_param not in params
+        ):
+            return None
+
+        self.request = request
+        page_size = self.get_page_size(request)
+        try:
+            self.number = int(params.get(self.page_query_param, 1))
+        except ValueError:
+            self.number = 0
+        if self.number < 1:
+            raise NotFound(self.invalid_page_message)
+
+        offset = (self.number - 1) * page_size
+        rows = list(queryset[offset:offset + page_size + 1])
+        self.has_next = len(rows) > page_size
+        rows = rows[:page_size]
+        if self.number > 1 and not rows:
+            raise NotFound(self.invalid_page_message)
+
+        self.count, self.count_exact = self.get_count(
+            queryset, offset + len(rows), page_size
+        )
+        return rows
+
+    def get_count(self, queryset, seen, page_size):
+        """``(count, exact)``; ``seen`` rows are known to exist"""
+        if not self.has_next:
+            return seen, True
+        if not isinstance(queryset, QuerySet):
+            return len(queryset), True
+        if self.request.query_params.get(self.count_query_param) == "exact":
+            return queryset.count(), True
+
+        estimate = planner_estimate(queryset)
+        if estimate is not None:
+            if estimate < ESTIMATE_THRESHOLD:
+                return queryset.count(), True
+            # estimates can be low, the current page is known to exist
+            return max(estimate, seen + 1), False
+
+        cap = max(COUNT_CAP, seen + page_size)
+        count = queryset[: cap + 1].count()
+        if count > cap:
+            return f"{cap}+", False
+        return count, True
+
+    def get_paginated_response(self, data):
+        return Response(
+            {
+                "count": self.count,
+                "count_exact": self.count_exact,
+                "next": self.get_next_link(),
+                "previous": self.get_previous_link(),
+                "results": data,
+            }
+        )
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.page_query_param, self.number + 1)
+
+    def get_previous_link(self):
+        if self.number == 1:
+            return None
+        url = self.request.build_absolute_uri()
+        if self.number == 2:
+            return remove_query_param(url, self.page_query_param)
+        return replace_query_param(url, self.page_query_param, self.number - 1)
+
+    def get_paginated_response_schema(self, schema):
+        response = super().get_paginated_response_schema(schema)
+        properties = response["properties"]
+        properties["count"] = {
+            "oneOf": [
+                {"type": "integer", "example": 123},
+                {"type": "string", "example": f"{COUNT_CAP}+"},
+            ]
+        }
+        properties["count_exact"] = {"type": "boolean"}
+        return response
+
+    def get_schema_operation_parameters(self, view):
+        return super().get_schema_operation_parameters(view) + [
+            {
+                "name": self.count_query_param,
+                "required": False,
+                "in": "query",
+                "description": "Set to 'exact' for an exact count",
+                "schema": {"type": "string", "enum": ["exact"]},
+            }
+        ]
@@ -0,0 +1,255 @@
+"""
+On-demand request profiling.
+
+``ProfilingMiddleware`` runs a request under ``cProfile`` when it carries
+a valid ``X-Profile`` header or is picked by ``PROFILING["SAMPLE_RATE"]``.
+The header value is a token signed with ``SECRET_KEY`` that staff get
+from ``POST /api/station/profiles/token/``; it names the staff user and
+expires after ``TOKEN_MAX_AGE`` seconds. Other requests pay for one
+header lookup and nothing else.
+
+Each profile is stored as ``<id>.prof`` (``pstats`` format, readable by
+``python -m pstats``, snakeviz or flameprof) next to ``<id>.json`` with
+the request, every SQL statement and its duration, ``EXPLAIN`` output for
+the slowest statements and the time spent building serializer data.
+"""
+import cProfile
+import json
+import os
+import pstats
+import random
+import re
+import time
+import uuid
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core import signing
+from django.db import DatabaseError, connection
+
+DEFAULT_PROFILING = {
+    "DIR": None,
+    "SAMPLE_RATE": 0.0,
+    "PATH_PREFIXES": ("/api/",),
+    "TOKEN_MAX_AGE": 60 * 60,
+    "MAX_PROFILES": 200,
+    "MAX_EXPLAIN": 5,
+}
+HEADER = "HTTP_X_PROFILE"
+SALT = "station.profiling"
+PROFILE_ID = re.compile(r"^[0-9a-f]{32}$")
+SERIALIZERS_FILE = os.path.join("rest_framework", "serializers.py")
+
+
+def profiling_settings():
+    return {**DEFAULT_PROFILING, **getattr(settings, "PROFILING", {})}
+
+
+def profile_dir():
+    directory = profiling_settings()["DIR"]
+    return Path(directory) if directory else None
+
+
+def make_token(user):
+    return signing.dumps(user.pk, salt=SALT)
+
+
+def token_user(token):
+    """Staff user the token was issued to, ``None`` if it is not valid"""
+    try:
+        user_id = signing.loads(
+            token,
+            salt=SALT,
+            max_age=profiling_settings()["TOKEN_MAX_AGE"],
+        )
+    except signing.BadSignature:
+        return None
+    return (
+        get_user_model()
+        .objects.filter(pk=user_id, is_staff=True, is_active=True)
+        .first()
+    )
+
+
+class QueryRecorder:
+    """Execute wrapper keeping every statement with its duration"""
+
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append(
+                {
+                    "sql": sql,
+                    "params": None if many else params,
+                    "ms": (time.perf_counter() - started) * 1000,
+                }
+            )
+
+
+def explain(sql, params):
+    prefix = connection.ops.explain_query_prefix()
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(f"{prefix} {sql}", params)
+            rows = cursor.fetchall()
+    except DatabaseError as error:
+        return f"EXPLAIN failed: {error}"
+    return "\n".join(" ".join(map(str, row)) for row in rows)
+
+
+def serializer_ms(stats):
+    """Time inside the outermost ``Serializer.data`` call"""
+    times = [
+        row[3]
+        for (filename, _, name), row in stats.stats.items()
+        if name == "data" and filename.endswith(SERIALIZERS_FILE)
+    ]
+    return max(times, default=0.0) * 1000
+
+
+class ProfilingMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        options = profiling_settings()
+        if not options["DIR"]:
+            return self.get_response(request)
+
+        token = request.META.get(HEADER)
+        if token:
+            user = token_user(token)
+            if user is None:
+                return self.get_response(request)
+            trigger = f"user:{user.pk}"
+        elif (
+            options["SAMPLE_RATE"]
+            and request.path.startswith(tuple(options["PATH_PREFIXES"]))
+            and random.random() < options["SAMPLE_RATE"]
+        ):
+            trigger = "sample"
+        else:
+            return self.get_response(request)
+
+        return self.profile(request, trigger, options)
+
+    def profile(self, request, trigger, options):
+        profiler = cProfile.Profile()
+        recorder = QueryRecorder()
+        started = time.perf_counter()
+        with connection.execute_wrapper(recorder):
+            profiler.enable()
+            try:
+                response = self.get_response(request)
+            finally:
+                profiler.disable()
+        duration = (time.perf_counter() - started) * 1000
+
+        profile_id = uuid.uuid4().hex
+        save_profile(
+            profile_id,
+            profiler,
+            {
+                "id": profile_id,
+                "ts": time.time(),
+                "trigger": trigger,
+                "method": request.method,
+                "path": request.get_full_path(),
+                "status": response.status_code,
+                "duration_ms": round(duration, 2),
+            },
+            recorder.queries,
+            options,
+        )
+        response["X-Profile-Id"] = profile_id
+        return response
+
+
+def save_profile(profile_id, profiler, meta, queries, options):
+    directory = Path(options["DIR"])
+    directory.mkdir(parents=True, exist_ok=True)
+
+    stats = pstats.Stats(profiler)
+    stats.dump_stats(directory / f"{profile_id}.prof")
+
+    slowest = sorted(
+        (
+            query
+            for query in queries
+            if query["sql"].lstrip().upper().startswith("SELECT")
+            and query["params"] is not None
+        ),
+        key=lambda query: query["ms"],
+        reverse=True,
+    )[: options["MAX_EXPLAIN"]]
+    explains = [
+        {"sql": query["sql"], "plan": explain(query["sql"], query["params"])}
+        for query in slowest
+    ]
+
+    # parameters can hold personal data, only the statements are stored
+    meta.update(
+        {
+            "sql_ms": round(sum(query["ms"] for query in queries), 2),
+            "serializer_ms": round(serializer_ms(stats), 2),
+            "queries": [
+                {"sql": query["sql"], "ms": round(query["ms"], 3)}
+                for query in queries
+            ],
+            "explain": explains,
+        }
+    )
+    with (directory / f"{profile_id}.json").open("w") as file:
+        json.dump(meta, file)
+
+    prune(directory, options["MAX_PROFILES"])
+
+
+def prune(directory, keep):
+    profiles = sorted(
+        directory.glob("*.json"),
+        key=lambda path: path.stat().st_mtime,
+        reverse=True,
+    )
+    for path in profiles[keep:]:
+        path.unlink(missing_ok=True)
+        path.with_suffix(".prof").unlink(missing_ok=True)
+
+
+def list_profiles():
+    """Summaries of stored profiles, newest first"""
+    directory = profile_dir()
+    if directory is None or not directory.exists():
+        return []
+
+    summaries = []
+    for path in directory.glob("*.json"):
+        with path.open() as file:
+            meta = json.load(file)
+        meta["query_count"] = len(meta.pop("queries"))
+        meta.pop("explain")
+        summaries.append(meta)
+    return sorted(summaries, key=lambda meta: meta["ts"], reverse=True)
+
+
+def profile_file(profile_id, suffix):
+    """Path of a stored profile file, ``None`` if there is no such file"""
+    directory = profile_dir()
+    if directory is None or not PROFILE_ID.match(profile_id):
+        return None
+    path = directory / f"{profile_id}{suffix}"
+    return path if path.exists() else None
+
+
+def load_profile(profile_id):
+    path = profile_file(profile_id, ".json")
+    if path is None:
+        return None
+    with path.open() as file:
+        return json.load(file)
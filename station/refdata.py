@@ -0,0 +1,107 @@
+"""
+Process-local cache of reference data.
+
+Stations, train types and trains are few and rarely change, yet almost
+every response names some of them. ``reference_data()`` keeps all three
+in memory, by id and by name, so serializers and filters look them up
+instead of joining their tables.
+
+Every change bumps the ``reference`` stamp (see ``station.versions``), so
+a change made by one worker is seen by all of them from their next
+request on. Writes that skip model signals (``bulk_create``,
+``update()``, raw SQL) must call ``changed()`` themselves.
+"""
+from contextvars import ContextVar
+
+from django.db import transaction
+
+from . import versions
+from .models import Station, Train, TrainType
+
+NAME = "reference"
+MODELS = (Station, TrainType, Train)
+
+_data = None
+# whether the stamp was read again during the current request, after a
+# lookup missed
+_rechecked = ContextVar("station_refdata_rechecked", default=False)
+
+
+class ReferenceData:
+    def __init__(self, version):
+        self.version = version
+        self.by_id = {}
+        self.by_name = {}
+        for model in MODELS:
+            objects = list(model.objects.all())
+            self.by_id[model] = {obj.pk: obj for obj in objects}
+            self.by_name[model] = {obj.name: obj for obj in objects}
+
+
+def reference_data():
+    global _data
+
+    data = _data
+    version = versions.current(NAME)
+    if data is None or data.version != version:
+        data = _data = ReferenceData(version)
+    return data
+
+
+def invalidate_reference_data():
+    global _data
+    _data = None
+
+
+def changed():
+    """Bump the stamp so every process rebuilds its copy"""
+    versions.bump(NAME)
+    invalidate_reference_data()
+    # a copy rebuilt before the commit would not have seen the change
+    transaction.on_commit(invalidate_reference_data)
+
+
+def _lookup(index, model, key):
+    obj = getattr(reference_data(), index)[model].get(key)
+    if obj is None and key is not None and not _rechecked.get():
+        # maybe created by another process since the stamp was read
+        versions.recheck()
+        _rechecked.set(True)
+        obj = getattr(reference_data(), index)[model].get(key)
+    return obj
+
+
+def get(model, pk):
+    """Cached ``model`` instance with primary key ``pk``, or ``None``"""
+    return _lookup("by_id", model, pk)
+
+
+def get_by_name(model, name):
+    return _lookup("by_name", model, name)
+
+
+def ids_matching(model, text):
+    """Ids of ``model`` rows whose name contains ``text``, ignoring case"""
+    text = text.casefold()
+    return [
+        pk
+        for pk, obj in reference_data().by_id[model].items()
+        if text in obj.name.casefold()
+    ]
+
+
+def attach(instance, *fields):
+    """Set foreign keys of ``instance`` to cached objects, saving joins"""
+    for name in fields:
+        field = instance._meta.get_field(name)
+        if field.is_cached(instance):
+            continue
+        related = get(field.related_model, getattr(instance, field.attname))
+        if related is not None:
+            field.set_cached_value(instance, related)
+
+
+def recheck():
+    """Read the stamp again on next use; called when a request starts"""
+    versions.recheck()
+    _rechecked.set(False)
@@ -0,0 +1,231 @@
+"""
+Occupancy and revenue rollups.
+
+``RouteDailyStats`` and ``TrainTypeDailyStats`` are bumped with ``F()``
+updates in the same transaction that creates or deletes journeys and
+tickets, so reports read a few rows per day instead of aggregating tickets.
+The day is the local departure date of the journey. ``backfill`` rebuilds
+the rollups from scratch, e.g. after trains change type or capacity; it
+counts archived journeys and tickets as well as the live ones.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import (
+    ArchivedJourney,
+    ArchivedTicket,
+    Journey,
+    Ticket,
+    RouteDailyStats,
+    TrainTypeDailyStats,
+)
+
+# changes collected by batched(), by (model, route or train type id, date)
+_pending = ContextVar("station_rollups_pending", default=None)
+
+
+def _bump(model, keys, deltas):
+    """Add ``deltas`` to the rollup row identified by ``keys``"""
+    changes = {name: F(name) + value for name, value in deltas.items()}
+    if model.objects.filter(**keys).update(**changes):
+        return
+
+    try:
+        with transaction.atomic():
+            model.objects.create(**keys, **deltas)
+    except IntegrityError:
+        model.objects.filter(**keys).update(**changes)
+
+
+def departure_date(journey):
+    departure_time = Journey._meta.get_field("departure_time").to_python(
+        journey.departure_time
+    )
+    if timezone.is_naive(departure_time):
+        departure_time = timezone.make_aware(departure_time)
+    return timezone.localdate(departure_time)
+
+
+def journey_key(journey):
+    """What a journey's rollup rows depend on"""
+    return (
+        journey.route_id,
+        journey.train.train_type_id,
+        departure_date(journey),
+    )
+
+
+def _row_order(row):
+    """Lock order of rollup rows: route rows first, each table by key"""
+    model, owner_id, date = row
+    return model is TrainTypeDailyStats, owner_id is not None, owner_id, date
+
+
+def _flush(pending):
+    for row in sorted(pending, key=_row_order):
+        deltas = pending[row]
+        if not any(deltas.values()):
+            continue
+        model, owner_id, date = row
+        owner = "route_id" if model is RouteDailyStats else "train_type_id"
+        _bump(model, {owner: owner_id, "date": date}, deltas)
+
+
+@contextmanager
+def batched():
+    """
+    Collect rollup changes and write them on exit, in ``_row_order``.
+
+    Use inside the transaction that books several tickets: every writer
+    then updates rollup rows in the same order, so two of them cannot
+    deadlock by each holding a row the other one needs next.
+    """
+    if _pending.get() is not None:
+        yield
+        return
+
+    pending = {}
+    token = _pending.set(pending)
+    try:
+        yield
+    finally:
+        _pending.reset(token)
+    _flush(pending)
+
+
+def apply(key, sign=1, journeys=0, seats=0, tickets=0, revenue=None):
+    route_id, train_type_id, date = key
+    deltas = {
+        "journeys": sign * journeys,
+        "seats_offered": sign * seats,
+        "tickets_sold": sign * tickets,
+        "revenue": sign * (revenue or Decimal("0")),
+    }
+
+    pending = _pending.get()
+    flush = pending is None
+    if flush:
+        pending = {}
+    for row in [
+        (RouteDailyStats, route_id, date),
+        (TrainTypeDailyStats, train_type_id, date),
+    ]:
+        totals = pending.setdefault(row, dict.fromkeys(deltas, 0))
+        for name, value in deltas.items():
+            totals[name] += value
+    if flush:
+        _flush(pending)
+
+
+def journey_added(journey, sign=1):
+    apply(
+        journey_key(journey),
+        sign,
+        journeys=1,
+        seats=journey.train.cargo_num * journey.train.places_in_cargo,
+    )
+
+
+def journey_moved(journey, old_key, old_seats):
+    """Move a journey and its tickets from ``old_key`` to its current key"""
+    sold = journey.tickets.aggregate(count=Count("id"), revenue=Sum("price"))
+    with batched():
+        apply(
+            old_key,
+            -1,
+            journeys=1,
+            seats=old_seats,
+            tickets=sold["count"],
+            revenue=sold["revenue"],
+        )
+        apply(
+            journey_key(journey),
+            journeys=1,
+            seats=journey.train.cargo_num * journey.train.places_in_cargo,
+            tickets=sold["count"],
+            revenue=sold["revenue"],
+        )
+
+
+def ticket_added(ticket, sign=1):
+    apply(
+        journey_key(ticket.journey), sign, tickets=1, revenue=ticket.price
+    )
+
+
+def ticket_moved(ticket, old_journey, old_price):
+    """Move a ticket from ``old_journey`` and ``old_price`` to its current"""
+    with batched():
+        apply(journey_key(old_journey), -1, tickets=1, revenue=old_price)
+        ticket_added(ticket)
+
+
+def _sources(start, end):
+    """Hot and archived journeys and tickets, with their seat counts"""
+    for journey_model, ticket_model, seats in [
+        (Journey, Ticket, F("train__cargo_num") * F("train__places_in_cargo")),
+        # archived journeys keep the capacity they ran with
+        (ArchivedJourney, ArchivedTicket, F("capacity")),
+    ]:
+        journeys = journey_model.objects.annotate(
+            date=TruncDate("departure_time")
+        )
+        tickets = ticket_model.objects.annotate(
+            date=TruncDate("journey__departure_time")
+        )
+        if start:
+            journeys = journeys.filter(date__gte=start)
+            tickets = tickets.filter(date__gte=start)
+        if end:
+            journeys = journeys.filter(date__lte=end)
+            tickets = tickets.filter(date__lte=end)
+        yield journeys, tickets, seats
+
+
+def backfill(start=None, end=None):
+    """Recompute rollups for local departure dates in ``[start, end]``"""
+    counted = 0
+    for model, key, group_path in [
+        (RouteDailyStats, "route_id", "route_id"),
+        (TrainTypeDailyStats, "train_type_id", "train__train_type_id"),
+    ]:
+        rows = {}
+
+        def stats(group, date):
+            return rows.setdefault(
+                (group, date), model(**{key: group}, date=date)
+            )
+
+        for journeys, tickets, seats in _sources(start, end):
+            for row in journeys.values(
+                "date", group=F(group_path)
+            ).annotate(journeys=Count("id"), seats_offered=Sum(seats)):
+                day = stats(row["group"], row["date"])
+                day.journeys += row["journeys"]
+                day.seats_offered += row["seats_offered"] or 0
+
+            for row in tickets.values(
+                "date", group=F(f"journey__{group_path}")
+            ).annotate(tickets_sold=Count("id"), revenue=Sum("price")):
+                day = stats(row["group"], row["date"])
+                day.tickets_sold += row["tickets_sold"]
+                day.revenue += row["revenue"] or Decimal("0")
+
+        with transaction.atomic():
+            stale = model.objects.all()
+            if start:
+                stale = stale.filter(date__gte=start)
+            if end:
+                stale = stale.filter(date__lte=end)
+            stale.delete()
+            model.objects.bulk_create(rows.values(), batch_size=1000)
+
+        counted += len(rows)
+
+    return counted
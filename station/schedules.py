@@ -0,0 +1,85 @@
+"""
+Recurring schedules.
+
+Occurrences of a schedule are served as unsaved ``Journey`` objects and
+only written to the journey table by ``materialize`` when the first ticket
+for them is sold.
+"""
+from .models import Journey, Schedule
+from .scheduling import lock_resources, train_conflicts
+
+
+def schedules_running_on(date, train_id=None):
+    schedules = (
+        Schedule.objects.filter(valid_from__lte=date, valid_until__gte=date)
+        .select_related("train", "route__source", "route__destination")
+        .prefetch_related("exceptions")
+    )
+    if train_id is not None:
+        schedules = schedules.filter(train_id=train_id)
+
+    return [schedule for schedule in schedules if schedule.runs_on(date)]
+
+
+def virtual_journeys(date, materialized, train_id=None):
+    """
+    Unsaved journeys for schedule occurrences on ``date``.
+
+    Occurrences already present in ``materialized`` are skipped. Virtual
+    journeys have no tickets, so all their places are available.
+    """
+    taken = {
+        (journey.schedule_id, journey.departure_time)
+        for journey in materialized
+        if journey.schedule_id is not None
+    }
+
+    journeys = []
+    for schedule in schedules_running_on(date, train_id):
+        journey = schedule.build_journey(date)
+        if (schedule.id, journey.departure_time) in taken:
+            continue
+
+        journey.tickets_available = (
+            schedule.train.cargo_num * schedule.train.places_in_cargo
+        )
+        journeys.append(journey)
+
+    return journeys
+
+
+class OccurrenceConflict(Exception):
+    """The train is already busy during a schedule occurrence"""
+
+
+def materialize(schedule, date):
+    """
+    Journey row for the occurrence on ``date``, creating it if needed.
+
+    Must be called inside a transaction. Creating the row locks the train
+    and checks it against the train's other journeys, like an edited
+    journey is; ``OccurrenceConflict`` is raised when they overlap.
+    """
+    journey = schedule.build_journey(date)
+    lookup = Journey.objects.filter(
+        schedule=schedule, departure_time=journey.departure_time
+    )
+    existing = lookup.first()
+    if existing is None:
+        # writers of the same train queue up here; look again once we
+        # hold the lock, a concurrent order may have created the row
+        lock_resources(schedule.train_id)
+        existing = lookup.first()
+    if existing is not None:
+        return existing
+
+    conflict = train_conflicts(
+        schedule.train_id, journey.departure_time, journey.arrival_time
+    ).first()
+    if conflict is not None:
+        raise OccurrenceConflict(
+            f"Train is already assigned to journey {conflict.id} "
+            "at this time."
+        )
+    journey.save()
+    return journey
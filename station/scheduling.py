@@ -0,0 +1,244 @@
+"""
+Train and crew scheduling conflicts.
+
+Two journeys conflict when they share a train or a crew member and their
+``[departure_time, arrival_time)`` intervals overlap. Single journeys are
+checked with range queries on the ``(train, departure_time)`` index; whole
+timetables are audited with a sweep over intervals streamed in
+``(resource, departure_time)`` order. Crew availability is answered from a
+per-crew busy-interval index. Assignment changes bump the ``crew`` stamp
+(see ``station.versions``): the writing process reloads only the crew
+members concerned, other processes rebuild the index on next use.
+"""
+import heapq
+from bisect import bisect_left
+from itertools import groupby
+
+from . import versions
+from .models import Journey, Train, Crew
+
+
+JourneyCrew = Journey.crew.through
+
+
+def overlapping_journeys(start, end, exclude_id=None):
+    queryset = Journey.objects.filter(
+        departure_time__lt=end, arrival_time__gt=start
+    )
+    if exclude_id is not None:
+        queryset = queryset.exclude(id=exclude_id)
+    return queryset
+
+
+def train_conflicts(train_id, start, end, exclude_id=None):
+    """Journeys of the train that overlap ``[start, end)``"""
+    return overlapping_journeys(start, end, exclude_id).filter(
+        train_id=train_id
+    )
+
+
+def crew_conflicts(crew_ids, start, end, exclude_id=None):
+    """``(crew_id, journey_id)`` assignments that overlap ``[start, end)``"""
+    queryset = JourneyCrew.objects.filter(
+        crew_id__in=crew_ids,
+        journey__departure_time__lt=end,
+        journey__arrival_time__gt=start,
+    )
+    if exclude_id is not None:
+        queryset = queryset.exclude(journey_id=exclude_id)
+    return queryset.values_list("crew_id", "journey_id")
+
+
+def lock_resources(train_id, crew_ids=()):
+    """
+    Serialize concurrent assignments of the same train and crew.
+
+    Must be called inside a transaction; rows are locked in id order so two
+    writers cannot deadlock on each other.
+    """
+    list(Train.objects.select_for_update().filter(id=train_id))
+    list(
+        Crew.objects.select_for_update()
+        .filter(id__in=crew_ids)
+        .order_by("id")
+    )
+
+
+def find_overlaps(intervals):
+    """
+    Yield ``(key, other_key)`` for every overlapping pair.
+
+    ``intervals`` is an iterable of ``(start, end, key)`` sorted by start.
+    Runs in O(n log n + conflicts).
+    """
+    active = []
+    for start, end, key in intervals:
+        while active and active[0][0] <= start:
+            heapq.heappop(active)
+        for _, other_key in active:
+            yield other_key, key
+        heapq.heappush(active, (end, key))
+
+
+def _grouped_overlaps(rows):
+    """``rows`` are ``(resource_id, start, end, key)`` in resource order"""
+    for resource_id, group in groupby(rows, key=lambda row: row[0]):
+        intervals = ((start, end, key) for _, start, end, key in group)
+        for key, other_key in find_overlaps(intervals):
+            yield resource_id, key, other_key
+
+
+def train_timetable_conflicts(chunk_size=10000):
+    """Yield ``(train_id, journey_id, other_journey_id)`` for all trains"""
+    rows = (
+        Journey.objects.order_by("train_id", "departure_time")
+        .values_list("train_id", "departure_time", "arrival_time", "id")
+        .iterator(chunk_size=chunk_size)
+    )
+    return _grouped_overlaps(rows)
+
+
+def crew_timetable_conflicts(chunk_size=10000):
+    """Yield ``(crew_id, journey_id, other_journey_id)`` for all crew"""
+    rows = (
+        JourneyCrew.objects.order_by("crew_id", "journey__departure_time")
+        .values_list(
+            "crew_id",
+            "journey__departure_time",
+            "journey__arrival_time",
+            "journey_id",
+        )
+        .iterator(chunk_size=chunk_size)
+    )
+    return _grouped_overlaps(rows)
+
+
+class IntervalIndex:
+    """
+    Static index of ``(start, end, key)`` intervals.
+
+    Intervals are kept sorted by start together with a running maximum of
+    ends, so an overlap query bisects to the last interval starting before
+    the window and walks back only while an earlier interval can still
+    reach into it.
+    """
+
+    def __init__(self, intervals):
+        self.starts = []
+        self.ends = []
+        self.keys = []
+        self.max_ends = []
+
+        for start, end, key in sorted(intervals, key=lambda i: i[0]):
+            self.starts.append(start)
+            self.ends.append(end)
+            self.keys.append(key)
+            self.max_ends.append(
+                max(end, self.max_ends[-1]) if self.max_ends else end
+            )
+
+    def overlapping(self, start=None, end=None):
+        """Keys of intervals overlapping ``[start, end)``, latest first"""
+        i = len(self.starts) if end is None else bisect_left(self.starts, end)
+        i -= 1
+        while i >= 0 and (start is None or self.max_ends[i] > start):
+            if start is None or self.ends[i] > start:
+                yield self.keys[i]
+            i -= 1
+
+    def is_free(self, start, end):
+        return next(self.overlapping(start, end), None) is None
+
+
+NAME = "crew"
+
+_crew_index = None
+_crew_version = None
+# crew members whose intervals this process changed since the index was read
+_stale_crew = set()
+
+
+def invalidate_crew_index():
+    global _crew_index
+    _crew_index = None
+    _stale_crew.clear()
+
+
+def crew_changed(crew_ids=None):
+    """
+    Record that the assignments of ``crew_ids`` (of anyone for ``None``)
+    changed.
+
+    Other processes rebuild their index when they see the new stamp; this
+    one only reloads the intervals of those crew members.
+    """
+    global _crew_version
+
+    version = versions.bump(NAME)
+    if crew_ids is None or _crew_index is None or (
+        _crew_version != version - 1
+    ):
+        invalidate_crew_index()
+    else:
+        _stale_crew.update(crew_ids)
+        _crew_version = version
+
+
+def _busy_intervals(crew_ids=None):
+    rows = JourneyCrew.objects.order_by(
+        "crew_id", "journey__departure_time"
+    ).values_list(
+        "crew_id",
+        "journey__departure_time",
+        "journey__arrival_time",
+        "journey_id",
+    )
+    if crew_ids is not None:
+        rows = rows.filter(crew_id__in=crew_ids)
+    return {
+        crew_id: IntervalIndex(
+            (start, end, key) for _, start, end, key in group
+        )
+        for crew_id, group in groupby(
+            rows.iterator(chunk_size=10000), key=lambda row: row[0]
+        )
+    }
+
+
+def crew_busy_index():
+    """``{crew_id: IntervalIndex}`` of journeys each crew member works"""
+    global _crew_index, _crew_version
+
+    version = versions.current(NAME)
+    if _crew_index is None or _crew_version != version:
+        _stale_crew.clear()
+        _crew_index = _busy_intervals()
+        _crew_version = version
+    elif _stale_crew:
+        stale = set(_stale_crew)
+        _stale_crew.difference_update(stale)
+        fresh = _busy_intervals(stale)
+        for crew_id in stale:
+            if crew_id in fresh:
+                _crew_index[crew_id] = fresh[crew_id]
+            else:
+                _crew_index.pop(crew_id, None)
+
+    return _crew_index
+
+
+def available_crew_ids(crew_ids, start, end):
+    index = crew_busy_index()
+    return [
+        crew_id
+        for crew_id in crew_ids
+        if crew_id not in index or index[crew_id].is_free(start, end)
+    ]
+
+
+def crew_roster_ids(crew_id, start=None, end=None):
+    """Ids of the crew member's journeys overlapping the window"""
+    index = crew_busy_index().get(crew_id)
+    if index is None:
+        return []
+    return list(reversed(list(index.overlapping(start, end))))
@@ -1,6 +1,16 @@
-from django.db import transaction
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.core.files.storage import default_storage
+from django.db import IntegrityError, transaction
+from drf_spectacular.utils import extend_schema_field
 from rest_framework import serializers
-
+from rest_framework.fields import get_attribute
+from rest_framework.settings import api_settings
+
+from . import inventory, refdata, rollups
+from .fares import quote_journeys, quote_tickets
+from .images import current_variants
+from .scheduling import train_conflicts, crew_conflicts, lock_resources
+from .schedules import OccurrenceConflict, materialize
 from .models import (
     Train,
     TrainType,
@@ -9,10 +19,34 @@ from .models import (
     Ticket,
     Order,
     Route,
-    Station
+    Station,
+    Schedule,
+    ScheduleException,
+    RouteDailyStats,
+    TrainTypeDailyStats,
+    ArchivedJourney,
+    ArchivedTicket,
 )
 
 
+class ReferenceNameField(serializers.CharField):
+    """Name behind a foreign key, looked up in station.refdata"""
+
+    def __init__(self, **kwargs):
+        kwargs["read_only"] = True
+        super().__init__(**kwargs)
+
+    def get_attribute(self, instance):
+        owner = get_attribute(instance, self.source_attrs[:-1])
+        field = owner._meta.get_field(self.source_attrs[-1])
+        self.related_model = field.related_model
+        return getattr(owner, field.attname)
+
+    def to_representation(self, pk):
+        obj = refdata.get(self.related_model, pk)
+        return None if obj is None else obj.name
+
+
 class StationSerializer(serializers.ModelSerializer):
     class Meta:
         model = Station
@@ -26,28 +60,38 @@ class RouteSerializer(serializers.ModelSerializer):
 
 
 class RouteListSerializer(RouteSerializer):
-    source = serializers.SlugRelatedField(
-        read_only=True, slug_field="name"
-    )
-    destination = serializers.SlugRelatedField(
-        read_only=True, slug_field="name"
-    )
+    source = ReferenceNameField()
+    destination = ReferenceNameField()
 
     class Meta:
         model = Route
         fields = ("id", "source", "destination")
 
 
+class ShortestPathSerializer(serializers.Serializer):
+    reachable = serializers.BooleanField()
+    distance_km = serializers.FloatField(allow_null=True)
+    stations = StationSerializer(many=True)
+    routes = serializers.ListField(child=serializers.IntegerField())
+
+
+class ReachableStationSerializer(serializers.Serializer):
+    station = serializers.IntegerField()
+    distance_km = serializers.FloatField()
+
+
 class RouteDetailSerializer(RouteSerializer):
-    source = serializers.SlugRelatedField(
-        read_only=True, slug_field="name"
-    )
-    destination = serializers.SlugRelatedField(
-        read_only=True, slug_field="name")
+    source = ReferenceNameField()
+    destination = ReferenceNameField()
     distance_km = serializers.FloatField(
         source="distance", read_only=True
     )
 
+    def to_representation(self, instance):
+        # the distance needs both stations' coordinates
+        refdata.attach(instance, "source", "destination")
+        return super().to_representation(instance)
+
     class Meta:
         model = Route
         fields = ("id", "source", "destination", "distance_km")
@@ -59,7 +103,75 @@ class TrainTypeSerializer(serializers.ModelSerializer):
         fields = ("id", "name")
 
 
+def media_url(field, name):
+    url = default_storage.url(name)
+    request = field.context.get("request")
+    return request.build_absolute_uri(url) if request is not None else url
+
+
+class ImageVariantField(serializers.ImageField):
+    """URL of one variant of the image, the original's until it exists"""
+
+    def __init__(self, variant, **kwargs):
+        self.variant = variant
+        kwargs["read_only"] = True
+        super().__init__(**kwargs)
+
+    def get_attribute(self, instance):
+        # the train holding both the image and its variants
+        return get_attribute(instance, self.source_attrs[:-1])
+
+    def to_representation(self, train):
+        name = current_variants(train).get(self.variant)
+        if name is None:
+            return super().to_representation(
+                getattr(train, self.source_attrs[-1])
+            )
+        return media_url(self, name)
+
+
+@extend_schema_field(
+    {
+        "type": "object",
+        "additionalProperties": {"type": "string", "format": "uri"},
+        "example": {"thumbnail": "...", "medium": "...", "webp": "..."},
+    }
+)
+class ImageVariantsField(serializers.Field):
+    """``{variant: URL}`` of the variants generated so far"""
+
+    def __init__(self, **kwargs):
+        kwargs["read_only"] = True
+        kwargs.setdefault("source", "*")
+        super().__init__(**kwargs)
+
+    def to_representation(self, train):
+        return {
+            variant: media_url(self, name)
+            for variant, name in current_variants(train).items()
+        }
+
+
 class TrainSerializer(serializers.ModelSerializer):
+    def check_capacity(self, data):
+        try:
+            inventory.check_capacity(
+                self.instance,
+                data.get("cargo_num", self.instance.cargo_num),
+                data.get("places_in_cargo", self.instance.places_in_cargo),
+            )
+        except DjangoValidationError as error:
+            raise serializers.ValidationError(
+                {api_settings.NON_FIELD_ERRORS_KEY: error.messages}
+            )
+
+    def update(self, instance, validated_data):
+        with transaction.atomic():
+            self.check_capacity(validated_data)
+            return super(TrainSerializer, self).update(
+                instance, validated_data
+            )
+
     class Meta:
         model = Train
         fields = (
@@ -67,14 +179,14 @@ class TrainSerializer(serializers.ModelSerializer):
             "name",
             "cargo_num",
             "places_in_cargo",
+            "first_class_cargo_num",
             "train_type"
         )
 
 
 class TrainListSerializer(TrainSerializer):
-    train_type = serializers.SlugRelatedField(
-        read_only=True, slug_field="name"
-    )
+    train_type = ReferenceNameField()
+    image = ImageVariantField("thumbnail")
 
     class Meta:
         model = Train
@@ -82,15 +194,16 @@ class TrainListSerializer(TrainSerializer):
 
 
 class TrainImageSerializer(serializers.ModelSerializer):
+    image_variants = ImageVariantsField()
+
     class Meta:
         model = Train
-        fields = ("id", "image")
+        fields = ("id", "image", "image_variants")
 
 
 class TrainDetailSerializer(TrainSerializer):
-    train_type = serializers.CharField(
-        source="train_type.name", read_only=True
-    )
+    train_type = ReferenceNameField()
+    image_variants = ImageVariantsField()
 
     class Meta:
         model = Train
@@ -100,7 +213,9 @@ class TrainDetailSerializer(TrainSerializer):
             "train_type",
             "cargo_num",
             "places_in_cargo",
-            "image"
+            "first_class_cargo_num",
+            "image",
+            "image_variants",
         )
 
 
@@ -116,10 +231,99 @@ class CrewListSerializer(serializers.ModelSerializer):
         fields = ("id", "full_name")
 
 
+class CrewRosterSerializer(serializers.ModelSerializer):
+    train_name = serializers.CharField(source="train.name", read_only=True)
+    route = serializers.CharField(
+        source="route.get_route_display", read_only=True
+    )
+    departure_time = serializers.DateTimeField(format="%Y-%m-%d %H:%M")
+    arrival_time = serializers.DateTimeField(format="%Y-%m-%d %H:%M")
+
+    class Meta:
+        model = Journey
+        fields = (
+            "id",
+            "train_name",
+            "route",
+            "departure_time",
+            "arrival_time",
+        )
+
+
 class JourneySerializer(serializers.ModelSerializer):
     departure_time = serializers.DateTimeField(format="%Y-%m-%d %H:%M")
     arrival_time = serializers.DateTimeField(format="%Y-%m-%d %H:%M")
 
+    def validate(self, attrs):
+        data = super(JourneySerializer, self).validate(attrs)
+        departure_time = self._value(data, "departure_time")
+        arrival_time = self._value(data, "arrival_time")
+
+        if arrival_time <= departure_time:
+            raise serializers.ValidationError(
+                {"arrival_time": "Arrival must be after departure."}
+            )
+
+        return data
+
+    def _value(self, data, name):
+        if name in data:
+            return data[name]
+        return getattr(self.instance, name)
+
+    def check_conflicts(self, data):
+        """Reject overlapping journeys of the same train or crew member"""
+        exclude_id = self.instance.id if self.instance else None
+        departure_time = self._value(data, "departure_time")
+        arrival_time = self._value(data, "arrival_time")
+        train = self._value(data, "train")
+
+        if "crew" in data:
+            crew_ids = [member.id for member in data["crew"]]
+        elif self.instance:
+            crew_ids = list(self.instance.crew.values_list("id", flat=True))
+        else:
+            crew_ids = []
+
+        lock_resources(train.id, crew_ids)
+
+        conflict = train_conflicts(
+            train.id, departure_time, arrival_time, exclude_id
+        ).first()
+        if conflict:
+            raise serializers.ValidationError(
+                {
+                    "train": "Train is already assigned "
+                    f"to journey {conflict.id}."
+                }
+            )
+
+        conflicts = crew_conflicts(
+            crew_ids, departure_time, arrival_time, exclude_id
+        )
+        if conflicts:
+            raise serializers.ValidationError(
+                {
+                    "crew": [
+                        f"Crew member {crew_id} is already assigned "
+                        f"to journey {journey_id}."
+                        for crew_id, journey_id in conflicts
+                    ]
+                }
+            )
+
+    def create(self, validated_data):
+        with transaction.atomic():
+            self.check_conflicts(validated_data)
+            return super(JourneySerializer, self).create(validated_data)
+
+    def update(self, instance, validated_data):
+        with transaction.atomic():
+            self.check_conflicts(validated_data)
+            return super(JourneySerializer, self).update(
+                instance, validated_data
+            )
+
     class Meta:
         model = Journey
         fields = (
@@ -132,17 +336,33 @@ class JourneySerializer(serializers.ModelSerializer):
         )
 
 
+class JourneyFareListSerializer(serializers.ListSerializer):
+    """Quotes the fares of all listed journeys in one batch"""
+
+    def to_representation(self, data):
+        journeys = list(data.all() if hasattr(data, "all") else data)
+        if "fare" in self.child.fields:
+            for journey, fare in zip(journeys, quote_journeys(journeys)):
+                journey.fare = fare
+        return super().to_representation(journeys)
+
+
 class JourneyListSerializer(JourneySerializer):
     train_name = serializers.CharField(
         source="train.name", read_only=True
     )
-    train_image = serializers.ImageField(
-        source="train.image", read_only=True
-    )
+    train_image = ImageVariantField("thumbnail", source="train.image")
     route = serializers.CharField(
         source="route.get_route_display"
     )
     tickets_available = serializers.IntegerField(read_only=True)
+    fare = serializers.SerializerMethodField()
+    schedule = serializers.PrimaryKeyRelatedField(read_only=True)
+
+    def get_fare(self, obj):
+        if not hasattr(obj, "fare"):
+            obj.fare = quote_journeys([obj])[0]
+        return None if obj.fare is None else str(obj.fare)
 
     class Meta:
         model = Journey
@@ -154,31 +374,147 @@ class JourneyListSerializer(JourneySerializer):
             "departure_time",
             "arrival_time",
             "tickets_available",
+            "fare",
+            "schedule",
         )
+        list_serializer_class = JourneyFareListSerializer
+
+
+class JourneyQuoteSerializer(serializers.Serializer):
+    id = serializers.IntegerField()
+    standard = serializers.DecimalField(
+        max_digits=10, decimal_places=2, allow_null=True
+    )
+    first = serializers.DecimalField(
+        max_digits=10, decimal_places=2, allow_null=True
+    )
+
+
+def materialize_occurrences(tickets_data):
+    """
+    Point tickets booked on a schedule occurrence at its journey row.
+
+    Runs in the transaction that saves the tickets, so a failed booking
+    leaves no journey behind.
+    """
+    booked = [data for data in tickets_data if "occurrence" in data]
+    # trains are locked in id order, like journeys are
+    booked.sort(key=lambda data: data["occurrence"][0].train_id)
+    for ticket_data in booked:
+        occurrence = ticket_data.pop("occurrence")
+        try:
+            ticket_data["journey"] = materialize(*occurrence)
+        except OccurrenceConflict as error:
+            raise serializers.ValidationError({"service_date": [str(error)]})
 
 
 class TicketSerializer(serializers.ModelSerializer):
+    journey = serializers.PrimaryKeyRelatedField(
+        queryset=Journey.objects.all(), required=False
+    )
+    schedule = serializers.PrimaryKeyRelatedField(
+        queryset=Schedule.objects.all(), required=False, write_only=True
+    )
+    service_date = serializers.DateField(required=False, write_only=True)
+
     def create(self, validated_data):
         user = validated_data.pop("user", None)
 
-        order, created = Order.objects.get_or_create(user=user)
+        with transaction.atomic():
+            materialize_occurrences([validated_data])
+            order, created = Order.objects.get_or_create(user=user)
 
-        validated_data["order"] = order
+            validated_data["order"] = order
 
-        ticket = Ticket.objects.create(**validated_data)
+            ticket = Ticket.objects.create(**validated_data)
 
         return ticket
 
+    def update(self, instance, validated_data):
+        with transaction.atomic():
+            materialize_occurrences([validated_data])
+            return super(TicketSerializer, self).update(
+                instance, validated_data
+            )
+
     def validate(self, attrs):
         data = super(TicketSerializer, self).validate(attrs)
-        ticket_instance = Ticket(**data)
+        schedule = data.pop("schedule", None)
+        service_date = data.pop("service_date", None)
+        ticket_data = dict(data)
+        if "journey" not in data and not self.partial:
+            ticket_data["journey"] = self._occurrence(schedule, service_date)
+            # written by materialize_occurrences in the saving transaction
+            data["occurrence"] = (schedule, service_date)
+        if self.instance is not None:
+            # a partial update keeps the seat it does not mention
+            ticket_data = {
+                "journey": self.instance.journey,
+                "cargo": self.instance.cargo,
+                "seat": self.instance.seat,
+                **ticket_data,
+            }
+        ticket_instance = Ticket(**ticket_data)
         ticket_instance.clean()
+        self._check_seat_free(ticket_instance)
 
         return data
 
+    def _check_seat_free(self, ticket):
+        if ticket.journey.pk is None:
+            # the occurrence is not materialized yet, nothing is booked
+            return
+        taken = Ticket.objects.filter(
+            journey=ticket.journey, cargo=ticket.cargo, seat=ticket.seat
+        )
+        if self.instance is not None:
+            taken = taken.exclude(pk=self.instance.pk)
+        if taken.exists():
+            raise serializers.ValidationError(
+                "The fields journey, cargo, seat must make a unique set.",
+                code="unique",
+            )
+
+    @staticmethod
+    def _occurrence(schedule, service_date):
+        """Unsaved journey for a ticket booked on a schedule occurrence"""
+        if schedule is None:
+            raise serializers.ValidationError(
+                {"journey": ["This field is required."]}
+            )
+        if service_date is None:
+            raise serializers.ValidationError(
+                {"service_date": ["This field is required."]}
+            )
+        if not schedule.runs_on(service_date):
+            raise serializers.ValidationError(
+                {"service_date": "Schedule does not run on this date."}
+            )
+        journey = schedule.build_journey(service_date)
+        # the journey row once a ticket materialized it; nothing is written
+        # before the booking is saved
+        return (
+            Journey.objects.filter(
+                schedule=schedule, departure_time=journey.departure_time
+            ).first()
+            or journey
+        )
+
     class Meta:
         model = Ticket
-        fields = ("id", "cargo", "seat", "journey")
+        fields = (
+            "id",
+            "cargo",
+            "seat",
+            "journey",
+            "schedule",
+            "service_date",
+            "price",
+        )
+        read_only_fields = ("price",)
+        # the journey may only exist once the ticket is saved; uniqueness
+        # of the seat is checked by validate() instead
+        validators = []
 
 
 class TicketListSerializer(TicketSerializer):
@@ -186,7 +522,7 @@ class TicketListSerializer(TicketSerializer):
 
     class Meta:
         model = Ticket
-        fields = ("id", "cargo", "seat", "journey")
+        fields = ("id", "cargo", "seat", "journey", "price")
 
 
 class TicketSeatsSerializer(TicketSerializer):
@@ -197,7 +533,7 @@ class TicketSeatsSerializer(TicketSerializer):
 
 class JourneyDetailSerializer(JourneySerializer):
     train = TrainListSerializer(read_only=True)
-    train_image = TrainImageSerializer(read_only=True)
+    train_image = TrainImageSerializer(source="train", read_only=True)
     taken_places = TicketSeatsSerializer(
         source="tickets", many=True, read_only=True
     )
@@ -223,24 +559,238 @@ class JourneyDetailSerializer(JourneySerializer):
         )
 
 
+class ArchivedJourneyListSerializer(serializers.ModelSerializer):
+    """Same shape as JourneyListSerializer; archived journeys have no fare"""
+
+    train_name = serializers.CharField(source="train.name", read_only=True)
+    train_image = ImageVariantField("thumbnail", source="train.image")
+    route = serializers.CharField(
+        source="route.get_route_display", read_only=True
+    )
+    departure_time = serializers.DateTimeField(format="%Y-%m-%d %H:%M")
+    arrival_time = serializers.DateTimeField(format="%Y-%m-%d %H:%M")
+    tickets_available = serializers.IntegerField(read_only=True)
+    fare = serializers.SerializerMethodField()
+
+    def get_fare(self, obj):
+        return None
+
+    class Meta:
+        model = ArchivedJourney
+        fields = JourneyListSerializer.Meta.fields
+
+
+class ArchivedTicketSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ArchivedTicket
+        fields = ("id", "cargo", "seat", "journey", "price")
+
+
+class ArchivedTicketListSerializer(ArchivedTicketSerializer):
+    journey = ArchivedJourneyListSerializer(read_only=True)
+
+
 class OrderSerializer(serializers.ModelSerializer):
     tickets = TicketSerializer(
         many=True, read_only=False, allow_empty=False
     )
+    archived_ticket_serializer = ArchivedTicketSerializer
 
     class Meta:
         model = Order
         fields = ("id", "tickets", "created_at")
 
+    def to_representation(self, instance):
+        data = super(OrderSerializer, self).to_representation(instance)
+        # tickets of archived journeys are still part of the order
+        if "tickets" in data:
+            data["tickets"] += self.archived_ticket_serializer(
+                instance.archived_tickets.all(),
+                many=True,
+                context=self.context,
+            ).data
+        return data
+
     @staticmethod
     def create(validated_data):
-        with transaction.atomic():
-            tickets_data = validated_data.pop("tickets")
-            order = Order.objects.create(**validated_data)
-            for ticket_data in tickets_data:
-                Ticket.objects.create(order=order, **ticket_data)
-            return order
+        tickets_data = validated_data.pop("tickets")
+        journey_ids = sorted(
+            {
+                ticket_data["journey"].id
+                for ticket_data in tickets_data
+                if "journey" in ticket_data
+            }
+        )
+        try:
+            with transaction.atomic():
+                # lock the journeys in id order, so orders sharing journeys
+                # queue up instead of deadlocking on their seat counters
+                list(
+                    Journey.objects.select_for_update()
+                    .filter(id__in=journey_ids)
+                    .order_by("id")
+                    .values_list("id", flat=True)
+                )
+                materialize_occurrences(tickets_data)
+                order = Order.objects.create(**validated_data)
+                tickets = quote_tickets(
+                    Ticket(order=order, **ticket_data)
+                    for ticket_data in tickets_data
+                )
+                with rollups.batched():
+                    for ticket in tickets:
+                        ticket.save()
+                return order
+        except (IntegrityError, DjangoValidationError):
+            # a seat was taken by a concurrent order after validation
+            raise serializers.ValidationError(
+                {"tickets": ["Some of these seats have just been booked."]}
+            )
+
+
+class OrderFareListSerializer(serializers.ListSerializer):
+    """Quotes the fares of the journeys of all listed orders in one batch"""
+
+    def to_representation(self, data):
+        orders = list(data.all() if hasattr(data, "all") else data)
+        journeys = [
+            ticket.journey
+            for order in orders
+            for ticket in order.tickets.all()
+        ]
+        for journey, fare in zip(journeys, quote_journeys(journeys)):
+            journey.fare = fare
+        return super().to_representation(orders)
 
 
 class OrderListSerializer(OrderSerializer):
     tickets = TicketListSerializer(many=True, read_only=True)
+    archived_ticket_serializer = ArchivedTicketListSerializer
+
+    class Meta(OrderSerializer.Meta):
+        list_serializer_class = OrderFareListSerializer
+
+
+class ScheduleSerializer(serializers.ModelSerializer):
+    exceptions = serializers.ListField(
+        child=serializers.DateField(), required=False, write_only=True
+    )
+
+    def validate_weekdays(self, value):
+        if not 0 < value <= Schedule.ALL_WEEKDAYS:
+            raise serializers.ValidationError(
+                f"Weekday mask must be in range (1, {Schedule.ALL_WEEKDAYS})"
+            )
+        return value
+
+    def validate(self, attrs):
+        data = super(ScheduleSerializer, self).validate(attrs)
+        valid_from = data.get(
+            "valid_from", getattr(self.instance, "valid_from", None)
+        )
+        valid_until = data.get(
+            "valid_until", getattr(self.instance, "valid_until", None)
+        )
+        if valid_until < valid_from:
+            raise serializers.ValidationError(
+                {"valid_until": "Validity period ends before it starts."}
+            )
+        return data
+
+    def to_representation(self, instance):
+        data = super(ScheduleSerializer, self).to_representation(instance)
+        data["exceptions"] = [
+            serializers.DateField().to_representation(exception.date)
+            for exception in instance.exceptions.all()
+        ]
+        return data
+
+    @staticmethod
+    def _set_exceptions(schedule, dates):
+        schedule.exceptions.all().delete()
+        ScheduleException.objects.bulk_create(
+            ScheduleException(schedule=schedule, date=date)
+            for date in set(dates)
+        )
+
+    def create(self, validated_data):
+        with transaction.atomic():
+            dates = validated_data.pop("exceptions", [])
+            schedule = Schedule.objects.create(**validated_data)
+            self._set_exceptions(schedule, dates)
+            return schedule
+
+    def update(self, instance, validated_data):
+        with transaction.atomic():
+            dates = validated_data.pop("exceptions", None)
+            schedule = super(ScheduleSerializer, self).update(
+                instance, validated_data
+            )
+            if dates is not None:
+                self._set_exceptions(schedule, dates)
+            return schedule
+
+    class Meta:
+        model = Schedule
+        fields = (
+            "id",
+            "route",
+            "train",
+            "departure_time",
+            "duration",
+            "weekdays",
+            "valid_from",
+            "valid_until",
+            "exceptions",
+        )
+
+
+class RouteDailyStatsSerializer(serializers.ModelSerializer):
+    route = serializers.CharField(source="route.get_route_display")
+
+    class Meta:
+        model = RouteDailyStats
+        fields = (
+            "route",
+            "date",
+            "journeys",
+            "seats_offered",
+            "tickets_sold",
+            "load_factor",
+            "revenue",
+        )
+
+
+class TrainTypeDailyStatsSerializer(serializers.ModelSerializer):
+    train_type = serializers.CharField(
+        source="train_type.name", default=None
+    )
+
+    class Meta:
+        model = TrainTypeDailyStats
+        fields = (
+            "train_type",
+            "date",
+            "journeys",
+            "seats_offered",
+            "tickets_sold",
+            "revenue",
+        )
+
+
+class BatchSubRequestSerializer(serializers.Serializer):
+    method = serializers.ChoiceField(choices=["GET"], default="GET")
+    path = serializers.CharField(max_length=2048)
+
+
+class BatchSerializer(serializers.Serializer):
+    MAX_REQUESTS = 20
+
+    requests = BatchSubRequestSerializer(
+        many=True, allow_empty=False, max_length=MAX_REQUESTS
+    )
+
+
+class BatchResponseSerializer(serializers.Serializer):
+    status = serializers.IntegerField()
+    body = serializers.JSONField()
@@ -0,0 +1,287 @@
+from django.core.signals import request_started
+from django.db.models.signals import (
+    pre_save,
+    post_save,
+    pre_delete,
+    post_delete,
+    m2m_changed,
+)
+from django.dispatch import receiver
+
+from . import (
+    fares,
+    graph,
+    images,
+    inventory,
+    live,
+    outbox,
+    refdata,
+    rollups,
+    scheduling,
+    versions,
+)
+from .archive import archiving
+from .models import (
+    Tariff,
+    TrainType,
+    FareBand,
+    Route,
+    Station,
+    Journey,
+    Train,
+    Crew,
+    Ticket,
+    Order,
+)
+
+
+@receiver(post_save, sender=Tariff)
+@receiver(post_delete, sender=Tariff)
+@receiver(post_save, sender=FareBand)
+@receiver(post_delete, sender=FareBand)
+@receiver(post_save, sender=Route)
+@receiver(post_delete, sender=Route)
+@receiver(post_save, sender=Station)
+@receiver(post_delete, sender=Station)
+def reset_fare_table(sender, **kwargs):
+    fares.changed()
+
+
+@receiver(post_save, sender=Station)
+@receiver(post_delete, sender=Station)
+@receiver(post_save, sender=TrainType)
+@receiver(post_delete, sender=TrainType)
+@receiver(post_save, sender=Train)
+@receiver(post_delete, sender=Train)
+def reset_reference_data(sender, **kwargs):
+    refdata.changed()
+
+
+@receiver(request_started)
+def recheck_cache_versions(sender, **kwargs):
+    versions.recheck()
+    refdata.recheck()
+
+
+@receiver(post_save, sender=Route)
+@receiver(post_delete, sender=Route)
+@receiver(post_save, sender=Station)
+@receiver(post_delete, sender=Station)
+def reset_station_graph(sender, **kwargs):
+    graph.changed()
+
+
+def journey_crew_changed(journey):
+    crew_ids = list(journey.crew.values_list("id", flat=True))
+    if crew_ids:
+        scheduling.crew_changed(crew_ids)
+
+
+@receiver(post_save, sender=Journey)
+def update_crew_index(sender, instance, created, raw=False, **kwargs):
+    # the crew of a new journey is added through m2m_changed
+    old_times = getattr(instance, "_old_times", None)
+    if created or raw or old_times is None:
+        return
+
+    del instance._old_times
+    if old_times != (instance.departure_time, instance.arrival_time):
+        journey_crew_changed(instance)
+
+
+@receiver(pre_delete, sender=Journey)
+def remove_from_crew_index(sender, instance, **kwargs):
+    # station.archive reports the crew of archived journeys itself
+    if not archiving():
+        journey_crew_changed(instance)
+
+
+@receiver(post_delete, sender=Crew)
+def remove_crew_from_index(sender, instance, **kwargs):
+    scheduling.crew_changed([instance.pk])
+
+
+@receiver(m2m_changed, sender=Journey.crew.through)
+def update_crew_assignments(
+    sender, instance, action, reverse, pk_set, **kwargs
+):
+    if action not in ("post_add", "post_remove", "pre_clear"):
+        return
+
+    if reverse:
+        scheduling.crew_changed([instance.pk])
+    elif action == "pre_clear":
+        journey_crew_changed(instance)
+    elif pk_set:
+        scheduling.crew_changed(pk_set)
+
+
+@receiver(pre_save, sender=Journey)
+def remember_old_journey(sender, instance, raw=False, **kwargs):
+    if raw or instance.pk is None:
+        return
+
+    old = (
+        Journey.objects.filter(pk=instance.pk)
+        .select_related("train")
+        .first()
+    )
+    if old is not None:
+        instance._old_rollup = (
+            rollups.journey_key(old),
+            old.train.cargo_num * old.train.places_in_cargo,
+        )
+        instance._old_times = (old.departure_time, old.arrival_time)
+
+
+@receiver(post_save, sender=Journey)
+def update_journey_rollups(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+
+    if created:
+        rollups.journey_added(instance)
+        return
+
+    old = getattr(instance, "_old_rollup", None)
+    if old is None:
+        return
+
+    old_key, old_seats = old
+    seats = instance.train.cargo_num * instance.train.places_in_cargo
+    if old_key != rollups.journey_key(instance) or old_seats != seats:
+        rollups.journey_moved(instance, old_key, old_seats)
+    del instance._old_rollup
+
+
+@receiver(post_delete, sender=Journey)
+def remove_journey_rollups(sender, instance, **kwargs):
+    # archived journeys still count towards the days they ran on
+    if not archiving():
+        rollups.journey_added(instance, sign=-1)
+
+
+@receiver(post_save, sender=Journey)
+def recount_loaded_journey(sender, instance, raw=False, **kwargs):
+    if raw:
+        inventory.reconcile([instance.pk])
+
+
+@receiver(pre_save, sender=Train)
+def remember_train_size(sender, instance, raw=False, **kwargs):
+    if raw or instance.pk is None:
+        return
+
+    instance._old_size = (
+        Train.objects.filter(pk=instance.pk)
+        .values_list("cargo_num", "places_in_cargo")
+        .first()
+    )
+
+
+@receiver(post_save, sender=Train)
+def update_journey_capacity(sender, instance, created, raw=False, **kwargs):
+    old_size = getattr(instance, "_old_size", None)
+    instance._old_size = None
+    size = (instance.cargo_num, instance.places_in_cargo)
+    # a new train has no journeys; renames and image uploads leave them be
+    if raw or (not created and old_size != size):
+        inventory.train_resized(instance)
+
+
+@receiver(post_save, sender=Train)
+def resize_train_image(sender, instance, raw=False, **kwargs):
+    if not raw and images.needs_variants(instance):
+        images.schedule_variants(instance)
+
+
+@receiver(pre_save, sender=Ticket)
+def remember_old_ticket(sender, instance, raw=False, **kwargs):
+    if raw or instance.pk is None:
+        return
+
+    old = (
+        Ticket.objects.filter(pk=instance.pk)
+        .values_list("journey_id", "price")
+        .first()
+    )
+    instance._old_journey_id, instance._old_price = old or (None, None)
+
+
+@receiver(post_save, sender=Ticket)
+def count_ticket_sold(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        inventory.reconcile([instance.journey_id])
+    elif created:
+        inventory.tickets_added([instance])
+    else:
+        old_journey_id = getattr(instance, "_old_journey_id", None)
+        if old_journey_id not in (None, instance.journey_id):
+            inventory.ticket_moved(old_journey_id, instance.journey_id)
+
+
+@receiver(post_delete, sender=Ticket)
+def uncount_ticket_sold(sender, instance, **kwargs):
+    if not archiving():
+        inventory.tickets_added([instance], sign=-1)
+
+
+@receiver(post_save, sender=Ticket)
+def update_ticket_rollups(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+
+    if created:
+        rollups.ticket_added(instance)
+        return
+
+    old_journey_id = getattr(instance, "_old_journey_id", None)
+    old_price = getattr(instance, "_old_price", None)
+    if old_journey_id is None or (old_journey_id, old_price) == (
+        instance.journey_id,
+        instance.price,
+    ):
+        return
+
+    old_journey = instance.journey
+    if old_journey_id != instance.journey_id:
+        old_journey = Journey.objects.select_related("train").get(
+            pk=old_journey_id
+        )
+    rollups.ticket_moved(instance, old_journey, old_price)
+
+
+@receiver(post_delete, sender=Ticket)
+def remove_ticket_rollups(sender, instance, **kwargs):
+    if not archiving():
+        rollups.ticket_added(instance, sign=-1)
+
+
+@receiver(post_save, sender=Order)
+def record_order_created(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        outbox.record("order.created", outbox.order_payload(instance))
+
+
+@receiver(post_delete, sender=Order)
+def record_order_deleted(sender, instance, **kwargs):
+    outbox.record("order.deleted", outbox.order_payload(instance))
+
+
+@receiver(post_save, sender=Ticket)
+def record_ticket_created(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        outbox.record("ticket.created", outbox.ticket_payload(instance))
+
+
+@receiver(post_delete, sender=Ticket)
+def record_ticket_deleted(sender, instance, **kwargs):
+    if not archiving():
+        outbox.record("ticket.deleted", outbox.ticket_payload(instance))
+
+
+@receiver(post_save, sender=Ticket)
+@receiver(post_delete, sender=Ticket)
+def notify_seat_watchers(sender, instance, raw=False, **kwargs):
+    if not raw and not archiving():
+        live.changed(instance.journey_id)
@@ -0,0 +1,364 @@
+"""
+Fast snapshots for seeding environments.
+
+``dump`` writes every station model (and users) as one section per model,
+in foreign key dependency order. A section is a JSON line naming the
+model and its columns, followed by chunk lines that hold one array per
+column. Files ending in ``.gz`` are gzip-compressed.
+
+``load`` inserts the chunks with multi-row ``INSERT``s: no model
+instances, no ``save()``, no signals. Everything happens in one
+transaction with foreign key checks deferred until the end. Reference
+rows with a natural key (station, train type, train and fare band names,
+user emails) are matched against rows already in the database, and
+foreign keys to them are stored and resolved by that key. Other tables
+must be empty and keep their ids. Afterwards the journeys' seat counters
+and the daily rollups are recomputed, since both are derived data, and
+the reference data cache is invalidated.
+"""
+import gzip
+import json
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from itertools import islice
+
+from django.apps import apps
+from django.conf import settings
+from django.core.management.color import no_style
+from django.db import DEFAULT_DB_ALIAS, connection, connections, models
+from django.db import transaction
+from django.utils.duration import duration_iso_string
+
+from . import fares, graph, inventory, refdata, rollups, scheduling
+
+
+FORMAT = "station-snapshot"
+VERSION = 1
+CHUNK_SIZE = 10_000
+NATURAL_KEYS = {
+    "station.station": "name",
+    "station.traintype": "name",
+    "station.train": "name",
+    "station.fareband": "name",
+    settings.AUTH_USER_MODEL.lower(): "email",
+}
+# derived or operational data, rebuilt or irrelevant after a load
+EXCLUDED = {
+    "station.routedailystats",
+    "station.traintypedailystats",
+    "station.outboxevent",
+    "station.idempotencykey",
+    "station.cacheversion",
+}
+# values JSON cannot hold natively are parsed back with field.to_python;
+# DateTimeField is a DateField
+PARSED_FIELDS = (
+    models.DateField,
+    models.TimeField,
+    models.DecimalField,
+    models.DurationField,
+)
+# column types whose JSON values are already valid query parameters
+PLAIN_TYPES = {
+    "AutoField",
+    "BigAutoField",
+    "BigIntegerField",
+    "BooleanField",
+    "CharField",
+    "FloatField",
+    "IntegerField",
+    "PositiveBigIntegerField",
+    "PositiveIntegerField",
+    "PositiveSmallIntegerField",
+    "SmallIntegerField",
+    "TextField",
+}
+
+
+class SnapshotError(Exception):
+    pass
+
+
+def label(model):
+    return model._meta.label_lower
+
+
+def snapshot_models():
+    """Models in the snapshot, every model after the ones it points to"""
+    chosen = [
+        model
+        for model in apps.get_app_config("station").get_models()
+        if label(model) not in EXCLUDED
+    ]
+    chosen.append(apps.get_model(settings.AUTH_USER_MODEL))
+    for model in list(chosen):
+        for field in model._meta.local_many_to_many:
+            through = field.remote_field.through
+            if (
+                through._meta.auto_created
+                and field.related_model in chosen
+            ):
+                chosen.append(through)
+    return sort_dependencies(chosen)
+
+
+def sort_dependencies(chosen):
+    remaining = {
+        model: {
+            field.related_model
+            for field in model._meta.concrete_fields
+            if field.is_relation
+            and field.related_model in chosen
+            and field.related_model is not model
+        }
+        for model in chosen
+    }
+    ordered = []
+    while remaining:
+        ready = [model for model, deps in remaining.items() if not deps]
+        if not ready:
+            raise SnapshotError(
+                "Circular dependency between "
+                + ", ".join(label(model) for model in remaining)
+            )
+        for model in ready:
+            ordered.append(model)
+            del remaining[model]
+        for deps in remaining.values():
+            deps.difference_update(ready)
+    return ordered
+
+
+def natural_key(model):
+    return NATURAL_KEYS.get(label(model))
+
+
+def encode(value):
+    """JSON for column values, without DjangoJSONEncoder's rounding"""
+    if isinstance(value, timedelta):
+        return duration_iso_string(value)
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    raise TypeError(f"Cannot snapshot {type(value).__name__} values")
+
+
+def open_snapshot(path, mode="r"):
+    """Text file, gzip-compressed for ``.gz`` paths or gzip content"""
+    compressed = str(path).endswith(".gz")
+    if mode == "r" and not compressed:
+        with open(path, "rb") as file:
+            compressed = file.read(2) == b"\x1f\x8b"
+    if compressed:
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+
+def chunked(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def dump(path, chunk_size=CHUNK_SIZE):
+    """Write a snapshot to ``path``, returning ``{model label: rows}``"""
+    counts = {}
+    with open_snapshot(path, "w") as file:
+        file.write(json.dumps({"format": FORMAT, "version": VERSION}) + "\n")
+        for model in snapshot_models():
+            counts[label(model)] = _dump_model(file, model, chunk_size)
+    return counts
+
+
+def _dump_model(file, model, chunk_size):
+    fields = model._meta.concrete_fields
+    # foreign keys to natural-key models are written as that key
+    keys = {
+        field.attname: dict(
+            field.related_model._base_manager.values_list(
+                "pk", natural_key(field.related_model)
+            )
+        )
+        for field in fields
+        if field.is_relation and natural_key(field.related_model)
+    }
+    file.write(
+        json.dumps(
+            {
+                "model": label(model),
+                "columns": [field.attname for field in fields],
+                "natural_key": natural_key(model),
+            }
+        )
+        + "\n"
+    )
+
+    rows = (
+        model._base_manager.order_by("pk")
+        .values_list(*(field.attname for field in fields))
+        .iterator(chunk_size=chunk_size)
+    )
+    count = 0
+    for chunk in chunked(rows, chunk_size):
+        columns = [list(column) for column in zip(*chunk)]
+        for i, field in enumerate(fields):
+            if field.attname in keys:
+                mapping = keys[field.attname]
+                columns[i] = [mapping.get(pk) for pk in columns[i]]
+        file.write(json.dumps(columns, default=encode) + "\n")
+        count += len(chunk)
+    return count
+
+
+def read_sections(file):
+    """``(header, chunks)`` per section; chunks must be consumed in order"""
+    header = json.loads(file.readline() or "null")
+    if not header or header.get("format") != FORMAT:
+        raise SnapshotError("Not a station snapshot")
+    if header["version"] != VERSION:
+        raise SnapshotError(f"Unsupported version {header['version']}")
+
+    pending = [None]
+
+    def chunks():
+        for line in file:
+            data = json.loads(line)
+            if isinstance(data, dict):
+                pending[0] = data
+                return
+            yield data
+
+    line = file.readline()
+    pending[0] = json.loads(line) if line else None
+    while pending[0] is not None:
+        section, pending[0] = pending[0], None
+        yield section, chunks()
+
+
+def load(path):
+    """Load a snapshot into the database, returning ``{model label: rows}``"""
+    counts = {}
+    loaded = []
+    with open_snapshot(path) as file, transaction.atomic():
+        with connection.constraint_checks_disabled():
+            # pk of every natural-key row, by model label and key
+            resolved = {}
+            for section, chunks in read_sections(file):
+                model = apps.get_model(section["model"])
+                if not natural_key(model) and model._base_manager.exists():
+                    raise SnapshotError(
+                        f"{label(model)} already has rows, only empty "
+                        "tables can be seeded"
+                    )
+                counts[label(model)] = _load_model(
+                    model, section["columns"], chunks, resolved
+                )
+                loaded.append(model)
+
+        connection.check_constraints(
+            table_names=[model._meta.db_table for model in loaded]
+        )
+        with connection.cursor() as cursor:
+            for sql in connection.ops.sequence_reset_sql(no_style(), loaded):
+                cursor.execute(sql)
+
+        inventory.reconcile()
+        rollups.backfill()
+        refdata.changed()
+        fares.changed()
+        graph.changed()
+        scheduling.crew_changed()
+    return counts
+
+
+def _load_model(model, columns, chunks, resolved):
+    fields = [model._meta.get_field(column) for column in columns]
+    key = natural_key(model)
+    if key:
+        existing = resolved[label(model)] = dict(
+            model._base_manager.values_list(key, "pk")
+        )
+        key_index = columns.index(key)
+        # new rows get fresh ids, existing rows keep theirs
+        pk_index = columns.index(model._meta.pk.attname)
+        fields = fields[:pk_index] + fields[pk_index + 1:]
+
+    converters = [_converter(field, resolved) for field in fields]
+    count = 0
+    for chunk in chunks:
+        rows = zip(*chunk)
+        if key:
+            rows = (
+                row[:pk_index] + row[pk_index + 1:]
+                for row in rows
+                if row[key_index] not in existing
+            )
+        rows = [
+            [
+                value if convert is None else convert(value)
+                for convert, value in zip(converters, row)
+            ]
+            for row in rows
+        ]
+        _insert(model, fields, rows)
+        count += len(rows)
+
+    if key:
+        existing.update(model._base_manager.values_list(key, "pk"))
+    return count
+
+
+def _converter(field, resolved):
+    """Snapshot value to query parameter function, ``None`` if as is"""
+    # the proxy behind django.db.connection is slow for per-value lookups
+    db = connections[DEFAULT_DB_ALIAS]
+    if field.is_relation:
+        related = field.related_model
+        if natural_key(related):
+            return _resolver(resolved[label(related)], field)
+        return None
+    if field.get_internal_type() in PLAIN_TYPES:
+        return None
+    if isinstance(field, PARSED_FIELDS):
+        return lambda value: field.get_db_prep_save(
+            field.to_python(value), db
+        )
+    return lambda value: field.get_db_prep_save(value, db)
+
+
+def _resolver(mapping, field):
+    def resolve(value):
+        if value is None:
+            return None
+        try:
+            return mapping[value]
+        except KeyError:
+            raise SnapshotError(
+                f"{field.model._meta.label_lower}.{field.name} refers to "
+                f"unknown {field.related_model._meta.label_lower} {value!r}"
+            )
+
+    return resolve
+
+
+def _insert(model, fields, rows):
+    if not rows:
+        return
+    quote = connection.ops.quote_name
+    table = quote(model._meta.db_table)
+    columns = ", ".join(quote(field.column) for field in fields)
+    placeholders = "(" + ", ".join(["%s"] * len(fields)) + ")"
+    max_params = connection.features.max_query_params or 65535
+    batch_size = max(1, min(1000, max_params // len(fields)))
+
+    with connection.cursor() as cursor:
+        for batch in chunked(rows, batch_size):
+            cursor.execute(
+                f"INSERT INTO {table} ({columns}) VALUES "
+                + ", ".join([placeholders] * len(batch)),
+                [value for row in batch for value in row],
+            )
@@ -0,0 +1,110 @@
+"""
+Streaming JSON list responses.
+
+``?stream=true`` on a list endpoint returns a ``StreamingHttpResponse``
+that walks the queryset in chunks and serializes one chunk at a time, so
+neither the full row list nor the full JSON document is held in memory.
+The body is gzip-compressed when the client accepts it.
+
+If an error happens after the first byte has been sent, the array is
+closed with a final ``{"error": ...}`` element so the body stays valid
+JSON.
+"""
+import logging
+import zlib
+from itertools import islice
+
+from django.db.models.query import QuerySet
+from django.http import StreamingHttpResponse
+from rest_framework.renderers import JSONRenderer
+
+
+logger = logging.getLogger(__name__)
+
+TRUTHY = ("1", "true", "yes")
+
+
+class StreamingJSONRenderer(JSONRenderer):
+    """Renders an iterable of serialized chunks as one JSON array"""
+
+    def render_item(self, item):
+        return self.render(item)
+
+    def iter_render(self, chunks):
+        yield b"["
+        first = True
+        try:
+            for chunk in chunks:
+                parts = []
+                for item in chunk:
+                    if not first:
+                        parts.append(b",")
+                    parts.append(self.render_item(item))
+                    first = False
+                yield b"".join(parts)
+        except Exception:
+            logger.exception("Streaming response aborted")
+            separator = b"" if first else b","
+            yield separator + self.render_item(
+                {"error": "Response truncated by a server error."}
+            )
+        yield b"]"
+
+
+def gzip_chunks(chunks, level=6):
+    compressor = zlib.compressobj(level, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+    for chunk in chunks:
+        data = compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def batched(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+class StreamingListMixin:
+    """Viewset mixin serving ``list`` as a chunked JSON array on request"""
+
+    stream_param = "stream"
+    stream_chunk_size = 500
+
+    def wants_stream(self):
+        value = self.request.query_params.get(self.stream_param, "")
+        return value.lower() in TRUTHY
+
+    def list(self, request, *args, **kwargs):
+        if not self.wants_stream():
+            return super().list(request, *args, **kwargs)
+
+        return self.stream_list(self.filter_queryset(self.get_queryset()))
+
+    def stream_list(self, objects):
+        if isinstance(objects, QuerySet):
+            objects = objects.iterator(chunk_size=self.stream_chunk_size)
+
+        chunks = (
+            self.get_serializer(batch, many=True).data
+            for batch in batched(objects, self.stream_chunk_size)
+        )
+        body = StreamingJSONRenderer().iter_render(chunks)
+
+        accepts_gzip = "gzip" in self.request.headers.get(
+            "Accept-Encoding", ""
+        )
+        if accepts_gzip:
+            body = gzip_chunks(body)
+
+        response = StreamingHttpResponse(
+            body, content_type="application/json"
+        )
+        response["Vary"] = "Accept-Encoding"
+        if accepts_gzip:
+            response["Content-Encoding"] = "gzip"
+        return response
@@ -0,0 +1,195 @@
+"""
+Concurrent booking stress harness.
+
+``run_stress`` fires orders for overlapping seats of one journey from many
+threads through the real API stack (``POST /orders/``) and measures what
+happened: throughput, how many orders lost a seat to another one, time
+spent waiting for row locks and latency percentiles. ``check_invariants``
+then verifies that no seat was sold twice, that every order holds all
+the seats it asked for and that the journey's seat counter still matches
+its tickets.
+
+Used by the ``stress_booking`` management command, which runs it against
+a throwaway test database.
+"""
+import queue
+import random
+import threading
+import time
+
+from django.db import connection
+from django.db.models import Count
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from .inventory import drifted
+from .models import Order, Ticket
+
+
+class LockTimer:
+    """Execute wrapper adding up time spent in ``FOR UPDATE`` queries"""
+
+    def __init__(self):
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        if "FOR UPDATE" not in sql:
+            return execute(sql, params, many, context)
+
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.seconds += time.perf_counter() - started
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    if not values:
+        return None
+    rank = max(0, min(len(values) - 1, round(fraction * len(values)) - 1))
+    return values[rank]
+
+
+def plan_orders(journey, users, orders, seats_per_order, hot_seats, seed):
+    """``[(user, [(cargo, seat), ...]), ...]`` drawn from the hot seats"""
+    rng = random.Random(seed)
+    train = journey.train
+    seats = [
+        (cargo, seat)
+        for cargo in range(1, train.cargo_num + 1)
+        for seat in range(1, train.places_in_cargo + 1)
+    ][:hot_seats]
+    return [
+        (users[i % len(users)], rng.sample(seats, seats_per_order))
+        for i in range(orders)
+    ]
+
+
+def _book(client, journey, user, seats):
+    client.force_authenticate(user)
+    payload = {
+        "tickets": [
+            {"cargo": cargo, "seat": seat, "journey": journey.id}
+            for cargo, seat in seats
+        ]
+    }
+    try:
+        response = client.post(
+            reverse("station:order-list"), payload, format="json"
+        )
+    except Exception as exc:
+        return None, repr(exc)
+    return response.status_code, response.data
+
+
+def _worker(journey, plans, results, lock_times):
+    client = APIClient()
+    timer = LockTimer()
+    try:
+        with connection.execute_wrapper(timer):
+            while True:
+                try:
+                    user, seats = plans.get_nowait()
+                except queue.Empty:
+                    return
+                started = time.perf_counter()
+                status, data = _book(client, journey, user, seats)
+                results.append((status, time.perf_counter() - started, data))
+    finally:
+        lock_times.append(timer.seconds)
+        connection.close()
+
+
+def run_stress(journey, plan, workers):
+    """Book every planned order from ``workers`` threads, return a report"""
+    plans = queue.Queue()
+    for item in plan:
+        plans.put(item)
+
+    results = []
+    lock_times = []
+    threads = [
+        threading.Thread(
+            target=_worker, args=(journey, plans, results, lock_times)
+        )
+        for _ in range(workers)
+    ]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    latencies = sorted(latency for _, latency, _ in results)
+    statuses = [status for status, _, _ in results]
+    booked = statuses.count(201)
+    conflicts = statuses.count(400)
+    throttled = statuses.count(429)
+    errors = len(statuses) - booked - conflicts - throttled
+
+    return {
+        "orders": len(results),
+        "booked": booked,
+        "conflicts": conflicts,
+        "throttled": throttled,
+        "errors": errors,
+        "error_samples": [
+            (status, data)
+            for status, _, data in results
+            if status not in (201, 400, 429)
+        ][:5],
+        "seconds": elapsed,
+        "throughput": len(results) / elapsed if elapsed else 0.0,
+        "conflict_rate": conflicts / len(results) if results else 0.0,
+        "lock_wait": sum(lock_times),
+        "latency": {
+            "p50": percentile(latencies, 0.50),
+            "p95": percentile(latencies, 0.95),
+            "p99": percentile(latencies, 0.99),
+            "max": latencies[-1] if latencies else None,
+        },
+        "booked_orders": {
+            data["id"] for status, _, data in results if status == 201
+        },
+    }
+
+
+def check_invariants(journey, users, seats_per_order, booked_orders):
+    """
+    ``(problems, unconfirmed)``: broken booking invariants as readable
+    strings, and ids of complete orders whose request still failed (e.g.
+    the commit went through but reading the response back did not).
+    """
+    problems = []
+
+    double_booked = (
+        Ticket.objects.filter(journey=journey)
+        .values("cargo", "seat")
+        .annotate(count=Count("id"))
+        .filter(count__gt=1)
+    )
+    for row in double_booked:
+        problems.append(
+            f"Seat {row['cargo']}/{row['seat']} sold {row['count']} times"
+        )
+
+    ticket_counts = dict(
+        Order.objects.filter(user__in=users)
+        .annotate(count=Count("tickets"))
+        .values_list("id", "count")
+    )
+    for order_id, count in ticket_counts.items():
+        if count != seats_per_order:
+            problems.append(
+                f"Order {order_id} has {count} of {seats_per_order} tickets"
+            )
+    for order_id in booked_orders - ticket_counts.keys():
+        problems.append(f"Order {order_id} was confirmed but is missing")
+
+    if drifted([journey.id]).exists():
+        problems.append("Journey tickets_sold does not match its tickets")
+
+    unconfirmed = sorted(ticket_counts.keys() - booked_orders)
+    return problems, unconfirmed
@@ -0,0 +1,95 @@
+from datetime import datetime, timedelta, timezone
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from station.models import Journey, Order, Route, Station, Ticket, Train
+from station.pagination import EstimatedCountPaginator, estimated_count
+
+DAY = datetime(2024, 1, 11, 8, tzinfo=timezone.utc)
+
+
+class AdminChangelistTests(TestCase):
+    def setUp(self):
+        self.admin = get_user_model().objects.create_superuser(
+            "admin@test.com", "testpass"
+        )
+        self.client.force_login(self.admin)
+        self.order = Order.objects.create(user=self.admin)
+        self.hour = 0
+
+    def add_journey_with_ticket(self):
+        self.hour += 3
+        route = Route.objects.create(
+            source=Station.objects.create(
+                name=f"From {self.hour}", latitude=1, longitude=1
+            ),
+            destination=Station.objects.create(
+                name=f"To {self.hour}", latitude=2, longitude=2
+            ),
+        )
+        journey = Journey.objects.create(
+            route=route,
+            train=Train.objects.create(
+                name=f"Train {self.hour}", cargo_num=1, places_in_cargo=5
+            ),
+            departure_time=DAY + timedelta(hours=self.hour),
+            arrival_time=DAY + timedelta(hours=self.hour + 1),
+        )
+        Ticket(cargo=1, seat=1, journey=journey, order=self.order).save()
+
+    def changelist_queries(self, name):
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.get(
+                reverse(f"admin:station_{name}_changelist")
+            )
+        self.assertEqual(res.status_code, 200)
+        return len(queries)
+
+    def test_changelists_do_not_query_per_row(self):
+        for name in ("journey", "ticket", "order", "schedule"):
+            with self.subTest(changelist=name):
+                self.add_journey_with_ticket()
+                before = self.changelist_queries(name)
+                for _ in range(3):
+                    self.add_journey_with_ticket()
+                self.assertEqual(self.changelist_queries(name), before)
+
+    def test_foreign_keys_do_not_render_every_row(self):
+        for _ in range(2):
+            self.add_journey_with_ticket()
+        ticket = Ticket.objects.first()
+
+        res = self.client.get(
+            reverse("admin:station_ticket_change", args=[ticket.pk])
+        )
+
+        self.assertEqual(res.status_code, 200)
+        self.assertNotContains(res, f'<option value="{ticket.journey_id}"')
+
+
+class EstimatedCountTests(TestCase):
+    def setUp(self):
+        Station.objects.bulk_create(
+            Station(name=f"S{i}", latitude=i, longitude=i) for i in range(3)
+        )
+
+    def test_exact_count_without_planner_estimate(self):
+        self.assertEqual(estimated_count(Station.objects.all()), 3)
+        paginator = EstimatedCountPaginator(Station.objects.order_by("id"), 2)
+        self.assertEqual(paginator.num_pages, 2)
+
+    @mock.patch("station.pagination.planner_estimate")
+    def test_large_estimates_skip_exact_count(self, planner_estimate):
+        planner_estimate.return_value = 5_000_000
+
+        with self.assertNumQueries(0):
+            count = estimated_count(Station.objects.all())
+        self.assertEqual(count, 5_000_000)
+
+        planner_estimate.return_value = 10
+        self.assertEqual(estimated_count(Station.objects.all()), 3)
@@ -0,0 +1,151 @@
+from datetime import datetime, timedelta, timezone
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from station.allocation import (
+    ATTEMPTS,
+    AllocationError,
+    choose_seats,
+    free_runs,
+)
+from station.models import Journey, Order, Route, Station, Ticket, Train
+
+DAY = datetime(2024, 1, 11, 8, tzinfo=timezone.utc)
+
+
+def allocate_url(journey_id):
+    return reverse("station:journey-allocate", args=[journey_id])
+
+
+class ChooseSeatsTests(TestCase):
+    def test_free_runs(self):
+        # seats 2, 3 and 6 taken out of 7
+        self.assertEqual(
+            free_runs(0b0100110, 7), [(1, 1), (4, 2), (7, 1)]
+        )
+        self.assertEqual(free_runs(0, 3), [(1, 3)])
+        self.assertEqual(free_runs(0b111, 3), [])
+
+    def test_best_fit_run(self):
+        # cargo 1 has a free run of 4, cargo 2 a free run of exactly 2
+        bitmaps = {1: 0b000011110000, 2: 0b111111110011}
+
+        seats, together = choose_seats(bitmaps, 12, 2)
+
+        self.assertEqual(seats, [(2, 3), (2, 4)])
+        self.assertTrue(together)
+
+    def test_spreads_over_longest_runs_when_nothing_fits(self):
+        bitmaps = {1: 0b1011, 2: 0b0001}
+
+        seats, together = choose_seats(bitmaps, 4, 4)
+
+        self.assertEqual(seats, [(2, 2), (2, 3), (2, 4), (1, 3)])
+        self.assertFalse(together)
+
+    def test_not_together_takes_lowest_seats(self):
+        seats, _ = choose_seats({1: 0b0010, 2: 0}, 4, 2, together=False)
+
+        self.assertEqual(seats, [(1, 1), (1, 3)])
+
+    def test_not_enough_seats(self):
+        with self.assertRaises(AllocationError):
+            choose_seats({1: 0b1110}, 4, 2)
+
+
+class AllocateApiTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "admin@test.com", "testpass", is_staff=True
+        )
+        self.client.force_authenticate(self.user)
+
+        self.train = Train.objects.create(
+            name="Train", cargo_num=2, places_in_cargo=4,
+            first_class_cargo_num=1,
+        )
+        self.journey = Journey.objects.create(
+            route=Route.objects.create(
+                source=Station.objects.create(
+                    name="A", latitude=1, longitude=1
+                ),
+                destination=Station.objects.create(
+                    name="B", latitude=2, longitude=2
+                ),
+            ),
+            train=self.train,
+            departure_time=DAY,
+            arrival_time=DAY + timedelta(hours=2),
+        )
+        order = Order.objects.create(user=self.user)
+        for seat in (2, 3):
+            Ticket.objects.create(
+                cargo=1, seat=seat, journey=self.journey, order=order
+            )
+
+    def seats(self, data):
+        return [(ticket["cargo"], ticket["seat"]) for ticket in data]
+
+    def test_books_group_together(self):
+        res = self.client.post(allocate_url(self.journey.id) + "?count=3")
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertTrue(res.data["together"])
+        self.assertEqual(
+            self.seats(res.data["tickets"]), [(2, 1), (2, 2), (2, 3)]
+        )
+        self.journey.refresh_from_db()
+        self.assertEqual(self.journey.tickets_sold, 5)
+
+    def test_cargo_class_filter(self):
+        res = self.client.post(
+            allocate_url(self.journey.id) + "?count=2&cargo_class=first"
+        )
+
+        self.assertEqual(
+            self.seats(res.data["tickets"]), [(1, 1), (1, 4)]
+        )
+        self.assertFalse(res.data["together"])
+
+    def test_sold_out(self):
+        res = self.client.post(allocate_url(self.journey.id) + "?count=7")
+
+        self.assertEqual(res.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(Order.objects.count(), 1)
+
+    def test_contention_after_retries_is_a_conflict(self):
+        # a seat map that is always out of date: seat (1, 2) is taken
+        stale = mock.patch(
+            "station.allocation.taken_bitmaps",
+            side_effect=lambda journey: {1: 0, 2: 0},
+        )
+        with stale as taken_bitmaps:
+            res = self.client.post(
+                allocate_url(self.journey.id) + "?count=2&together=false"
+            )
+
+        self.assertEqual(res.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(taken_bitmaps.call_count, ATTEMPTS)
+        self.assertEqual(Order.objects.count(), 1)
+
+    def test_tickets_in_removed_cargos_are_ignored(self):
+        Ticket.objects.create(
+            cargo=2, seat=1, journey=self.journey, order=Order.objects.get()
+        )
+        Train.objects.filter(pk=self.train.pk).update(cargo_num=1)
+
+        res = self.client.post(allocate_url(self.journey.id) + "?count=1")
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self.seats(res.data["tickets"]), [(1, 1)])
+
+    def test_invalid_count(self):
+        res = self.client.post(allocate_url(self.journey.id) + "?count=0")
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
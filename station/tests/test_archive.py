@@ -0,0 +1,141 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from station.archive import archive_journeys, retention_cutoff
+from station.models import (
+    ArchivedJourney,
+    ArchivedTicket,
+    Crew,
+    Journey,
+    Order,
+    OutboxEvent,
+    Route,
+    RouteDailyStats,
+    Station,
+    Ticket,
+    Train,
+)
+
+ORDER_URL = reverse("station:order-list")
+
+
+class ArchiveTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(
+            "user@test.com", "testpass"
+        )
+        self.route = Route.objects.create(
+            source=Station.objects.create(name="A", latitude=1, longitude=1),
+            destination=Station.objects.create(
+                name="B", latitude=2, longitude=2
+            ),
+        )
+        self.train = Train.objects.create(
+            name="Train", cargo_num=1, places_in_cargo=10
+        )
+        self.crew = Crew.objects.create(first_name="Ann", last_name="Lee")
+        self.order = Order.objects.create(user=self.user)
+
+        self.old = self.create_journey(days_ago=400)
+        self.old.crew.add(self.crew)
+        self.old_tickets = [self.book(self.old, seat) for seat in (1, 2)]
+        self.upcoming = self.create_journey(days_ago=-10)
+        self.book(self.upcoming, 1)
+
+    def create_journey(self, days_ago):
+        departure = timezone.now() - timedelta(days=days_ago)
+        return Journey.objects.create(
+            route=self.route,
+            train=self.train,
+            departure_time=departure,
+            arrival_time=departure + timedelta(hours=2),
+        )
+
+    def book(self, journey, seat):
+        ticket = Ticket(cargo=1, seat=seat, journey=journey, order=self.order)
+        ticket.save()
+        return ticket
+
+    def test_moves_old_journeys_with_tickets_and_crew(self):
+        archived = archive_journeys(retention_cutoff(180))
+
+        self.assertEqual(archived, 1)
+        self.assertFalse(Journey.objects.filter(pk=self.old.pk).exists())
+        self.assertEqual(Ticket.objects.count(), 1)
+
+        journey = ArchivedJourney.objects.get(pk=self.old.pk)
+        self.assertEqual(journey.tickets_sold, 2)
+        self.assertEqual(journey.tickets_available, 8)
+        self.assertEqual(list(journey.crew.all()), [self.crew])
+        self.assertEqual(
+            set(journey.tickets.values_list("id", flat=True)),
+            {ticket.id for ticket in self.old_tickets},
+        )
+        self.assertTrue(Journey.objects.filter(pk=self.upcoming.pk).exists())
+
+    def test_archiving_is_not_a_cancellation(self):
+        stats = list(RouteDailyStats.objects.values())
+        events = OutboxEvent.objects.count()
+
+        archive_journeys(retention_cutoff(180))
+
+        self.assertEqual(list(RouteDailyStats.objects.values()), stats)
+        self.assertEqual(OutboxEvent.objects.count(), events)
+
+    def test_works_in_batches(self):
+        for days_ago in (300, 200):
+            self.create_journey(days_ago)
+        progress = []
+
+        archived = archive_journeys(
+            retention_cutoff(180), batch_size=2, log=progress.append
+        )
+
+        self.assertEqual(archived, 3)
+        self.assertEqual(progress, [2, 3])
+        self.assertEqual(ArchivedJourney.objects.count(), 3)
+
+    def test_order_history_includes_archived_tickets(self):
+        archive_journeys(retention_cutoff(180))
+        client = APIClient()
+        client.force_authenticate(self.user)
+
+        [order] = client.get(ORDER_URL).data
+        self.assertEqual(len(order["tickets"]), 3)
+        archived = [
+            ticket
+            for ticket in order["tickets"]
+            if ticket["journey"]["id"] == self.old.pk
+        ]
+        self.assertEqual(len(archived), 2)
+        self.assertEqual(archived[0]["journey"]["route"], "From A to B")
+        self.assertEqual(archived[0]["journey"]["tickets_available"], 8)
+        self.assertEqual(
+            set(archived[0]["journey"]), set(order["tickets"][0]["journey"])
+        )
+
+        res = client.get(reverse("station:order-detail", args=[order["id"]]))
+        self.assertEqual(
+            sorted(ticket["id"] for ticket in res.data["tickets"]),
+            sorted(
+                list(Ticket.objects.values_list("id", flat=True))
+                + list(ArchivedTicket.objects.values_list("id", flat=True))
+            ),
+        )
+
+    def test_command_dry_run_only_counts(self):
+        out = StringIO()
+
+        call_command("archive_journeys", "--dry-run", stdout=out)
+
+        self.assertIn("1 journey(s)", out.getvalue())
+        self.assertFalse(ArchivedJourney.objects.exists())
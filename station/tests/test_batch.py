@@ -0,0 +1,175 @@
+from datetime import datetime, timedelta, timezone
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.db.models import F
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from station.batch import BatchState
+from station.models import Journey, Route, Station, Train
+
+BATCH_URL = reverse("station:batch")
+STATION_URL = reverse("station:station-list")
+
+
+def station_detail_url(station_id):
+    return reverse("station:station-detail", args=[station_id])
+
+
+class MultiGetTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "test@test.com", "testpass"
+        )
+        self.client.force_authenticate(self.user)
+
+        self.stations = [
+            Station.objects.create(name=name, latitude=1, longitude=1)
+            for name in ("A", "B", "C")
+        ]
+
+    def test_ids_filters_list(self):
+        ids = f"{self.stations[0].id},{self.stations[2].id}"
+
+        res = self.client.get(STATION_URL, {"ids": ids})
+
+        self.assertEqual(
+            [station["name"] for station in res.data], ["A", "C"]
+        )
+
+    def test_invalid_ids_rejected(self):
+        res = self.client.get(STATION_URL, {"ids": "1,two"})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class BatchTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "test@test.com", "testpass"
+        )
+        self.client.force_authenticate(self.user)
+        self.station = Station.objects.create(
+            name="A", latitude=1, longitude=1
+        )
+
+    def batch(self, *paths, method="GET"):
+        return self.client.post(
+            BATCH_URL,
+            {"requests": [{"method": method, "path": path} for path in paths]},
+            format="json",
+        )
+
+    def test_runs_sub_requests(self):
+        res = self.batch(
+            station_detail_url(self.station.id),
+            station_detail_url(self.station.id + 100),
+            f"{STATION_URL}?fields=name",
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [item["status"] for item in res.data], [200, 404, 200]
+        )
+        self.assertEqual(res.data[0]["body"]["name"], "A")
+        self.assertEqual(res.data[2]["body"], [{"name": "A"}])
+
+    def test_duplicate_paths_run_once(self):
+        url = station_detail_url(self.station.id)
+
+        with CaptureQueriesContext(connection) as once:
+            self.batch(url)
+        with CaptureQueriesContext(connection) as twice:
+            res = self.batch(url, url)
+
+        self.assertEqual(len(once), len(twice))
+        self.assertEqual(res.data[0], res.data[1])
+
+    def test_streamed_sub_request_is_not_compressed(self):
+        res = self.client.post(
+            BATCH_URL,
+            {"requests": [{"path": f"{STATION_URL}?stream=true"}]},
+            format="json",
+            headers={"Accept-Encoding": "gzip"},
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data[0]["status"], 200)
+        self.assertEqual(res.data[0]["body"][0]["name"], "A")
+
+    def test_only_get_allowed(self):
+        res = self.batch(STATION_URL, method="POST")
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_paths_outside_station_api_not_found(self):
+        res = self.batch("/admin/", BATCH_URL)
+
+        self.assertEqual([item["status"] for item in res.data], [404, 404])
+
+    def test_requires_authentication(self):
+        res = APIClient().post(
+            BATCH_URL, {"requests": [{"path": STATION_URL}]}, format="json"
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_objects_loaded_earlier_in_the_batch_are_reused(self):
+        train = Train.objects.create(
+            name="Train", cargo_num=2, places_in_cargo=10
+        )
+        departure = datetime(2024, 1, 11, 8, tzinfo=timezone.utc)
+        journey = Journey.objects.create(
+            route=Route.objects.create(
+                source=self.station,
+                destination=Station.objects.create(
+                    name="B", latitude=2, longitude=2
+                ),
+            ),
+            train=train,
+            departure_time=departure,
+            arrival_time=departure + timedelta(hours=2),
+        )
+        train_url = reverse("station:train-detail", args=[train.id])
+        journey_url = reverse("station:journey-detail", args=[journey.id])
+        self.batch(train_url)
+
+        with CaptureQueriesContext(connection) as queries:
+            res = self.batch(journey_url, train_url)
+
+        self.assertEqual([item["status"] for item in res.data], [200, 200])
+        self.assertEqual(res.data[1]["body"]["name"], "Train")
+        self.assertFalse(
+            [
+                query
+                for query in queries
+                if 'FROM "station_train" WHERE' in query["sql"]
+            ]
+        )
+
+    def test_identity_map_skips_filtered_and_annotated_querysets(self):
+        state = BatchState()
+        state.remember(self.station)
+        stations = Station.objects.all()
+
+        self.assertIs(
+            state.lookup(stations, str(self.station.id)), self.station
+        )
+        self.assertIsNone(state.lookup(stations, "one"))
+        self.assertIsNone(
+            state.lookup(stations.filter(name="A"), self.station.id)
+        )
+        self.assertIsNone(
+            state.lookup(
+                stations.annotate(twice=F("latitude") * 2), self.station.id
+            )
+        )
+
+        state.remember(Station.objects.defer("latitude").get())
+        self.assertIsNone(state.lookup(stations, self.station.id))
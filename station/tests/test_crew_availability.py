@@ -0,0 +1,161 @@
+from datetime import datetime, timedelta, timezone
+
+from django.contrib.auth import get_user_model
+from django.db.models import F
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from station import versions
+from station.models import CacheVersion, Crew, Journey, Route, Station, Train
+from station.scheduling import NAME, IntervalIndex, crew_busy_index
+
+AVAILABLE_URL = reverse("station:crew-available")
+START = datetime(2024, 1, 11, 8, tzinfo=timezone.utc)
+
+
+def hours(n):
+    return START + timedelta(hours=n)
+
+
+def roster_url(crew_id):
+    return reverse("station:crew-roster", args=[crew_id])
+
+
+class IntervalIndexTests(TestCase):
+    def test_overlapping_walks_past_short_intervals(self):
+        index = IntervalIndex([(0, 10, "long"), (2, 3, "a"), (5, 6, "b")])
+
+        self.assertEqual(list(index.overlapping(7, 8)), ["long"])
+        self.assertEqual(list(index.overlapping(2, 6)), ["b", "a", "long"])
+        self.assertTrue(index.is_free(10, 12))
+
+
+class CrewAvailabilityTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "test@test.com", "testpass"
+        )
+        self.client.force_authenticate(self.user)
+
+        route = Route.objects.create(
+            source=Station.objects.create(name="A", latitude=1, longitude=1),
+            destination=Station.objects.create(
+                name="B", latitude=2, longitude=2
+            ),
+        )
+        train = Train.objects.create(
+            name="Train", cargo_num=2, places_in_cargo=10
+        )
+        self.busy = Crew.objects.create(first_name="Busy", last_name="One")
+        self.free = Crew.objects.create(first_name="Free", last_name="Two")
+
+        self.morning = Journey.objects.create(
+            route=route,
+            train=train,
+            departure_time=hours(0),
+            arrival_time=hours(4),
+        )
+        self.evening = Journey.objects.create(
+            route=route,
+            train=train,
+            departure_time=hours(10),
+            arrival_time=hours(12),
+        )
+        self.morning.crew.add(self.busy)
+        self.evening.crew.add(self.busy)
+
+    def test_available_excludes_busy_crew(self):
+        res = self.client.get(
+            AVAILABLE_URL,
+            {"from": hours(3).isoformat(), "to": hours(5).isoformat()},
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual([c["id"] for c in res.data], [self.free.id])
+
+    def test_available_between_journeys(self):
+        res = self.client.get(
+            AVAILABLE_URL,
+            {"from": hours(4).isoformat(), "to": hours(10).isoformat()},
+        )
+
+        self.assertEqual(len(res.data), 2)
+
+    def test_available_requires_window(self):
+        res = self.client.get(AVAILABLE_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_available_requires_from_before_to(self):
+        for start, end in ((hours(5), hours(3)), (hours(3), hours(3))):
+            res = self.client.get(
+                AVAILABLE_URL,
+                {"from": start.isoformat(), "to": end.isoformat()},
+            )
+
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertIn("to", res.data)
+
+    def test_index_follows_crew_changes(self):
+        self.client.get(
+            AVAILABLE_URL,
+            {"from": hours(3).isoformat(), "to": hours(5).isoformat()},
+        )
+        self.morning.crew.remove(self.busy)
+
+        res = self.client.get(
+            AVAILABLE_URL,
+            {"from": hours(3).isoformat(), "to": hours(5).isoformat()},
+        )
+
+        self.assertEqual(len(res.data), 2)
+
+    def test_journey_writes_reload_only_their_crew(self):
+        index = crew_busy_index()
+        busy = index[self.busy.id]
+
+        self.evening.save()
+        self.assertIs(crew_busy_index()[self.busy.id], busy)
+
+        self.evening.departure_time = hours(9)
+        self.evening.save()
+        with self.assertNumQueries(2):
+            # the stamp and the intervals of the one crew member
+            versions.recheck()
+            self.assertIs(crew_busy_index(), index)
+        self.assertIsNot(index[self.busy.id], busy)
+        self.assertFalse(index[self.busy.id].is_free(hours(9), hours(10)))
+
+    def test_changes_by_other_processes_are_picked_up(self):
+        crew_busy_index()
+        # another worker's assignment: its signal ran there, not here
+        Journey.crew.through.objects.create(
+            journey=self.morning, crew=self.free
+        )
+        CacheVersion.objects.filter(name=NAME).update(
+            version=F("version") + 1
+        )
+
+        res = self.client.get(
+            AVAILABLE_URL,
+            {"from": hours(3).isoformat(), "to": hours(5).isoformat()},
+        )
+
+        self.assertEqual(res.data, [])
+
+    def test_roster_lists_journeys_in_window(self):
+        res = self.client.get(
+            roster_url(self.busy.id), {"from": hours(5).isoformat()}
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual([j["id"] for j in res.data], [self.evening.id])
+
+        res = self.client.get(roster_url(self.busy.id))
+
+        self.assertEqual(
+            [j["id"] for j in res.data], [self.morning.id, self.evening.id]
+        )
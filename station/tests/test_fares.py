@@ -0,0 +1,146 @@
+from datetime import datetime, time, timezone
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.db.models import F
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from station import versions
+from station.fares import NAME, quote_journeys
+from station.models import (
+    CacheVersion,
+    FareBand,
+    Journey,
+    Order,
+    Route,
+    Station,
+    Tariff,
+    Ticket,
+    Train,
+    TrainType,
+)
+
+JOURNEY_URL = reverse("station:journey-list")
+ORDER_URL = reverse("station:order-list")
+
+
+class FareTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "admin@test.com", "testpass", is_staff=True
+        )
+        self.client.force_authenticate(self.user)
+
+        self.train_type = TrainType.objects.create(name="Express")
+        self.train = Train.objects.create(
+            name="Train",
+            cargo_num=4,
+            places_in_cargo=10,
+            first_class_cargo_num=1,
+            train_type=self.train_type,
+        )
+        self.route = Route.objects.create(
+            source=Station.objects.create(
+                name="A", latitude=50.45, longitude=30.52
+            ),
+            destination=Station.objects.create(
+                name="B", latitude=49.84, longitude=24.03
+            ),
+        )
+        self.journey = Journey.objects.create(
+            route=self.route,
+            train=self.train,
+            departure_time=datetime(2024, 1, 11, 8, tzinfo=timezone.utc),
+            arrival_time=datetime(2024, 1, 11, 14, tzinfo=timezone.utc),
+        )
+        Tariff.objects.create(
+            train_type=self.train_type,
+            base_fare=Decimal("10"),
+            price_per_km=Decimal("0.5"),
+            first_class_multiplier=Decimal("2"),
+        )
+        self.base = Decimal("10") + Decimal(
+            str(self.route.distance)
+        ) * Decimal("0.5")
+
+    def test_quote_uses_distance_and_tariff(self):
+        fares = quote_journeys([self.journey])
+
+        self.assertEqual(fares[0], self.base.quantize(Decimal("0.01")))
+
+    def test_band_multiplier_applied(self):
+        FareBand.objects.create(
+            name="Morning peak",
+            start_time=time(7),
+            end_time=time(10),
+            multiplier=Decimal("1.2"),
+        )
+
+        fares = quote_journeys([self.journey])
+
+        self.assertEqual(
+            fares[0],
+            (self.base * Decimal("1.2")).quantize(Decimal("0.01")),
+        )
+
+    def test_no_tariff_gives_no_fare(self):
+        Tariff.objects.all().delete()
+
+        self.assertIsNone(quote_journeys([self.journey])[0])
+
+    def test_journey_list_includes_fare(self):
+        res = self.client.get(JOURNEY_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            res.data[0]["fare"], str(self.base.quantize(Decimal("0.01")))
+        )
+
+    def test_order_stores_ticket_prices(self):
+        res = self.client.post(
+            ORDER_URL,
+            {
+                "tickets": [
+                    {"cargo": 1, "seat": 1, "journey": self.journey.id},
+                    {"cargo": 2, "seat": 1, "journey": self.journey.id},
+                ]
+            },
+            format="json",
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        order = Order.objects.get(id=res.data["id"])
+        first, standard = order.tickets.order_by("cargo")
+        self.assertEqual(standard.price, self.base.quantize(Decimal("0.01")))
+        self.assertEqual(
+            first.price, (self.base * 2).quantize(Decimal("0.01"))
+        )
+
+    def test_tariff_change_invalidates_fare_table(self):
+        quote_journeys([self.journey])
+        Tariff.objects.update(price_per_km=Decimal("1"))
+        Tariff.objects.get().save()
+
+        fares = quote_journeys([self.journey])
+
+        expected = Decimal("10") + Decimal(str(self.route.distance))
+        self.assertEqual(fares[0], expected.quantize(Decimal("0.01")))
+
+    def test_changes_by_other_processes_are_picked_up(self):
+        quote_journeys([self.journey])
+        # what another worker's save leaves behind: new rows and stamp,
+        # but this process's fare table was not invalidated
+        Tariff.objects.update(price_per_km=Decimal("1"))
+        CacheVersion.objects.filter(name=NAME).update(
+            version=F("version") + 1
+        )
+        versions.recheck()
+
+        fares = quote_journeys([self.journey])
+
+        expected = Decimal("10") + Decimal(str(self.route.distance))
+        self.assertEqual(fares[0], expected.quantize(Decimal("0.01")))
@@ -0,0 +1,86 @@
+from datetime import datetime, timedelta, timezone
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from station.models import Journey, Route, Station, Train
+
+TRAIN_URL = reverse("station:train-list")
+JOURNEY_URL = reverse("station:journey-list")
+DAY = datetime(2024, 1, 11, 8, tzinfo=timezone.utc)
+
+
+class SparseFieldsetTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "test@test.com", "testpass"
+        )
+        self.client.force_authenticate(self.user)
+
+        self.train = Train.objects.create(
+            name="Train", cargo_num=2, places_in_cargo=10
+        )
+        Journey.objects.create(
+            route=Route.objects.create(
+                source=Station.objects.create(
+                    name="A", latitude=1, longitude=1
+                ),
+                destination=Station.objects.create(
+                    name="B", latitude=2, longitude=2
+                ),
+            ),
+            train=self.train,
+            departure_time=DAY,
+            arrival_time=DAY + timedelta(hours=2),
+        )
+
+    def get_with_sql(self, url, params):
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.get(url, params)
+        return res, "\n".join(query["sql"] for query in queries)
+
+    def test_fields_limits_payload_and_columns(self):
+        res, sql = self.get_with_sql(TRAIN_URL, {"fields": "id,name"})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(list(res.data[0]), ["id", "name"])
+        self.assertNotIn('"station_train"."image"', sql)
+
+    def test_omit_removes_fields(self):
+        res = self.client.get(TRAIN_URL, {"omit": "image"})
+
+        self.assertEqual(list(res.data[0]), ["id", "name", "train_type"])
+
+    def test_dropping_tickets_available_skips_aggregate(self):
+        res, sql = self.get_with_sql(
+            JOURNEY_URL, {"fields": "id,departure_time,route"}
+        )
+
+        self.assertEqual(
+            list(res.data[0]), ["id", "route", "departure_time"]
+        )
+        self.assertNotIn("COUNT(", sql)
+        self.assertNotIn('"station_train"."image"', sql)
+
+        res, sql = self.get_with_sql(JOURNEY_URL, {"fields": "id"})
+
+        self.assertNotIn("station_station", sql)
+
+    def test_rendering_tickets_available_skips_ticket_join(self):
+        res, sql = self.get_with_sql(
+            JOURNEY_URL, {"fields": "id,tickets_available"}
+        )
+
+        self.assertEqual(res.data[0]["tickets_available"], 20)
+        self.assertNotIn("station_ticket", sql)
+
+    def test_unknown_field_rejected(self):
+        res = self.client.get(TRAIN_URL, {"fields": "id,colour"})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
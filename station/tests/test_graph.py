@@ -0,0 +1,134 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.db.models import F
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from station.graph import NAME, StationGraph, get_graph
+from station.models import CacheVersion, Route, Station
+
+SHORTEST_URL = reverse("station:route-shortest")
+REACHABLE_URL = reverse("station:route-reachable")
+
+
+class StationGraphTests(TestCase):
+    def setUp(self):
+        # 1 -> 2 -> 3 is shorter than the direct 1 -> 3, 4 is isolated
+        self.graph = StationGraph(
+            [1, 2, 3, 4],
+            [(1, 2, 10.0, 100), (2, 3, 5.0, 101), (1, 3, 20.0, 102)],
+        )
+
+    def test_shortest_path(self):
+        self.assertEqual(
+            self.graph.shortest_path(1, 3), (15.0, [1, 2, 3], [100, 101])
+        )
+        self.assertEqual(self.graph.shortest_path(1, 1), (0.0, [1], []))
+
+    def test_routes_are_directed(self):
+        self.assertIsNone(self.graph.shortest_path(3, 1))
+        self.assertIsNone(self.graph.shortest_path(1, 4))
+
+    def test_reachable(self):
+        self.assertEqual(self.graph.reachable(1), {2: 10.0, 3: 15.0})
+        self.assertEqual(self.graph.reachable(3), {})
+
+    def test_trees_are_cached(self):
+        first = self.graph.tree(1)
+
+        self.assertIs(self.graph.tree(1), first)
+
+
+class ShortestRouteApiTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "test@test.com", "testpass"
+        )
+        self.client.force_authenticate(self.user)
+
+        self.a, self.b, self.c = (
+            Station.objects.create(name=name, latitude=lat, longitude=1)
+            for name, lat in (("A", 1), ("B", 2), ("C", 3))
+        )
+        self.ab = Route.objects.create(source=self.a, destination=self.b)
+
+    def test_shortest_path(self):
+        bc = Route.objects.create(source=self.b, destination=self.c)
+
+        res = self.client.get(
+            SHORTEST_URL, {"from": self.a.id, "to": self.c.id}
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(res.data["reachable"])
+        self.assertEqual(
+            [station["name"] for station in res.data["stations"]],
+            ["A", "B", "C"],
+        )
+        self.assertEqual(res.data["routes"], [self.ab.id, bc.id])
+        self.assertAlmostEqual(
+            res.data["distance_km"], self.ab.distance + bc.distance
+        )
+
+    def test_graph_rebuilt_when_routes_change(self):
+        res = self.client.get(
+            SHORTEST_URL, {"from": self.a.id, "to": self.c.id}
+        )
+        self.assertFalse(res.data["reachable"])
+        graph = get_graph()
+
+        Route.objects.create(source=self.b, destination=self.c)
+
+        self.assertIsNot(get_graph(), graph)
+        res = self.client.get(REACHABLE_URL, {"from": self.a.id})
+        self.assertEqual(
+            [item["station"] for item in res.data], [self.b.id, self.c.id]
+        )
+
+    def test_changes_by_other_processes_are_picked_up(self):
+        params = {"from": self.a.id, "to": self.c.id}
+        self.client.get(SHORTEST_URL, params)
+        # another worker's route: its signal ran there, not here
+        Route.objects.bulk_create(
+            [Route(source=self.b, destination=self.c)]
+        )
+        CacheVersion.objects.filter(name=NAME).update(
+            version=F("version") + 1
+        )
+
+        res = self.client.get(SHORTEST_URL, params)
+
+        self.assertTrue(res.data["reachable"])
+
+    def test_station_deleted_since_graph_was_built(self):
+        params = {"from": self.a.id, "to": self.b.id}
+        self.client.get(SHORTEST_URL, params)
+        graph = get_graph()
+        Station.objects.filter(pk=self.b.pk).delete()
+
+        with mock.patch("station.views.get_graph", return_value=graph):
+            res = self.client.get(SHORTEST_URL, params)
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_cached_query_skips_database(self):
+        params = {"from": self.a.id, "to": self.b.id}
+        self.client.get(SHORTEST_URL, params)
+
+        with self.assertNumQueries(2):
+            # only the cache stamps and the station names for the response
+            self.client.get(SHORTEST_URL, params)
+
+    def test_unknown_station(self):
+        res = self.client.get(SHORTEST_URL, {"from": self.a.id, "to": 999})
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_missing_param(self):
+        res = self.client.get(SHORTEST_URL, {"from": self.a.id})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,143 @@
+from datetime import datetime, timedelta, timezone
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db.models import F
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone as dj_timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from station.models import (
+    IdempotencyKey,
+    Journey,
+    Order,
+    Route,
+    Station,
+    Ticket,
+    Train,
+)
+
+ORDER_URL = reverse("station:order-list")
+DAY = datetime(2024, 1, 11, 8, tzinfo=timezone.utc)
+
+
+class IdempotencyTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "admin@admin.com", "testpass", is_staff=True
+        )
+        self.client.force_authenticate(self.user)
+
+        self.journey = Journey.objects.create(
+            route=Route.objects.create(
+                source=Station.objects.create(
+                    name="A", latitude=1, longitude=1
+                ),
+                destination=Station.objects.create(
+                    name="B", latitude=2, longitude=2
+                ),
+            ),
+            train=Train.objects.create(
+                name="Train", cargo_num=2, places_in_cargo=10
+            ),
+            departure_time=DAY,
+            arrival_time=DAY + timedelta(hours=2),
+        )
+
+    def book(self, seat, key=None):
+        headers = {"HTTP_IDEMPOTENCY_KEY": key} if key else {}
+        return self.client.post(
+            ORDER_URL,
+            {
+                "tickets": [
+                    {"cargo": 1, "seat": seat, "journey": self.journey.id}
+                ]
+            },
+            format="json",
+            **headers,
+        )
+
+    def test_retry_replays_original_response(self):
+        first = self.book(1, key="abc")
+        retry = self.book(1, key="abc")
+
+        self.assertEqual(first.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(retry.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(retry.data, first.data)
+        self.assertEqual(retry["Idempotent-Replayed"], "true")
+        self.assertEqual(Order.objects.count(), 1)
+        self.assertEqual(Ticket.objects.count(), 1)
+
+    def test_key_reused_with_other_body_rejected(self):
+        self.book(1, key="abc")
+
+        res = self.book(2, key="abc")
+
+        self.assertEqual(res.status_code, status.HTTP_422_UNPROCESSABLE_ENTITY)
+        self.assertEqual(Ticket.objects.count(), 1)
+
+    def test_overlong_key_rejected(self):
+        res = self.book(1, key="k" * 256)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Order.objects.exists())
+        self.assertFalse(IdempotencyKey.objects.exists())
+
+        self.assertEqual(
+            self.book(1, key="k" * 255).status_code, status.HTTP_201_CREATED
+        )
+
+    def test_requests_without_key_are_not_deduplicated(self):
+        self.book(1)
+        res = self.book(1)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(IdempotencyKey.objects.exists())
+
+    @override_settings(IDEMPOTENCY_WAIT_TIMEOUT=0)
+    def test_duplicate_of_in_flight_request_conflicts(self):
+        first = self.book(1, key="abc")
+        IdempotencyKey.objects.update(status_code=None, response=None)
+
+        res = self.book(1, key="abc")
+
+        self.assertEqual(first.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(res.status_code, status.HTTP_409_CONFLICT)
+
+    @override_settings(IDEMPOTENCY_WAIT_TIMEOUT=0)
+    def test_abandoned_in_flight_key_is_taken_over(self):
+        self.book(1, key="abc")
+        # the request crashed before its order was committed
+        Order.objects.all().delete()
+        IdempotencyKey.objects.update(
+            status_code=None,
+            response=None,
+            claimed_at=dj_timezone.now() - timedelta(minutes=1),
+        )
+
+        res = self.book(1, key="abc")
+        self.assertEqual(res.status_code, status.HTTP_409_CONFLICT)
+
+        IdempotencyKey.objects.update(
+            claimed_at=F("claimed_at") - settings.IDEMPOTENCY_CLAIM_LEASE
+        )
+        res = self.book(1, key="abc")
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Order.objects.count(), 1)
+        self.assertEqual(
+            IdempotencyKey.objects.get().status_code, status.HTTP_201_CREATED
+        )
+
+    def test_expired_key_runs_request_again(self):
+        self.book(1, key="abc")
+        IdempotencyKey.objects.update(
+            expires_at=datetime(2000, 1, 1, tzinfo=timezone.utc)
+        )
+
+        res = self.book(2, key="abc")
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Order.objects.count(), 2)
@@ -0,0 +1,161 @@
+import io
+import shutil
+import tempfile
+from datetime import datetime, timedelta, timezone
+from unittest import mock
+
+from PIL import Image
+from django.contrib.auth import get_user_model
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from station import images
+from station.models import Journey, Route, Station, Train
+
+TRAIN_URL = reverse("station:train-list")
+JOURNEY_URL = reverse("station:journey-list")
+DAY = datetime(2024, 1, 11, 8, tzinfo=timezone.utc)
+
+
+def upload_url(train_id):
+    return reverse("station:train-upload-image", args=[train_id])
+
+
+def jpeg(size=(800, 400)):
+    buffer = io.BytesIO()
+    Image.new("RGB", size, "red").save(buffer, format="JPEG")
+    return SimpleUploadedFile(
+        "photo.jpg", buffer.getvalue(), content_type="image/jpeg"
+    )
+
+
+@override_settings(IMAGE_VARIANTS={"WORKERS": 0})
+class ImageVariantTests(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        media = override_settings(MEDIA_ROOT=self.media_root)
+        media.enable()
+        self.addCleanup(media.disable)
+        self.addCleanup(shutil.rmtree, self.media_root)
+
+        self.client = APIClient()
+        self.client.force_authenticate(
+            get_user_model().objects.create_user(
+                "admin@test.com", "testpass", is_staff=True
+            )
+        )
+        self.train = Train.objects.create(
+            name="Intercity", cargo_num=2, places_in_cargo=10
+        )
+
+    def upload(self):
+        return self.client.post(
+            upload_url(self.train.id), {"image": jpeg()}, format="multipart"
+        )
+
+    def test_upload_generates_variants_after_commit(self):
+        with mock.patch(
+            "station.images.generate_variants",
+            wraps=images.generate_variants,
+        ) as generate, self.captureOnCommitCallbacks(execute=True):
+            res = self.upload()
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data["image_variants"], {})
+
+        self.train.refresh_from_db()
+        generate.assert_called_once_with(
+            self.train.id, self.train.image.name
+        )
+        variants = images.current_variants(self.train)
+        self.assertEqual(set(variants), set(images.VARIANTS))
+        for variant, (size, image_format, _) in images.VARIANTS.items():
+            with default_storage.open(variants[variant]) as file:
+                image = Image.open(file)
+                self.assertEqual(image.format, image_format)
+                self.assertEqual(image.size, (size, size // 2))
+
+    def test_workers_generate_variants_off_the_request(self):
+        pool = mock.Mock()
+        with override_settings(IMAGE_VARIANTS={"WORKERS": 2}), mock.patch(
+            "station.images.executor", return_value=pool
+        ), self.captureOnCommitCallbacks(execute=True):
+            self.upload()
+
+        self.train.refresh_from_db()
+        pool.submit.assert_called_once_with(
+            images._run, self.train.id, self.train.image.name
+        )
+        self.assertEqual(self.train.image_variants, {})
+
+    def test_lists_link_thumbnail_once_generated(self):
+        self.upload()
+        Journey.objects.create(
+            route=Route.objects.create(
+                source=Station.objects.create(
+                    name="A", latitude=1, longitude=1
+                ),
+                destination=Station.objects.create(
+                    name="B", latitude=2, longitude=2
+                ),
+            ),
+            train=self.train,
+            departure_time=DAY,
+            arrival_time=DAY + timedelta(hours=2),
+        )
+        self.train.refresh_from_db()
+        original = self.train.image.name
+
+        res = self.client.get(TRAIN_URL)
+        self.assertTrue(res.data[0]["image"].endswith(original))
+
+        images.generate_variants(self.train.id, original)
+
+        res = self.client.get(TRAIN_URL)
+        self.assertTrue(res.data[0]["image"].endswith(".thumbnail.jpg"))
+        res = self.client.get(JOURNEY_URL)
+        self.assertTrue(res.data[0]["train_image"].endswith(".thumbnail.jpg"))
+        res = self.client.get(
+            reverse("station:train-detail", args=[self.train.id])
+        )
+        self.assertTrue(res.data["image"].endswith(original))
+        self.assertTrue(
+            res.data["image_variants"]["webp"].startswith("http://")
+        )
+
+    def test_variants_of_a_replaced_image_are_not_used(self):
+        self.upload()
+        self.train.refresh_from_db()
+        old = self.train.image.name
+        images.generate_variants(self.train.id, old)
+
+        self.upload()
+        self.train.refresh_from_db()
+
+        self.assertEqual(images.current_variants(self.train), {})
+        self.assertIsNone(images.generate_variants(self.train.id, old))
+        self.assertTrue(images.needs_variants(self.train))
+
+    def test_unreadable_image_is_skipped(self):
+        name = default_storage.save(
+            "uploads/trains/broken.jpg", io.BytesIO(b"not an image")
+        )
+        Train.objects.filter(pk=self.train.pk).update(image=name)
+
+        with self.assertLogs("station.images", "WARNING"):
+            self.assertIsNone(images.generate_variants(self.train.id, name))
+
+    def test_command_fills_in_missing_variants(self):
+        self.upload()
+        out = io.StringIO()
+
+        call_command("generate_image_variants", stdout=out)
+
+        self.train.refresh_from_db()
+        self.assertFalse(images.needs_variants(self.train))
+        self.assertIn("1 image(s)", out.getvalue())
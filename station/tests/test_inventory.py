@@ -0,0 +1,239 @@
+from datetime import datetime, timedelta, timezone
+from io import StringIO
+
+from django.contrib.admin import site
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import IntegrityError, connection, transaction
+from django.forms import model_to_dict
+from django.test import RequestFactory, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from station import inventory
+from station.models import (
+    Journey,
+    Order,
+    Route,
+    Schedule,
+    Station,
+    Ticket,
+    Train,
+)
+
+JOURNEY_URL = reverse("station:journey-list")
+DAY = datetime(2024, 1, 11, 8, tzinfo=timezone.utc)
+
+
+class TicketsSoldTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            "test@test.com", "testpass"
+        )
+        self.order = Order.objects.create(user=self.user)
+        self.route = Route.objects.create(
+            source=Station.objects.create(name="A", latitude=1, longitude=1),
+            destination=Station.objects.create(
+                name="B", latitude=2, longitude=2
+            ),
+        )
+        self.train = Train.objects.create(
+            name="Train", cargo_num=2, places_in_cargo=2
+        )
+        self.journey = self.create_journey(DAY)
+
+    def create_journey(self, departure_time):
+        return Journey.objects.create(
+            route=self.route,
+            train=self.train,
+            departure_time=departure_time,
+            arrival_time=departure_time + timedelta(hours=2),
+        )
+
+    def book(self, seat, journey=None):
+        return Ticket.objects.create(
+            cargo=1, seat=seat, journey=journey or self.journey,
+            order=self.order,
+        )
+
+    def counters(self, journey=None):
+        journey = journey or self.journey
+        journey.refresh_from_db()
+        return journey.capacity, journey.tickets_sold
+
+    def test_create_and_delete_move_counter(self):
+        ticket = self.book(1)
+        self.book(2)
+        self.assertEqual(self.counters(), (4, 2))
+
+        ticket.delete()
+        self.assertEqual(self.counters(), (4, 1))
+
+        self.order.delete()
+        self.assertEqual(self.counters(), (4, 0))
+
+    def test_moving_ticket_between_journeys(self):
+        other = self.create_journey(DAY + timedelta(days=1))
+        ticket = self.book(1)
+
+        ticket.journey = other
+        ticket.save()
+
+        self.assertEqual(self.counters()[1], 0)
+        self.assertEqual(self.counters(other)[1], 1)
+
+    def test_bulk_create_counts_per_journey(self):
+        other = self.create_journey(DAY + timedelta(days=1))
+
+        Ticket.objects.bulk_create(
+            [
+                Ticket(cargo=1, seat=1, journey=self.journey,
+                       order=self.order),
+                Ticket(cargo=1, seat=2, journey=self.journey,
+                       order=self.order),
+                Ticket(cargo=1, seat=1, journey=other, order=self.order),
+            ]
+        )
+
+        self.assertEqual(self.counters()[1], 2)
+        self.assertEqual(self.counters(other)[1], 1)
+
+    def test_train_resize_updates_capacity(self):
+        self.train.cargo_num = 3
+        self.train.save()
+
+        self.assertEqual(self.counters()[0], 6)
+
+    def test_train_rename_leaves_journeys_alone(self):
+        self.train.name = "Renamed"
+
+        with CaptureQueriesContext(connection) as queries:
+            self.train.save()
+
+        self.assertFalse(
+            [
+                query
+                for query in queries
+                if query["sql"].startswith('UPDATE "station_journey"')
+            ]
+        )
+
+    def test_constraint_rejects_overselling(self):
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Journey.objects.filter(pk=self.journey.pk).update(
+                tickets_sold=5
+            )
+
+    def test_reconcile_fixes_drift(self):
+        self.book(1)
+        Journey.objects.filter(pk=self.journey.pk).update(
+            tickets_sold=0, capacity=3
+        )
+        out = StringIO()
+
+        call_command("reconcile_tickets_sold", stdout=out)
+
+        self.assertIn("1 journey", out.getvalue())
+        self.assertEqual(self.counters(), (4, 1))
+        self.assertEqual(inventory.reconcile(), 0)
+
+    def test_list_filters_and_sorts_by_availability(self):
+        other = self.create_journey(DAY + timedelta(days=1))
+        self.book(1)
+        self.book(2)
+        self.book(1, journey=other)
+        client = APIClient()
+        client.force_authenticate(self.user)
+
+        res = client.get(JOURNEY_URL, {"ordering": "tickets_available"})
+        self.assertEqual(
+            [journey["tickets_available"] for journey in res.data], [2, 3]
+        )
+
+        res = client.get(JOURNEY_URL, {"available": 3})
+        self.assertEqual([journey["id"] for journey in res.data], [other.id])
+
+    def test_available_must_be_a_non_negative_number(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+
+        for available in ("two", "-1"):
+            res = client.get(JOURNEY_URL, {"available": available})
+            self.assertEqual(res.status_code, 400)
+            res = client.get(
+                JOURNEY_URL, {"available": available, "date": "2024-01-11"}
+            )
+            self.assertEqual(res.status_code, 400)
+
+    def test_shrinking_train_below_tickets_sold_rejected(self):
+        self.book(1)
+        self.book(2)
+        self.book(1, journey=self.create_journey(DAY + timedelta(days=1)))
+        client = APIClient()
+        client.force_authenticate(
+            get_user_model().objects.create_user(
+                "admin@test.com", "testpass", is_staff=True
+            )
+        )
+        url = reverse("station:train-detail", args=[self.train.id])
+
+        res = client.patch(url, {"cargo_num": 1, "places_in_cargo": 1})
+
+        self.assertEqual(res.status_code, 400)
+        self.assertIn(
+            f"Journey {self.journey.id} already has 2 tickets sold",
+            res.data["non_field_errors"][0],
+        )
+        self.assertEqual(len(res.data["non_field_errors"]), 1)
+        self.assertEqual(self.counters(), (4, 2))
+
+        res = client.patch(url, {"cargo_num": 1})
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(self.counters(), (2, 2))
+
+    def test_sold_out_occurrence_is_not_offered_again(self):
+        schedule = Schedule.objects.create(
+            route=self.route,
+            train=self.train,
+            departure_time=DAY.time(),
+            duration=timedelta(hours=2),
+            weekdays=Schedule.ALL_WEEKDAYS,
+            valid_from=DAY.date(),
+            valid_until=DAY.date() + timedelta(days=30),
+        )
+        Journey.objects.filter(pk=self.journey.pk).update(schedule=schedule)
+        for seat in (1, 2):
+            self.book(seat)
+            Ticket.objects.create(
+                cargo=2, seat=seat, journey=self.journey, order=self.order
+            )
+        client = APIClient()
+        client.force_authenticate(self.user)
+
+        res = client.get(
+            JOURNEY_URL, {"date": DAY.date().isoformat(), "available": 1}
+        )
+
+        self.assertEqual(res.data, [])
+
+    def test_admin_rejects_shrinking_train_below_tickets_sold(self):
+        self.book(1)
+        self.book(2)
+        request = RequestFactory().get("/")
+        request.user = self.user
+        form_class = site._registry[Train].get_form(request, self.train)
+        data = model_to_dict(self.train, exclude=["image"])
+
+        form = form_class({**data, "cargo_num": 1}, instance=self.train)
+        self.assertEqual(form.non_field_errors(), [])
+
+        form = form_class(
+            {**data, "cargo_num": 1, "places_in_cargo": 1},
+            instance=self.train,
+        )
+        self.assertFalse(form.is_valid())
+        self.assertIn(
+            f"Journey {self.journey.id} already has 2 tickets sold",
+            form.non_field_errors()[0],
+        )
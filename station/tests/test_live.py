@@ -0,0 +1,179 @@
+import asyncio
+import json
+from datetime import datetime, timedelta, timezone
+
+from unittest import mock
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework_simplejwt.tokens import AccessToken
+
+from station import live
+from station.models import Journey, Order, Route, Station, Ticket, Train
+from train_station_api_service import asgi
+
+DAY = datetime(2024, 1, 11, 8, tzinfo=timezone.utc)
+
+
+def stream_url(journey_id):
+    return reverse("station:journey-seats-stream", args=[journey_id])
+
+
+async def next_event(stream):
+    chunk = await asyncio.wait_for(anext(stream), 5)
+    name, data = chunk.strip().split("\n")
+    return name.removeprefix("event: "), json.loads(
+        data.removeprefix("data: ")
+    )
+
+
+class SeatStreamTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            "test@test.com", "testpass"
+        )
+        self.journey = Journey.objects.create(
+            route=Route.objects.create(
+                source=Station.objects.create(
+                    name="A", latitude=1, longitude=1
+                ),
+                destination=Station.objects.create(
+                    name="B", latitude=2, longitude=2
+                ),
+            ),
+            train=Train.objects.create(
+                name="Train", cargo_num=2, places_in_cargo=10
+            ),
+            departure_time=DAY,
+            arrival_time=DAY + timedelta(hours=2),
+        )
+        self.order = Order.objects.create(user=self.user)
+
+    def book(self, seat):
+        return Ticket.objects.create(
+            cargo=1, seat=seat, journey=self.journey, order=self.order
+        )
+
+    def committed(self, change, *args):
+        # on_commit hooks live on the connection of the thread that ran
+        # the change, so they are captured there
+        with self.captureOnCommitCallbacks(execute=True):
+            return change(*args)
+
+    async def open_stream(self):
+        stream = live.event_stream(self.journey.id)
+        self.assertEqual(await anext(stream), "retry: 3000\n\n")
+        return stream
+
+    async def test_snapshot_then_delta_on_commit(self):
+        await sync_to_async(self.book)(1)
+        stream = await self.open_stream()
+
+        name, data = await next_event(stream)
+        self.assertEqual(name, "snapshot")
+        self.assertEqual(data["tickets_available"], 19)
+        self.assertEqual(data["taken_places"], [{"cargo": 1, "seat": 1}])
+
+        ticket = await sync_to_async(self.committed)(self.book, 2)
+        name, data = await next_event(stream)
+        self.assertEqual(name, "delta")
+        self.assertEqual(data["taken"], [{"cargo": 1, "seat": 2}])
+        self.assertEqual(data["tickets_available"], 18)
+
+        await sync_to_async(self.committed)(ticket.delete)
+        name, data = await next_event(stream)
+        self.assertEqual(data["released"], [{"cargo": 1, "seat": 2}])
+
+        await stream.aclose()
+        self.assertNotIn(self.journey.id, live._publishers)
+
+    async def test_watchers_share_one_publisher(self):
+        first = await self.open_stream()
+        second = await self.open_stream()
+        await next_event(first)
+        await next_event(second)
+
+        self.assertEqual(len(live._publishers), 1)
+        publisher = live._publishers[self.journey.id]
+        self.assertEqual(len(publisher.subscribers), 2)
+
+        await first.aclose()
+        await second.aclose()
+
+    async def test_publishers_only_reread_when_notified(self):
+        stream = await self.open_stream()
+        await next_event(stream)
+
+        # no on_commit hook runs, as if another worker sold the ticket
+        await sync_to_async(self.book)(3)
+        await asyncio.sleep(0.2)
+        (queue,) = live._publishers[self.journey.id].subscribers
+        self.assertTrue(queue.empty())
+
+        # what the listener does for a NOTIFY, or after reconnecting
+        live.notify_all()
+        name, data = await next_event(stream)
+        self.assertEqual(name, "delta")
+        self.assertEqual(data["taken"], [{"cargo": 1, "seat": 3}])
+        await stream.aclose()
+
+    async def test_token_query_parameter(self):
+        token = AccessToken.for_user(self.user)
+
+        res = await self.async_client.get(
+            stream_url(self.journey.id), {"token": str(token)}
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res["Content-Type"], "text/event-stream")
+        stream = aiter(res.streaming_content)
+        self.assertEqual(await anext(stream), b"retry: 3000\n\n")
+        await stream.aclose()
+
+    def test_invalid_token_query_parameter(self):
+        res = self.client.get(stream_url(self.journey.id), {"token": "bad"})
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_requires_authentication(self):
+        res = self.client.get(stream_url(self.journey.id))
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_unknown_journey(self):
+        token = AccessToken.for_user(self.user)
+
+        res = self.client.get(
+            stream_url(self.journey.id + 100),
+            HTTP_AUTHORIZATION=f"Bearer {token}",
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class AsgiRoutingTests(SimpleTestCase):
+    async def served_by(self, path):
+        with mock.patch.object(
+            asgi, "asgi_application", mock.AsyncMock()
+        ) as asgi_app, mock.patch.object(
+            asgi, "wsgi_application", mock.AsyncMock()
+        ) as wsgi_app:
+            await asgi.application(
+                {"type": "http", "path": path}, mock.Mock(), mock.Mock()
+            )
+        self.assertNotEqual(asgi_app.called, wsgi_app.called)
+        return "asgi" if asgi_app.called else "wsgi"
+
+    async def test_only_async_views_use_the_asgi_handler(self):
+        self.assertEqual(await self.served_by(stream_url(1)), "asgi")
+        # sync streaming responses would be read into memory there
+        self.assertEqual(
+            await self.served_by(reverse("station:journey-list")), "wsgi"
+        )
+        self.assertEqual(
+            await self.served_by("/media/uploads/trains/ic-1.jpg"), "wsgi"
+        )
+        self.assertEqual(await self.served_by("/missing/"), "wsgi")
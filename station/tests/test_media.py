@@ -0,0 +1,135 @@
+import shutil
+import tempfile
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.test import SimpleTestCase, override_settings
+
+from station.media import IMMUTABLE, REVALIDATE, byte_range
+
+CONTENT = b"0123456789" * 10
+
+
+class MediaServingTests(SimpleTestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        media = override_settings(MEDIA_ROOT=self.media_root)
+        media.enable()
+        self.addCleanup(media.disable)
+        self.addCleanup(shutil.rmtree, self.media_root)
+
+        self.name = default_storage.save(
+            "uploads/trains/ic-1.jpg", ContentFile(CONTENT)
+        )
+        self.url = default_storage.url(self.name)
+
+    def body(self, res):
+        return b"".join(res.streaming_content)
+
+    def test_url_carries_content_hash(self):
+        digest = self.url.split("/")[2]
+
+        self.assertRegex(self.url, rf"^/media/[0-9a-f]{{16}}/{self.name}$")
+
+        default_storage.delete(self.name)
+        default_storage.save(self.name, ContentFile(b"other"))
+        self.assertNotIn(digest, default_storage.url(self.name))
+
+    def test_hashed_url_is_immutable(self):
+        res = self.client.get(self.url)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(self.body(res), CONTENT)
+        self.assertEqual(res["Cache-Control"], IMMUTABLE)
+        self.assertEqual(res["Accept-Ranges"], "bytes")
+        self.assertEqual(res["Content-Type"], "image/jpeg")
+
+    def test_unhashed_url_must_be_revalidated(self):
+        res = self.client.get(f"/media/{self.name}")
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res["Cache-Control"], REVALIDATE)
+
+    def test_matching_etag_is_not_modified(self):
+        etag = self.client.get(self.url)["ETag"]
+
+        res = self.client.get(self.url, headers={"If-None-Match": etag})
+
+        self.assertEqual(res.status_code, 304)
+        self.assertEqual(res["ETag"], etag)
+
+    def test_range(self):
+        res = self.client.get(self.url, headers={"Range": "bytes=10-19"})
+
+        self.assertEqual(res.status_code, 206)
+        self.assertEqual(self.body(res), CONTENT[10:20])
+        self.assertEqual(res["Content-Range"], "bytes 10-19/100")
+        self.assertEqual(res["Content-Length"], "10")
+
+    def test_unsatisfiable_range(self):
+        res = self.client.get(self.url, headers={"Range": "bytes=100-"})
+
+        self.assertEqual(res.status_code, 416)
+        self.assertEqual(res["Content-Range"], "bytes */100")
+
+    def test_stale_if_range_sends_everything(self):
+        res = self.client.get(
+            self.url, headers={"Range": "bytes=0-9", "If-Range": '"old"'}
+        )
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(self.body(res), CONTENT)
+
+    def test_outdated_hash_redirects_to_current_url(self):
+        stale = self.url.replace(self.url.split("/")[2], "0" * 16)
+
+        res = self.client.get(stale)
+
+        self.assertRedirects(res, self.url, fetch_redirect_response=False)
+
+    def test_missing_or_outside_files_are_not_found(self):
+        self.assertEqual(
+            self.client.get("/media/uploads/missing.jpg").status_code, 404
+        )
+        self.assertEqual(
+            self.client.get("/media/../../etc/passwd").status_code, 404
+        )
+
+    def test_only_safe_methods(self):
+        self.assertEqual(self.client.post(self.url).status_code, 405)
+
+    @override_settings(MEDIA_SERVING={"SENDFILE": "x-accel-redirect"})
+    def test_x_accel_redirect(self):
+        res = self.client.get(self.url)
+
+        self.assertEqual(
+            res["X-Accel-Redirect"], f"/protected-media/{self.name}"
+        )
+        self.assertEqual(res.content, b"")
+        self.assertEqual(res["Cache-Control"], IMMUTABLE)
+
+    @override_settings(MEDIA_SERVING={"SENDFILE": "x-sendfile"})
+    def test_x_sendfile(self):
+        res = self.client.get(self.url)
+
+        self.assertEqual(res["X-Sendfile"], default_storage.path(self.name))
+        self.assertNotIn("Content-Type", res)
+
+
+class ByteRangeTests(SimpleTestCase):
+    def test_forms(self):
+        self.assertEqual(byte_range("bytes=0-", 10), (0, 9))
+        self.assertEqual(byte_range("bytes=5-50", 10), (5, 9))
+        self.assertEqual(byte_range("bytes=-3", 10), (7, 9))
+        self.assertEqual(byte_range("bytes=-30", 10), (0, 9))
+
+    def test_unsupported_ranges_mean_the_whole_file(self):
+        self.assertIsNone(byte_range("bytes=0-1,4-5", 10))
+        self.assertIsNone(byte_range("items=0-1", 10))
+        self.assertIsNone(byte_range("bytes=5-1", 10))
+
+    def test_unsatisfiable(self):
+        with self.assertRaises(ValueError):
+            byte_range("bytes=10-", 10)
+        with self.assertRaises(ValueError):
+            byte_range("bytes=-0", 10)
@@ -0,0 +1,178 @@
+import json
+import os
+import tempfile
+from datetime import datetime, timedelta, timezone
+
+from django.contrib.auth import get_user_model
+from django.db.models import F
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from station.models import (
+    Journey,
+    Order,
+    OutboxEvent,
+    Route,
+    Station,
+    Train,
+)
+from station.outbox import (
+    CLAIM_TIMEOUT,
+    JsonlSink,
+    claim_batch,
+    dispatch_batch,
+    run_dispatcher,
+)
+
+ORDER_URL = reverse("station:order-list")
+DAY = datetime(2024, 1, 11, 8, tzinfo=timezone.utc)
+
+
+class StubSink:
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.batches = []
+
+    def send(self, events):
+        if self.fail:
+            raise ConnectionError("downstream unavailable")
+        self.batches.append([event.id for event in events])
+
+
+class OutboxTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "admin@admin.com", "testpass", is_staff=True
+        )
+        self.client.force_authenticate(self.user)
+
+        self.journey = Journey.objects.create(
+            route=Route.objects.create(
+                source=Station.objects.create(
+                    name="A", latitude=1, longitude=1
+                ),
+                destination=Station.objects.create(
+                    name="B", latitude=2, longitude=2
+                ),
+            ),
+            train=Train.objects.create(
+                name="Train", cargo_num=2, places_in_cargo=10
+            ),
+            departure_time=DAY,
+            arrival_time=DAY + timedelta(hours=2),
+        )
+
+    def book(self, *seats):
+        return self.client.post(
+            ORDER_URL,
+            {
+                "tickets": [
+                    {"cargo": 1, "seat": seat, "journey": self.journey.id}
+                    for seat in seats
+                ]
+            },
+            format="json",
+        )
+
+    def test_order_writes_events_in_transaction(self):
+        res = self.book(1, 2)
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(
+            list(OutboxEvent.objects.values_list("event_type", flat=True)),
+            ["order.created", "ticket.created", "ticket.created"],
+        )
+        ticket_event = OutboxEvent.objects.filter(
+            event_type="ticket.created"
+        ).first()
+        self.assertEqual(ticket_event.payload["order_id"], res.data["id"])
+
+    def test_failed_order_writes_no_events(self):
+        self.book(1)
+        OutboxEvent.objects.all().delete()
+
+        res = self.book(2, 1)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(OutboxEvent.objects.exists())
+
+    def test_deleting_order_records_events(self):
+        self.book(1)
+        OutboxEvent.objects.all().delete()
+
+        Order.objects.get().delete()
+
+        self.assertEqual(
+            sorted(OutboxEvent.objects.values_list("event_type", flat=True)),
+            ["order.deleted", "ticket.deleted"],
+        )
+
+    def test_dispatch_marks_events_sent_in_batches(self):
+        self.book(1, 2, 3)
+        sink = StubSink()
+
+        run_dispatcher([sink], batch_size=2, once=True)
+
+        self.assertEqual([len(batch) for batch in sink.batches], [2, 2])
+        self.assertFalse(
+            OutboxEvent.objects.filter(dispatched_at__isnull=True).exists()
+        )
+
+    def test_failed_dispatch_is_retried_later(self):
+        self.book(1)
+        errors = []
+
+        run_dispatcher([StubSink(fail=True)], once=True, on_error=errors.append)
+
+        self.assertEqual(len(errors), 1)
+        event = OutboxEvent.objects.first()
+        self.assertIsNone(event.dispatched_at)
+        self.assertEqual(event.attempts, 1)
+        self.assertIn("downstream unavailable", event.last_error)
+        self.assertEqual(dispatch_batch([StubSink()]), 0)
+
+    def test_other_dispatchers_skip_a_batch_being_sent(self):
+        self.book(1)
+        other = StubSink()
+
+        class SlowSink(StubSink):
+            def send(self, events):
+                # a second dispatcher running while this sink is busy
+                self.concurrent = dispatch_batch([other])
+                super().send(events)
+
+        sink = SlowSink()
+        self.assertEqual(dispatch_batch([sink]), 2)
+
+        self.assertEqual(sink.concurrent, 0)
+        self.assertEqual(other.batches, [])
+
+    def test_claim_of_a_dead_dispatcher_runs_out(self):
+        self.book(1)
+        claimed = claim_batch()
+
+        self.assertEqual(len(claimed), 2)
+        self.assertEqual(claim_batch(), [])
+
+        OutboxEvent.objects.update(
+            available_at=F("available_at") - CLAIM_TIMEOUT
+        )
+        self.assertEqual(claim_batch(), claimed)
+
+    def test_jsonl_sink_writes_one_line_per_event(self):
+        self.book(1)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "events.jsonl")
+
+            dispatch_batch([JsonlSink(path)])
+
+            with open(path) as file:
+                lines = [json.loads(line) for line in file]
+
+        self.assertEqual(
+            [line["type"] for line in lines],
+            ["order.created", "ticket.created"],
+        )
@@ -0,0 +1,113 @@
+from datetime import datetime, timedelta, timezone
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from station.models import Journey, Order, Route, Station, Ticket, Train
+
+STATION_URL = reverse("station:station-list")
+DAY = datetime(2024, 1, 11, 8, tzinfo=timezone.utc)
+
+
+class EstimatedCountPaginationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "user@test.com", "testpass"
+        )
+        self.client.force_authenticate(self.user)
+        self.stations = Station.objects.bulk_create(
+            Station(name=f"S{i}", latitude=i, longitude=i) for i in range(5)
+        )
+
+    def test_lists_are_not_paginated_without_page_params(self):
+        res = self.client.get(STATION_URL)
+
+        self.assertEqual(len(res.data), 5)
+
+    def test_pages_and_links(self):
+        res = self.client.get(STATION_URL, {"page_size": 2})
+
+        self.assertEqual(res.data["count"], 5)
+        self.assertTrue(res.data["count_exact"])
+        self.assertEqual(len(res.data["results"]), 2)
+        self.assertIsNone(res.data["previous"])
+        self.assertIn("page=2", res.data["next"])
+
+        res = self.client.get(STATION_URL, {"page_size": 2, "page": 3})
+
+        self.assertEqual(len(res.data["results"]), 1)
+        self.assertIsNone(res.data["next"])
+        self.assertIn("page=2", res.data["previous"])
+
+    def test_invalid_pages_are_not_found(self):
+        for page in ("0", "x", "4"):
+            with self.subTest(page=page):
+                res = self.client.get(
+                    STATION_URL, {"page_size": 2, "page": page}
+                )
+                self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    @mock.patch("station.pagination.COUNT_CAP", 3)
+    def test_count_is_capped_without_planner(self):
+        res = self.client.get(STATION_URL, {"page_size": 2})
+
+        self.assertEqual(res.data["count"], "4+")
+        self.assertFalse(res.data["count_exact"])
+        self.assertIsNotNone(res.data["next"])
+
+        res = self.client.get(STATION_URL, {"page_size": 2, "count": "exact"})
+
+        self.assertEqual(res.data["count"], 5)
+        self.assertTrue(res.data["count_exact"])
+
+    @mock.patch("station.pagination.planner_estimate")
+    def test_large_planner_estimates_are_reported(self, planner_estimate):
+        planner_estimate.return_value = 2_000_000
+
+        res = self.client.get(STATION_URL, {"page_size": 2})
+
+        self.assertEqual(res.data["count"], 2_000_000)
+        self.assertFalse(res.data["count_exact"])
+
+        planner_estimate.return_value = 40
+        res = self.client.get(STATION_URL, {"page_size": 2})
+
+        self.assertEqual(res.data["count"], 5)
+        self.assertTrue(res.data["count_exact"])
+
+    def test_journey_date_list_and_tickets_paginate(self):
+        route = Route.objects.create(
+            source=self.stations[0], destination=self.stations[1]
+        )
+        train = Train.objects.create(
+            name="Train", cargo_num=1, places_in_cargo=5
+        )
+        order = Order.objects.create(user=self.user)
+        for hour in range(3):
+            journey = Journey.objects.create(
+                route=route,
+                train=train,
+                departure_time=DAY + timedelta(hours=3 * hour),
+                arrival_time=DAY + timedelta(hours=3 * hour + 2),
+            )
+            Ticket(cargo=1, seat=1, journey=journey, order=order).save()
+
+        res = self.client.get(
+            reverse("station:journey-list"),
+            {"date": "2024-01-11", "page_size": 2},
+        )
+        self.assertEqual(res.data["count"], 3)
+        self.assertEqual(len(res.data["results"]), 2)
+
+        res = self.client.get(
+            reverse("station:ticket-list"), {"page_size": 2}
+        )
+        self.assertEqual(res.data["count"], 3)
+        self.assertEqual(len(res.data["results"]), 2)
@@ -0,0 +1,128 @@
+import pstats
+import shutil
+import tempfile
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from station.models import Journey, Route, Station, Train
+from station.profiling import make_token
+
+JOURNEY_URL = reverse("station:journey-list")
+PROFILE_URL = reverse("station:profile-list")
+TOKEN_URL = reverse("station:profile-token")
+DAY = datetime(2024, 1, 11, 8, tzinfo=timezone.utc)
+
+
+class ProfilingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.dir = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.dir)
+        settings = override_settings(PROFILING={"DIR": self.dir})
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+        self.staff = get_user_model().objects.create_user(
+            "admin@test.com", "testpass", is_staff=True
+        )
+        self.user = get_user_model().objects.create_user(
+            "user@test.com", "testpass"
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.staff)
+
+        Journey.objects.create(
+            route=Route.objects.create(
+                source=Station.objects.create(
+                    name="A", latitude=1, longitude=1
+                ),
+                destination=Station.objects.create(
+                    name="B", latitude=2, longitude=2
+                ),
+            ),
+            train=Train.objects.create(
+                name="Train", cargo_num=1, places_in_cargo=10
+            ),
+            departure_time=DAY,
+            arrival_time=DAY + timedelta(hours=2),
+        )
+
+    def profiled_get(self, token):
+        return self.client.get(JOURNEY_URL, HTTP_X_PROFILE=token)
+
+    def test_requests_without_header_are_not_profiled(self):
+        res = self.client.get(JOURNEY_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotIn("X-Profile-Id", res)
+        self.assertEqual(list(self.dir.iterdir()), [])
+
+    def test_staff_token_profiles_request(self):
+        res = self.client.post(TOKEN_URL)
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(res.data["header"], "X-PROFILE")
+
+        res = self.profiled_get(res.data["token"])
+        profile_id = res["X-Profile-Id"]
+
+        profile = self.client.get(
+            reverse("station:profile-detail", args=[profile_id])
+        ).data
+        self.assertEqual(profile["path"], JOURNEY_URL)
+        self.assertEqual(profile["trigger"], f"user:{self.staff.pk}")
+        self.assertTrue(profile["queries"])
+        self.assertTrue(profile["explain"])
+        self.assertTrue(profile["explain"][0]["plan"])
+        self.assertGreater(profile["serializer_ms"], 0)
+
+        [summary] = self.client.get(PROFILE_URL).data
+        self.assertEqual(summary["id"], profile_id)
+        self.assertEqual(summary["query_count"], len(profile["queries"]))
+
+        res = self.client.get(
+            reverse("station:profile-download", args=[profile_id])
+        )
+        path = self.dir / "downloaded.prof"
+        path.write_bytes(b"".join(res.streaming_content))
+        self.assertTrue(pstats.Stats(str(path)).stats)
+
+    def test_invalid_or_non_staff_tokens_are_ignored(self):
+        for token in (make_token(self.user), "forged:token"):
+            with self.subTest(token=token):
+                res = self.profiled_get(token)
+                self.assertEqual(res.status_code, status.HTTP_200_OK)
+                self.assertNotIn("X-Profile-Id", res)
+
+    def test_sample_rate_profiles_without_header(self):
+        with override_settings(
+            PROFILING={"DIR": self.dir, "SAMPLE_RATE": 1.0}
+        ):
+            res = self.client.get(JOURNEY_URL)
+
+        self.assertIn("X-Profile-Id", res)
+
+    def test_profiles_are_staff_only(self):
+        self.client.force_authenticate(self.user)
+
+        self.assertEqual(
+            self.client.get(PROFILE_URL).status_code,
+            status.HTTP_403_FORBIDDEN,
+        )
+        self.assertEqual(
+            self.client.post(TOKEN_URL).status_code,
+            status.HTTP_403_FORBIDDEN,
+        )
+
+    def test_unknown_profile_is_not_found(self):
+        res = self.client.get(
+            reverse("station:profile-detail", args=["0" * 32])
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
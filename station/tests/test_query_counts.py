@@ -0,0 +1,296 @@
+"""
+Query counts must not grow with the number of rows.
+
+Every list and detail endpoint is requested against datasets of each
+size in ``QUERY_COUNT_SIZES`` (default ``10,40``; set it to e.g.
+``10,100,1000`` for a slower, deeper run). Detail endpoints target objects
+whose related rows grow with the dataset too. When an endpoint's count
+changes, the failure lists the SQL statements that were repeated more.
+"""
+import os
+import re
+from collections import Counter
+from datetime import date, datetime, timedelta, timezone
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from station.fares import invalidate_fare_table
+from station.graph import invalidate_graph
+from station.models import (
+    Crew,
+    Journey,
+    Order,
+    Route,
+    RouteDailyStats,
+    Schedule,
+    ScheduleException,
+    Station,
+    Ticket,
+    Train,
+    TrainType,
+    TrainTypeDailyStats,
+)
+from station.refdata import invalidate_reference_data
+from station.scheduling import invalidate_crew_index
+
+SIZES = [
+    int(size)
+    for size in os.environ.get("QUERY_COUNT_SIZES", "10,40").split(",")
+]
+DAY = datetime(2024, 1, 11, 8, tzinfo=timezone.utc)
+
+
+def sql_template(sql):
+    sql = re.sub(r"'[^']*'", "?", sql)
+    sql = re.sub(r"\b\d+(\.\d+)?\b", "?", sql)
+    return re.sub(r"\(\?(, \?)*\)", "(...)", sql)
+
+
+def seed(size, user):
+    """``size`` rows of everything; the first of each is the busiest"""
+    stations = Station.objects.bulk_create(
+        Station(name=f"S{i}", latitude=i % 80, longitude=i % 170)
+        for i in range(size + 1)
+    )
+    routes = Route.objects.bulk_create(
+        Route(source=stations[i], destination=stations[i + 1])
+        for i in range(size)
+    )
+    train_types = TrainType.objects.bulk_create(
+        TrainType(name=f"Type {i}") for i in range(size)
+    )
+    trains = Train.objects.bulk_create(
+        Train(
+            name=f"Train {i}",
+            cargo_num=1,
+            places_in_cargo=size + 1,
+            train_type=train_types[i],
+        )
+        for i in range(size)
+    )
+    crew = Crew.objects.bulk_create(
+        Crew(first_name=f"First {i}", last_name=f"Last {i}")
+        for i in range(size)
+    )
+    journeys = Journey.objects.bulk_create(
+        Journey(
+            route=routes[i],
+            train=trains[i],
+            departure_time=DAY + timedelta(hours=3 * i),
+            arrival_time=DAY + timedelta(hours=3 * i + 2),
+            capacity=size + 1,
+        )
+        for i in range(size)
+    )
+    Journey.crew.through.objects.bulk_create(
+        [
+            Journey.crew.through(journey=journey, crew=crew[0])
+            for journey in journeys
+        ]
+        + [
+            Journey.crew.through(journey=journeys[0], crew=member)
+            for member in crew[1:]
+        ]
+    )
+
+    # the first order has a ticket on every journey, the first journey a
+    # ticket in every order
+    orders = Order.objects.bulk_create(
+        Order(user=user) for _ in range(size)
+    )
+    Ticket.objects.bulk_create(
+        [
+            Ticket(cargo=1, seat=1, journey=journey, order=orders[0])
+            for journey in journeys
+        ]
+        + [
+            Ticket(cargo=1, seat=i + 1, journey=journeys[0], order=order)
+            for i, order in enumerate(orders[1:], start=1)
+        ]
+    )
+
+    schedules = Schedule.objects.bulk_create(
+        Schedule(
+            route=routes[i],
+            train=trains[i],
+            departure_time="08:00",
+            duration=timedelta(hours=2),
+            valid_from=date(2024, 1, 1),
+            valid_until=date(2024, 12, 31),
+        )
+        for i in range(size)
+    )
+    ScheduleException.objects.bulk_create(
+        ScheduleException(
+            schedule=schedules[0], date=date(2024, 2, 1) + timedelta(i)
+        )
+        for i in range(size)
+    )
+    RouteDailyStats.objects.bulk_create(
+        RouteDailyStats(route=route, date=DAY.date()) for route in routes
+    )
+    TrainTypeDailyStats.objects.bulk_create(
+        TrainTypeDailyStats(train_type=train_type, date=DAY.date())
+        for train_type in train_types
+    )
+
+    return {
+        "station": stations[0].id,
+        "route": routes[0].id,
+        "train_type": train_types[0].id,
+        "train": trains[0].id,
+        "crew": crew[0].id,
+        "journey": journeys[0].id,
+        "ticket": journeys[0].tickets.first().id,
+        "order": orders[0].id,
+        "schedule": schedules[0].id,
+        # a few stops away, the response holds every station on the path
+        "nearby_station": stations[5].id,
+    }
+
+
+def endpoints(ids):
+    """``(name, url, params)`` for every read endpoint"""
+    detail = {
+        "station": "station-detail",
+        "route": "route-detail",
+        "train_type": "traintype-detail",
+        "train": "train-detail",
+        "crew": "crew-detail",
+        "journey": "journey-detail",
+        "ticket": "ticket-detail",
+        "order": "order-detail",
+        "schedule": "schedule-detail",
+    }
+    lists = [
+        "station-list",
+        "route-list",
+        "traintype-list",
+        "train-list",
+        "crew-list",
+        "journey-list",
+        "ticket-list",
+        "order-list",
+        "schedule-list",
+        "route-stats-list",
+        "train-type-stats-list",
+    ]
+
+    for name in lists:
+        yield name, reverse(f"station:{name}"), {}
+    for key, name in detail.items():
+        yield name, reverse(f"station:{name}", args=[ids[key]]), {}
+
+    yield (
+        "journey-list?date",
+        reverse("station:journey-list"),
+        {"date": DAY.date().isoformat()},
+    )
+    yield (
+        "journey-list?stream",
+        reverse("station:journey-list"),
+        {"stream": "true"},
+    )
+    yield "journey-quote", reverse("station:journey-quote"), {}
+    yield (
+        "crew-roster",
+        reverse("station:crew-roster", args=[ids["crew"]]),
+        {},
+    )
+    yield (
+        "route-shortest",
+        reverse("station:route-shortest"),
+        {"from": ids["station"], "to": ids["nearby_station"]},
+    )
+
+
+class QueryCountTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "admin@test.com", "testpass", is_staff=True
+        )
+        self.client.force_authenticate(self.user)
+
+    def tearDown(self):
+        invalidate_fare_table()
+        invalidate_crew_index()
+        invalidate_graph()
+        invalidate_reference_data()
+
+    def measure(self, size):
+        """``{endpoint: [sql, ...]}`` against a dataset of ``size``"""
+        queries = {}
+        sid = transaction.savepoint()
+        try:
+            ids = seed(size, self.user)
+            # seeding uses bulk_create, which skips the cache signals
+            invalidate_fare_table()
+            invalidate_crew_index()
+            invalidate_graph()
+            invalidate_reference_data()
+
+            for name, url, params in endpoints(ids):
+                with CaptureQueriesContext(connection) as captured:
+                    res = self.client.get(url, params)
+                    if res.streaming:
+                        b"".join(res.streaming_content)
+                self.assertEqual(res.status_code, 200, f"{name}: {res}")
+                queries[name] = [query["sql"] for query in captured]
+        finally:
+            transaction.savepoint_rollback(sid)
+            invalidate_fare_table()
+            invalidate_crew_index()
+            invalidate_graph()
+            invalidate_reference_data()
+
+        return queries
+
+    def test_query_counts_do_not_grow_with_rows(self):
+        runs = [(size, self.measure(size)) for size in SIZES]
+        base_size, base = runs[0]
+
+        for size, queries in runs[1:]:
+            for name, statements in queries.items():
+                with self.subTest(endpoint=name, size=size):
+                    if len(statements) == len(base[name]):
+                        continue
+
+                    grown = Counter(map(sql_template, statements))
+                    grown.subtract(Counter(map(sql_template, base[name])))
+                    offending = "\n".join(
+                        f"  +{count}x {template}"
+                        for template, count in grown.most_common(5)
+                        if count > 0
+                    )
+                    self.fail(
+                        f"{name}: {len(base[name])} queries with "
+                        f"{base_size} rows, {len(statements)} with "
+                        f"{size}\n{offending}"
+                    )
+
+    def test_nested_order_journeys_are_complete(self):
+        ids = seed(10, self.user)
+
+        res = self.client.get(reverse("station:order-list"))
+        journey = next(
+            ticket["journey"]
+            for order in res.data
+            if order["id"] == ids["order"]
+            for ticket in order["tickets"]
+        )
+        sold = Ticket.objects.filter(journey_id=journey["id"]).count()
+        self.assertEqual(journey["tickets_available"], 11 - sold)
+        self.assertIn("fare", journey)
+
+        res = self.client.get(
+            reverse("station:journey-detail", args=[ids["journey"]])
+        )
+        self.assertEqual(res.data["train_image"]["id"], ids["train"])
@@ -0,0 +1,112 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.db.models import F
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from station import refdata
+from station.models import CacheVersion, Route, Station, Train, TrainType
+
+TRAIN_URL = reverse("station:train-list")
+ROUTE_URL = reverse("station:route-list")
+
+
+class ReferenceDataTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(
+            get_user_model().objects.create_user("test@test.com", "testpass")
+        )
+        self.source = Station.objects.create(
+            name="Lviv", latitude=49.84, longitude=24.03
+        )
+        self.destination = Station.objects.create(
+            name="Kyiv", latitude=50.45, longitude=30.52
+        )
+        self.route = Route.objects.create(
+            source=self.source, destination=self.destination
+        )
+        self.express = TrainType.objects.create(name="Express")
+        Train.objects.create(
+            name="IC 1",
+            cargo_num=2,
+            places_in_cargo=10,
+            train_type=self.express,
+        )
+        Train.objects.create(
+            name="R 7",
+            cargo_num=2,
+            places_in_cargo=10,
+            train_type=TrainType.objects.create(name="Regional"),
+        )
+
+    def get_with_sql(self, url, params=None):
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.get(url, params)
+        return res, "\n".join(query["sql"] for query in queries)
+
+    def test_names_come_from_the_cache(self):
+        self.client.get(ROUTE_URL)
+
+        res, sql = self.get_with_sql(ROUTE_URL)
+        self.assertEqual(res.data[0]["source"], "Lviv")
+        self.assertEqual(res.data[0]["destination"], "Kyiv")
+        self.assertNotIn("station_station", sql)
+
+        res, sql = self.get_with_sql(TRAIN_URL)
+        self.assertEqual(
+            [train["train_type"] for train in res.data],
+            ["Express", "Regional"],
+        )
+        self.assertNotIn("station_traintype", sql)
+
+    def test_route_detail_distance_uses_cached_stations(self):
+        self.client.get(ROUTE_URL)
+        url = reverse("station:route-detail", args=[self.route.id])
+
+        res, sql = self.get_with_sql(url)
+
+        self.assertEqual(res.data["distance_km"], self.route.distance)
+        self.assertNotIn("station_station", sql)
+
+    def test_type_filter_matches_names_without_join(self):
+        refdata.reference_data()
+
+        res, sql = self.get_with_sql(TRAIN_URL, {"type": "PRESS"})
+
+        self.assertEqual([train["name"] for train in res.data], ["IC 1"])
+        self.assertNotIn("station_traintype", sql)
+        self.assertNotIn("DISTINCT", sql)
+
+    def test_stamp_is_read_once_per_request(self):
+        refdata.reference_data()
+        refdata.recheck()
+        with self.assertNumQueries(1):
+            refdata.get(Station, self.source.id)
+            refdata.get(TrainType, self.express.id)
+
+    def test_changes_by_other_processes_are_picked_up(self):
+        self.client.get(ROUTE_URL)
+        # what another worker's save leaves behind: new rows and stamp,
+        # but this process's copy was not invalidated
+        Station.objects.filter(pk=self.source.pk).update(name="Lemberg")
+        CacheVersion.objects.filter(name=refdata.NAME).update(
+            version=F("version") + 1
+        )
+
+        res = self.client.get(ROUTE_URL)
+
+        self.assertEqual(res.data[0]["source"], "Lemberg")
+
+    def test_saving_invalidates_the_local_copy(self):
+        self.assertEqual(refdata.get(Station, self.source.id).name, "Lviv")
+
+        self.source.name = "Lemberg"
+        self.source.save()
+
+        self.assertEqual(refdata.get(Station, self.source.id).name, "Lemberg")
+        self.assertEqual(
+            refdata.get_by_name(Station, "Lemberg").id, self.source.id
+        )
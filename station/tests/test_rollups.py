@@ -0,0 +1,267 @@
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import IntegrityError
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from station import rollups
+from station.archive import archive_journeys
+from station.models import (
+    Journey,
+    Order,
+    Route,
+    RouteDailyStats,
+    Station,
+    Ticket,
+    Train,
+    TrainType,
+    TrainTypeDailyStats,
+)
+
+ROUTE_STATS_URL = reverse("station:route-stats-list")
+TRAIN_TYPE_STATS_URL = reverse("station:train-type-stats-list")
+DAY = datetime(2024, 1, 11, 8, tzinfo=timezone.utc)
+
+
+class RollupTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            "admin@admin.com", "testpass", is_staff=True
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+        self.train_type = TrainType.objects.create(name="Express")
+        self.train = Train.objects.create(
+            name="Train",
+            cargo_num=2,
+            places_in_cargo=10,
+            train_type=self.train_type,
+        )
+        self.route = Route.objects.create(
+            source=Station.objects.create(name="A", latitude=1, longitude=1),
+            destination=Station.objects.create(
+                name="B", latitude=2, longitude=2
+            ),
+        )
+        self.journey = Journey.objects.create(
+            route=self.route,
+            train=self.train,
+            departure_time=DAY,
+            arrival_time=DAY + timedelta(hours=2),
+        )
+        self.order = Order.objects.create(user=self.user)
+
+    def sell(self, seat, price="10.00"):
+        return Ticket.objects.create(
+            journey=self.journey,
+            order=self.order,
+            cargo=1,
+            seat=seat,
+            price=Decimal(price),
+        )
+
+    def test_journey_and_tickets_update_rollups(self):
+        self.sell(1)
+        ticket = self.sell(2, "15.50")
+        self.sell(3)
+        ticket.delete()
+
+        stats = RouteDailyStats.objects.get(route=self.route, date=DAY.date())
+        self.assertEqual(stats.journeys, 1)
+        self.assertEqual(stats.seats_offered, 20)
+        self.assertEqual(stats.tickets_sold, 2)
+        self.assertEqual(stats.revenue, Decimal("20.00"))
+        self.assertEqual(stats.load_factor, 0.1)
+
+        type_stats = TrainTypeDailyStats.objects.get(
+            train_type=self.train_type, date=DAY.date()
+        )
+        self.assertEqual(type_stats.tickets_sold, 2)
+
+    def test_moving_journey_moves_its_tickets(self):
+        self.sell(1)
+        self.journey.departure_time = DAY + timedelta(days=1)
+        self.journey.arrival_time = DAY + timedelta(days=1, hours=2)
+        self.journey.save()
+
+        old = RouteDailyStats.objects.get(date=DAY.date())
+        new = RouteDailyStats.objects.get(date=DAY.date() + timedelta(days=1))
+        self.assertEqual((old.journeys, old.tickets_sold), (0, 0))
+        self.assertEqual((new.journeys, new.tickets_sold), (1, 1))
+
+    def test_deleting_journey_clears_rollups(self):
+        self.sell(1)
+        self.journey.delete()
+
+        stats = RouteDailyStats.objects.get(date=DAY.date())
+        self.assertEqual(
+            (stats.journeys, stats.seats_offered, stats.tickets_sold),
+            (0, 0, 0),
+        )
+
+    def test_backfill_rebuilds_rollups(self):
+        self.sell(1)
+        self.sell(2)
+        RouteDailyStats.objects.all().delete()
+        TrainTypeDailyStats.objects.update(tickets_sold=99)
+
+        call_command(
+            "backfill_rollups", "--from", "2024-01-01", stdout=StringIO()
+        )
+
+        stats = RouteDailyStats.objects.get(date=DAY.date())
+        self.assertEqual(stats.tickets_sold, 2)
+        self.assertEqual(stats.revenue, Decimal("20.00"))
+        self.assertEqual(
+            TrainTypeDailyStats.objects.get(date=DAY.date()).tickets_sold, 2
+        )
+
+    def test_backfill_keeps_archived_days(self):
+        self.sell(1)
+        self.sell(2, "15.50")
+        archive_journeys(DAY + timedelta(days=1))
+        self.assertFalse(Journey.objects.exists())
+
+        rollups.backfill()
+
+        stats = RouteDailyStats.objects.get(date=DAY.date())
+        self.assertEqual(
+            (stats.journeys, stats.seats_offered, stats.tickets_sold),
+            (1, 20, 2),
+        )
+        self.assertEqual(stats.revenue, Decimal("25.50"))
+        self.assertEqual(
+            TrainTypeDailyStats.objects.get(date=DAY.date()).tickets_sold, 2
+        )
+
+    def test_batched_writes_rows_in_key_order(self):
+        sold = self.sell(1)
+        route = Route.objects.create(
+            source=self.route.destination, destination=self.route.source
+        )
+        eve = DAY - timedelta(days=1)
+        untyped = Journey.objects.create(
+            route=route,
+            train=Train.objects.create(
+                name="Untyped", cargo_num=1, places_in_cargo=10
+            ),
+            departure_time=eve,
+            arrival_time=eve + timedelta(hours=2),
+        )
+
+        with mock.patch(
+            "station.rollups._bump", wraps=rollups._bump
+        ) as bump, rollups.batched():
+            sold.delete()
+            Ticket.objects.create(
+                journey=untyped, order=self.order, cargo=1, seat=1
+            )
+            self.sell(2, "15.50")
+
+        self.assertEqual(
+            [call.args[:2] for call in bump.call_args_list],
+            [
+                (
+                    RouteDailyStats,
+                    {"route_id": self.route.id, "date": DAY.date()},
+                ),
+                (RouteDailyStats, {"route_id": route.id, "date": eve.date()}),
+                (
+                    TrainTypeDailyStats,
+                    {"train_type_id": None, "date": eve.date()},
+                ),
+                (
+                    TrainTypeDailyStats,
+                    {"train_type_id": self.train_type.id, "date": DAY.date()},
+                ),
+            ],
+        )
+        stats = RouteDailyStats.objects.get(route=self.route)
+        self.assertEqual(stats.tickets_sold, 1)
+        self.assertEqual(stats.revenue, Decimal("15.50"))
+
+    def test_batched_writes_nothing_on_error(self):
+        with self.assertRaises(ValueError), rollups.batched():
+            self.sell(1)
+            raise ValueError
+
+        stats = RouteDailyStats.objects.get(date=DAY.date())
+        self.assertEqual(stats.tickets_sold, 0)
+
+    def test_one_untyped_row_per_day(self):
+        TrainTypeDailyStats.objects.create(train_type=None, date=DAY.date())
+
+        with self.assertRaises(IntegrityError):
+            TrainTypeDailyStats.objects.create(
+                train_type=None, date=DAY.date()
+            )
+
+    def test_analytics_endpoints_filter_by_date(self):
+        self.sell(1)
+
+        res = self.client.get(ROUTE_STATS_URL, {"from": "2024-01-11"})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data), 1)
+        self.assertEqual(res.data[0]["tickets_sold"], 1)
+        self.assertEqual(res.data[0]["route"], "From A to B")
+
+        res = self.client.get(TRAIN_TYPE_STATS_URL, {"to": "2024-01-10"})
+        self.assertEqual(res.data, [])
+
+    def test_moving_or_repricing_ticket_moves_its_sale(self):
+        ticket = self.sell(1)
+        later = DAY + timedelta(days=1)
+        other = Journey.objects.create(
+            route=self.route,
+            train=self.train,
+            departure_time=later,
+            arrival_time=later + timedelta(hours=2),
+        )
+
+        ticket.price = Decimal("12.00")
+        ticket.save()
+        stats = RouteDailyStats.objects.get(date=DAY.date())
+        self.assertEqual(stats.tickets_sold, 1)
+        self.assertEqual(stats.revenue, Decimal("12.00"))
+
+        ticket.journey = other
+        ticket.save()
+
+        stats = RouteDailyStats.objects.get(date=DAY.date())
+        self.assertEqual((stats.tickets_sold, stats.revenue), (0, 0))
+        stats = RouteDailyStats.objects.get(date=later.date())
+        self.assertEqual(stats.tickets_sold, 1)
+        self.assertEqual(stats.revenue, Decimal("12.00"))
+        self.assertEqual(
+            TrainTypeDailyStats.objects.get(date=later.date()).tickets_sold, 1
+        )
+
+    def test_analytics_reject_malformed_filters(self):
+        for params in (
+            {"from": "2024-13-01"},
+            {"to": "tomorrow"},
+            {"route": "A"},
+        ):
+            res = self.client.get(ROUTE_STATS_URL, params)
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertIn(next(iter(params)), res.data)
+
+        res = self.client.get(TRAIN_TYPE_STATS_URL, {"train_type": "x"})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_analytics_admin_only(self):
+        self.client.force_authenticate(
+            get_user_model().objects.create_user("user@user.com", "testpass")
+        )
+
+        res = self.client.get(ROUTE_STATS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
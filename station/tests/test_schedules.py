@@ -0,0 +1,231 @@
+from datetime import date, time, timedelta
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from station.models import (
+    Journey,
+    Order,
+    Route,
+    Schedule,
+    ScheduleException,
+    Station,
+    Ticket,
+    Train,
+)
+
+JOURNEY_URL = reverse("station:journey-list")
+ORDER_URL = reverse("station:order-list")
+SCHEDULE_URL = reverse("station:schedule-list")
+
+MONDAY = date(2024, 1, 8)
+WEEKDAYS_ONLY = 0b0011111
+
+
+class ScheduleTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "admin@admin.com", "testpass", is_staff=True
+        )
+        self.client.force_authenticate(self.user)
+
+        self.route = Route.objects.create(
+            source=Station.objects.create(name="A", latitude=1, longitude=1),
+            destination=Station.objects.create(
+                name="B", latitude=2, longitude=2
+            ),
+        )
+        self.train = Train.objects.create(
+            name="Train", cargo_num=2, places_in_cargo=10
+        )
+        self.schedule = Schedule.objects.create(
+            route=self.route,
+            train=self.train,
+            departure_time=time(9),
+            duration=timedelta(hours=3),
+            weekdays=WEEKDAYS_ONLY,
+            valid_from=MONDAY,
+            valid_until=MONDAY + timedelta(days=365),
+        )
+
+    def test_runs_on_respects_mask_period_and_exceptions(self):
+        ScheduleException.objects.create(
+            schedule=self.schedule, date=MONDAY + timedelta(days=1)
+        )
+
+        self.assertTrue(self.schedule.runs_on(MONDAY))
+        self.assertFalse(self.schedule.runs_on(MONDAY + timedelta(days=1)))
+        self.assertFalse(self.schedule.runs_on(MONDAY + timedelta(days=5)))
+        self.assertFalse(self.schedule.runs_on(MONDAY - timedelta(days=7)))
+
+    def test_journey_list_includes_virtual_occurrence(self):
+        res = self.client.get(JOURNEY_URL, {"date": str(MONDAY)})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data), 1)
+        self.assertIsNone(res.data[0]["id"])
+        self.assertEqual(res.data[0]["schedule"], self.schedule.id)
+        self.assertEqual(res.data[0]["tickets_available"], 20)
+        self.assertEqual(res.data[0]["departure_time"], "2024-01-08 09:00")
+        self.assertFalse(Journey.objects.exists())
+
+    def test_no_virtual_occurrence_when_not_running(self):
+        res = self.client.get(
+            JOURNEY_URL, {"date": str(MONDAY + timedelta(days=5))}
+        )
+
+        self.assertEqual(res.data, [])
+
+    def test_first_ticket_materializes_journey(self):
+        ticket = {
+            "cargo": 1,
+            "seat": 1,
+            "schedule": self.schedule.id,
+            "service_date": str(MONDAY),
+        }
+
+        res = self.client.post(ORDER_URL, {"tickets": [ticket]}, format="json")
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
+        ticket["seat"] = 2
+        res = self.client.post(ORDER_URL, {"tickets": [ticket]}, format="json")
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
+        journey = Journey.objects.get()
+        self.assertEqual(journey.schedule, self.schedule)
+        self.assertEqual(journey.tickets.count(), 2)
+
+        res = self.client.get(JOURNEY_URL, {"date": str(MONDAY)})
+        self.assertEqual(len(res.data), 1)
+        self.assertEqual(res.data[0]["id"], journey.id)
+        self.assertEqual(res.data[0]["tickets_available"], 18)
+
+    def test_ticket_for_non_running_date_rejected(self):
+        res = self.client.post(
+            ORDER_URL,
+            {
+                "tickets": [
+                    {
+                        "cargo": 1,
+                        "seat": 1,
+                        "schedule": self.schedule.id,
+                        "service_date": str(MONDAY + timedelta(days=5)),
+                    }
+                ]
+            },
+            format="json",
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Journey.objects.exists())
+
+    def test_ticket_on_schedule_requires_service_date(self):
+        res = self.client.post(
+            ORDER_URL,
+            {
+                "tickets": [
+                    {"cargo": 1, "seat": 1, "schedule": self.schedule.id}
+                ]
+            },
+            format="json",
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_rejected_order_leaves_no_journey(self):
+        ticket = {
+            "cargo": 1,
+            "seat": 1,
+            "schedule": self.schedule.id,
+            "service_date": str(MONDAY),
+        }
+
+        res = self.client.post(
+            ORDER_URL,
+            {"tickets": [ticket, {**ticket, "seat": 99}]},
+            format="json",
+        )
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+        res = self.client.post(
+            ORDER_URL, {"tickets": [ticket, ticket]}, format="json"
+        )
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Journey.objects.exists())
+
+    def test_occurrence_overlapping_train_journey_rejected(self):
+        departure = self.schedule.departure_on(MONDAY) + timedelta(hours=1)
+        Journey.objects.create(
+            route=self.route,
+            train=self.train,
+            departure_time=departure,
+            arrival_time=departure + timedelta(hours=1),
+        )
+
+        res = self.client.post(
+            ORDER_URL,
+            {
+                "tickets": [
+                    {
+                        "cargo": 1,
+                        "seat": 1,
+                        "schedule": self.schedule.id,
+                        "service_date": str(MONDAY),
+                    }
+                ]
+            },
+            format="json",
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("service_date", str(res.data))
+        self.assertEqual(Journey.objects.count(), 1)
+
+    def test_create_schedule_with_exceptions(self):
+        res = self.client.post(
+            SCHEDULE_URL,
+            {
+                "route": self.route.id,
+                "train": self.train.id,
+                "departure_time": "18:30",
+                "duration": "02:00:00",
+                "weekdays": Schedule.ALL_WEEKDAYS,
+                "valid_from": "2024-01-01",
+                "valid_until": "2024-12-31",
+                "exceptions": ["2024-12-25"],
+            },
+            format="json",
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(res.data["exceptions"], ["2024-12-25"])
+        schedule = Schedule.objects.get(id=res.data["id"])
+        self.assertFalse(schedule.runs_on(date(2024, 12, 25)))
+
+    def test_ticket_can_be_updated(self):
+        journey = self.schedule.build_journey(MONDAY)
+        journey.save()
+        order = Order.objects.create(user=self.user)
+        ticket = Ticket.objects.create(
+            journey=journey, order=order, cargo=1, seat=1
+        )
+        Ticket.objects.create(journey=journey, order=order, cargo=1, seat=2)
+        url = reverse("station:ticket-detail", args=[ticket.id])
+
+        res = self.client.put(
+            url, {"journey": journey.id, "cargo": 1, "seat": 1}
+        )
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        res = self.client.patch(url, {"seat": 3})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        ticket.refresh_from_db()
+        self.assertEqual((ticket.cargo, ticket.seat), (1, 3))
+
+        res = self.client.patch(url, {"seat": 2})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("unique", str(res.data))
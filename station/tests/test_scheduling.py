@@ -0,0 +1,157 @@
+from datetime import datetime, timedelta, timezone
+from io import StringIO
+
+from django.contrib.admin import site
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import RequestFactory, TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from station.models import Crew, Journey, Route, Station, Train
+from station.scheduling import find_overlaps
+
+JOURNEY_URL = reverse("station:journey-list")
+START = datetime(2024, 1, 11, 8, tzinfo=timezone.utc)
+
+
+def hours(n):
+    return START + timedelta(hours=n)
+
+
+class FindOverlapsTests(TestCase):
+    def test_reports_each_overlapping_pair(self):
+        intervals = [(0, 5, "a"), (3, 8, "b"), (4, 6, "c"), (8, 9, "d")]
+
+        self.assertEqual(
+            sorted(find_overlaps(intervals)),
+            [("a", "b"), ("a", "c"), ("b", "c")],
+        )
+
+    def test_touching_intervals_do_not_overlap(self):
+        self.assertEqual(list(find_overlaps([(0, 5, "a"), (5, 6, "b")])), [])
+
+
+class JourneyConflictTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "admin@admin.com", "testpass", is_staff=True
+        )
+        self.client.force_authenticate(self.user)
+
+        self.train = Train.objects.create(
+            name="Train", cargo_num=2, places_in_cargo=10
+        )
+        self.other_train = Train.objects.create(
+            name="Other", cargo_num=2, places_in_cargo=10
+        )
+        self.route = Route.objects.create(
+            source=Station.objects.create(name="A", latitude=1, longitude=1),
+            destination=Station.objects.create(
+                name="B", latitude=2, longitude=2
+            ),
+        )
+        self.crew = Crew.objects.create(first_name="John", last_name="Doe")
+        self.journey = Journey.objects.create(
+            route=self.route,
+            train=self.train,
+            departure_time=hours(0),
+            arrival_time=hours(4),
+        )
+        self.journey.crew.add(self.crew)
+
+    def payload(self, train, start, end, crew=()):
+        return {
+            "route": self.route.id,
+            "train": train.id,
+            "departure_time": start.isoformat(),
+            "arrival_time": end.isoformat(),
+            "crew": [member.id for member in crew],
+        }
+
+    def test_overlapping_train_rejected(self):
+        res = self.client.post(
+            JOURNEY_URL, self.payload(self.train, hours(2), hours(6))
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("train", res.data)
+
+    def test_overlapping_crew_rejected(self):
+        res = self.client.post(
+            JOURNEY_URL,
+            self.payload(self.other_train, hours(3), hours(5), [self.crew]),
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("crew", res.data)
+
+    def test_consecutive_journey_allowed(self):
+        res = self.client.post(
+            JOURNEY_URL,
+            self.payload(self.train, hours(4), hours(6), [self.crew]),
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
+    def test_update_does_not_conflict_with_itself(self):
+        res = self.client.patch(
+            reverse("station:journey-detail", args=[self.journey.id]),
+            {"arrival_time": hours(5).isoformat()},
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def admin_form(self, train, start, end, crew=()):
+        request = RequestFactory().get("/")
+        request.user = self.user
+        form_class = site._registry[Journey].get_form(request)
+        return form_class(
+            {
+                "route": self.route.id,
+                "train": train.id,
+                "departure_time_0": start.date().isoformat(),
+                "departure_time_1": start.time().isoformat(),
+                "arrival_time_0": end.date().isoformat(),
+                "arrival_time_1": end.time().isoformat(),
+                "crew": [member.id for member in crew],
+            }
+        )
+
+    def test_admin_rejects_overlapping_crew(self):
+        form = self.admin_form(
+            self.other_train, hours(3), hours(5), [self.crew]
+        )
+
+        self.assertFalse(form.is_valid())
+        self.assertIn(
+            f"to journey {self.journey.id}", str(form.errors["crew"])
+        )
+
+        form = self.admin_form(
+            self.other_train, hours(4), hours(6), [self.crew]
+        )
+        self.assertTrue(form.is_valid(), form.errors)
+
+    def test_admin_reports_missing_times(self):
+        form = self.admin_form(self.other_train, hours(3), hours(5))
+        form.data = {**form.data, "arrival_time_0": ""}
+
+        self.assertFalse(form.is_valid())
+        self.assertIn("arrival_time", form.errors)
+
+    def test_audit_command_finds_existing_conflicts(self):
+        Journey.objects.create(
+            route=self.route,
+            train=self.train,
+            departure_time=hours(1),
+            arrival_time=hours(2),
+        )
+        out = StringIO()
+
+        call_command("audit_timetable", stdout=out)
+
+        self.assertIn("Train conflicts: 1", out.getvalue())
+        self.assertIn("Crew member conflicts: 0", out.getvalue())
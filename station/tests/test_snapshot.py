@@ -0,0 +1,155 @@
+import tempfile
+from datetime import date, datetime, timedelta, timezone
+from decimal import Decimal
+from io import StringIO
+from pathlib import Path
+
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from station.models import (
+    Crew,
+    Journey,
+    Order,
+    OutboxEvent,
+    Route,
+    RouteDailyStats,
+    Schedule,
+    Station,
+    Ticket,
+    Train,
+    TrainType,
+)
+from station.snapshot import load, snapshot_models
+
+DAY = datetime(2024, 1, 11, 8, 30, 15, 123456, tzinfo=timezone.utc)
+
+
+class SnapshotTests(TestCase):
+    def setUp(self):
+        self.dir = Path(tempfile.mkdtemp())
+        self.user = get_user_model().objects.create_user(
+            "user@test.com", "testpass"
+        )
+        source = Station.objects.create(name="A", latitude=1, longitude=1)
+        destination = Station.objects.create(
+            name="B", latitude=2, longitude=2
+        )
+        self.route = Route.objects.create(
+            source=source, destination=destination
+        )
+        train = Train.objects.create(
+            name="Train",
+            cargo_num=1,
+            places_in_cargo=5,
+            train_type=TrainType.objects.create(name="Express"),
+        )
+        self.journey = Journey.objects.create(
+            route=self.route,
+            train=train,
+            departure_time=DAY,
+            arrival_time=DAY + timedelta(hours=2),
+        )
+        self.journey.crew.add(
+            Crew.objects.create(first_name="Ann", last_name="Lee")
+        )
+        self.order = Order.objects.create(user=self.user)
+        for seat in (1, 2):
+            Ticket(
+                cargo=1,
+                seat=seat,
+                journey=self.journey,
+                order=self.order,
+                price=Decimal("12.50"),
+            ).save()
+        Schedule.objects.create(
+            route=self.route,
+            train=train,
+            departure_time="08:00",
+            duration=timedelta(hours=2, minutes=5),
+            valid_from=date(2024, 1, 1),
+            valid_until=date(2024, 12, 31),
+        )
+
+    def wipe(self):
+        User = get_user_model()
+        for model in reversed(snapshot_models()):
+            if model is not User:
+                model._base_manager.all().delete()
+
+    def round_trip(self, path):
+        stats = list(
+            RouteDailyStats.objects.values("date", "tickets_sold", "revenue")
+        )
+        created_at = self.order.created_at
+        call_command("fast_dump", str(path), stdout=StringIO())
+        self.wipe()
+        # an existing station is matched by name, not by id
+        Station.objects.create(name="Z", latitude=9, longitude=9)
+        station_b = Station.objects.create(name="B", latitude=2, longitude=2)
+
+        call_command("fast_load", str(path), stdout=StringIO())
+
+        journey = Journey.objects.get(pk=self.journey.pk)
+        self.assertEqual(journey.departure_time, DAY)
+        self.assertEqual(journey.route.source.name, "A")
+        self.assertEqual(journey.route.destination, station_b)
+        self.assertEqual(journey.train.train_type.name, "Express")
+        self.assertEqual(journey.crew.get().full_name, "Ann Lee")
+        self.assertEqual(journey.tickets_sold, 2)
+        self.assertEqual(
+            list(journey.tickets.values_list("seat", "price", "order__user")),
+            [
+                (1, Decimal("12.50"), self.user.pk),
+                (2, Decimal("12.50"), self.user.pk),
+            ],
+        )
+        self.assertEqual(Order.objects.get().created_at, created_at)
+        self.assertEqual(
+            Schedule.objects.get().duration, timedelta(hours=2, minutes=5)
+        )
+        self.assertEqual(Station.objects.count(), 3)
+        self.assertEqual(
+            list(
+                RouteDailyStats.objects.values(
+                    "date", "tickets_sold", "revenue"
+                )
+            ),
+            stats,
+        )
+
+    def test_round_trip(self):
+        self.round_trip(self.dir / "snapshot.jsonl")
+
+    def test_round_trip_compressed(self):
+        path = self.dir / "snapshot.jsonl.gz"
+        self.round_trip(path)
+        self.assertEqual(path.read_bytes()[:2], b"\x1f\x8b")
+
+    def test_refuses_tables_with_rows(self):
+        path = self.dir / "snapshot.jsonl"
+        call_command("fast_dump", str(path), stdout=StringIO())
+
+        with self.assertRaisesMessage(CommandError, "already has rows"):
+            call_command("fast_load", str(path), stdout=StringIO())
+
+    def test_load_inserts_in_bulk_without_signals(self):
+        path = self.dir / "snapshot.jsonl"
+        call_command("fast_dump", str(path), stdout=StringIO())
+        self.wipe()
+        events = OutboxEvent.objects.count()
+
+        with CaptureQueriesContext(connection) as queries:
+            counts = load(path)
+
+        ticket_inserts = [
+            query
+            for query in queries
+            if query["sql"].startswith('INSERT INTO "station_ticket"')
+        ]
+        self.assertEqual(counts["station.ticket"], 2)
+        self.assertEqual(len(ticket_inserts), 1)
+        self.assertEqual(OutboxEvent.objects.count(), events)
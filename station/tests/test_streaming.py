@@ -0,0 +1,103 @@
+import gzip
+import json
+from datetime import datetime, timedelta, timezone
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from station.models import Journey, Route, Station, Train
+from station.streaming import StreamingJSONRenderer
+from station.views import StationViewSet
+
+JOURNEY_URL = reverse("station:journey-list")
+STATION_URL = reverse("station:station-list")
+DAY = datetime(2024, 1, 11, 8, tzinfo=timezone.utc)
+
+
+def body(response):
+    return b"".join(response.streaming_content)
+
+
+class StreamingRendererTests(TestCase):
+    def test_renders_chunks_as_one_array(self):
+        chunks = [[{"id": 1}, {"id": 2}], [{"id": 3}]]
+
+        content = b"".join(StreamingJSONRenderer().iter_render(chunks))
+
+        self.assertEqual(json.loads(content), [{"id": 1}, {"id": 2}, {"id": 3}])
+
+    def test_error_mid_stream_keeps_json_valid(self):
+        def chunks():
+            yield [{"id": 1}]
+            raise RuntimeError("boom")
+
+        with self.assertLogs("station.streaming", "ERROR"):
+            content = b"".join(
+                StreamingJSONRenderer().iter_render(chunks())
+            )
+
+        data = json.loads(content)
+        self.assertEqual(data[0], {"id": 1})
+        self.assertIn("error", data[1])
+
+
+class StreamingListTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "test@test.com", "testpass"
+        )
+        self.client.force_authenticate(self.user)
+
+        route = Route.objects.create(
+            source=Station.objects.create(name="A", latitude=1, longitude=1),
+            destination=Station.objects.create(
+                name="B", latitude=2, longitude=2
+            ),
+        )
+        train = Train.objects.create(
+            name="Train", cargo_num=2, places_in_cargo=10
+        )
+        for day in range(3):
+            Journey.objects.create(
+                route=route,
+                train=train,
+                departure_time=DAY + timedelta(days=day),
+                arrival_time=DAY + timedelta(days=day, hours=2),
+            )
+
+    def test_stream_matches_regular_list(self):
+        regular = self.client.get(JOURNEY_URL)
+        streamed = self.client.get(JOURNEY_URL, {"stream": "true"})
+
+        self.assertTrue(streamed.streaming)
+        self.assertEqual(json.loads(body(streamed)), regular.json())
+
+    @mock.patch.object(StationViewSet, "stream_chunk_size", 1)
+    def test_stream_in_small_chunks(self):
+        res = self.client.get(STATION_URL, {"stream": "1"})
+
+        self.assertEqual(
+            [station["name"] for station in json.loads(body(res))],
+            ["A", "B"],
+        )
+
+    def test_stream_gzip(self):
+        res = self.client.get(
+            JOURNEY_URL,
+            {"stream": "true", "fields": "id"},
+            HTTP_ACCEPT_ENCODING="gzip",
+        )
+
+        self.assertEqual(res["Content-Encoding"], "gzip")
+        self.assertEqual(len(json.loads(gzip.decompress(body(res)))), 3)
+
+    def test_stream_with_date_filter(self):
+        res = self.client.get(
+            JOURNEY_URL, {"stream": "true", "date": "2024-01-12"}
+        )
+
+        self.assertEqual(len(json.loads(body(res))), 1)
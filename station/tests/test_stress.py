@@ -0,0 +1,157 @@
+from datetime import datetime, timedelta, timezone
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
+from django.db import IntegrityError, connection
+from django.test import SimpleTestCase, TestCase, TransactionTestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from station.management.commands import stress_booking
+from station.models import Journey, Order, Route, Station, Ticket, Train
+from station.stress import (
+    check_invariants,
+    percentile,
+    plan_orders,
+    run_stress,
+)
+
+ORDER_URL = reverse("station:order-list")
+DAY = datetime(2024, 1, 11, 8, tzinfo=timezone.utc)
+
+
+def create_journey():
+    return Journey.objects.create(
+        route=Route.objects.create(
+            source=Station.objects.create(name="A", latitude=1, longitude=1),
+            destination=Station.objects.create(
+                name="B", latitude=2, longitude=2
+            ),
+        ),
+        train=Train.objects.create(
+            name="Train", cargo_num=2, places_in_cargo=5
+        ),
+        departure_time=DAY,
+        arrival_time=DAY + timedelta(hours=2),
+    )
+
+
+class StressHarnessTests(TransactionTestCase):
+    def setUp(self):
+        self.users = [
+            get_user_model().objects.create_user(
+                f"stress{i}@test.com", "testpass", is_staff=True
+            )
+            for i in range(2)
+        ]
+        self.journey = create_journey()
+
+    def test_overlapping_orders_never_oversell(self):
+        plan = plan_orders(self.journey, self.users, 12, 2, 6, seed=1)
+
+        report = run_stress(self.journey, plan, workers=4)
+        problems, unconfirmed = check_invariants(
+            self.journey, self.users, 2, report["booked_orders"]
+        )
+
+        self.assertEqual(report["orders"], 12)
+        self.assertGreater(report["conflicts"], 0)
+        self.assertEqual(problems, [])
+        self.assertEqual(
+            Ticket.objects.count(), 2 * (report["booked"] + len(unconfirmed))
+        )
+        if connection.features.has_select_for_update:
+            # SQLite locks whole tables rather than rows and fails some
+            # writers, sometimes after their order was committed
+            self.assertEqual(report["errors"], 0)
+            self.assertEqual(unconfirmed, [])
+
+    def test_partial_order_reported(self):
+        order = Order.objects.create(user=self.users[0])
+        Ticket.objects.create(
+            cargo=1, seat=1, journey=self.journey, order=order
+        )
+
+        problems, _ = check_invariants(
+            self.journey, self.users, 2, {order.id}
+        )
+
+        self.assertEqual(problems, [f"Order {order.id} has 1 of 2 tickets"])
+
+
+@mock.patch.multiple(
+    "station.management.commands.stress_booking",
+    setup_test_environment=mock.DEFAULT,
+    teardown_test_environment=mock.DEFAULT,
+    setup_databases=mock.DEFAULT,
+    teardown_databases=mock.DEFAULT,
+)
+class StressCommandTests(SimpleTestCase):
+    def call(self, **results):
+        report = {
+            "orders": 10,
+            "booked": 3,
+            "conflicts": 7,
+            "throttled": 0,
+            "errors": 0,
+            "error_samples": [],
+            "seconds": 1.0,
+            "throughput": 10.0,
+            "conflict_rate": 0.7,
+            "lock_wait": 0.1,
+            "latency": dict.fromkeys(("p50", "p95", "p99", "max"), 0.01),
+            "unconfirmed": [],
+            **results,
+        }
+        out = StringIO()
+        with mock.patch.object(
+            stress_booking.Command, "run", return_value=(report, [])
+        ):
+            call_command("stress_booking", stdout=out)
+        return out.getvalue()
+
+    def test_success(self, **mocks):
+        self.assertIn("No seat sold twice", self.call())
+
+    def test_errors_fail_the_run(self, **mocks):
+        with self.assertRaisesMessage(CommandError, "2 order(s) failed"):
+            self.call(errors=2, conflicts=5)
+
+    def test_nothing_booked_fails_the_run(self, **mocks):
+        with self.assertRaisesMessage(CommandError, "No order was booked"):
+            self.call(booked=0, conflicts=10)
+
+
+class PercentileTests(TestCase):
+    def test_nearest_rank(self):
+        values = list(range(1, 101))
+
+        self.assertEqual(percentile(values, 0.5), 50)
+        self.assertEqual(percentile(values, 0.99), 99)
+        self.assertIsNone(percentile([], 0.5))
+
+
+class ConcurrentOrderTests(TestCase):
+    def test_seat_taken_after_validation_is_a_bad_request(self):
+        user = get_user_model().objects.create_user(
+            "admin@test.com", "testpass", is_staff=True
+        )
+        client = APIClient()
+        client.force_authenticate(user)
+        journey = create_journey()
+
+        with mock.patch.object(
+            Ticket, "save", side_effect=IntegrityError("duplicate seat")
+        ):
+            res = client.post(
+                ORDER_URL,
+                {"tickets": [{"cargo": 1, "seat": 1, "journey": journey.id}]},
+                format="json",
+            )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("tickets", res.data)
+        self.assertFalse(Order.objects.exists())
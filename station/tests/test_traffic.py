@@ -0,0 +1,167 @@
+import json
+import tempfile
+from pathlib import Path
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TransactionTestCase
+from django.test.utils import override_settings
+
+from station.models import Station
+from station.traffic import (
+    InProcessTarget,
+    TrafficCaptureMiddleware,
+    anonymize,
+    compare,
+    load_requests,
+    pseudonym,
+    replay,
+)
+
+
+class AnonymizeTests(SimpleTestCase):
+    def test_masks_strings_and_sensitive_fields(self):
+        body = {
+            "email": "user@test.com",
+            "password": "secret",
+            "name": "Kyiv",
+            "tickets": [{"cargo": 1, "seat": 2, "journey": 3}],
+            "date": "2024-01-11",
+        }
+
+        masked = anonymize(body)
+
+        self.assertEqual(masked["email"], pseudonym("user@test.com"))
+        self.assertEqual(masked["password"], pseudonym("secret"))
+        self.assertEqual(masked["name"], pseudonym("Kyiv"))
+        self.assertEqual(masked["tickets"], body["tickets"])
+        self.assertEqual(masked["date"], "2024-01-11")
+        self.assertNotIn("secret", json.dumps(masked))
+
+
+class TrafficCaptureMiddlewareTests(SimpleTestCase):
+    def setUp(self):
+        self.path = Path(tempfile.mkdtemp()) / "traffic.jsonl"
+        self.factory = RequestFactory()
+
+    def middleware(self, sample_rate=1.0):
+        with override_settings(
+            TRAFFIC_CAPTURE={"PATH": self.path, "SAMPLE_RATE": sample_rate}
+        ):
+            return TrafficCaptureMiddleware(
+                lambda request: HttpResponse(status=201)
+            )
+
+    def test_records_sampled_api_requests(self):
+        request = self.factory.post(
+            "/api/station/stations/?token=abc",
+            {"name": "Kyiv", "latitude": 50, "longitude": 30},
+            content_type="application/json",
+            HTTP_AUTHORIZATION="Bearer abc",
+        )
+
+        self.middleware()(request)
+
+        [record] = load_requests(self.path, include_writes=True)
+        self.assertEqual(record["method"], "POST")
+        self.assertEqual(record["path"], "/api/station/stations/")
+        self.assertEqual(record["query"], {"token": pseudonym("abc")})
+        self.assertEqual(record["body"]["name"], pseudonym("Kyiv"))
+        self.assertEqual(record["body"]["latitude"], 50)
+        self.assertTrue(record["authenticated"])
+        self.assertEqual(record["status"], 201)
+
+    def test_skips_other_paths_and_writes_by_default(self):
+        middleware = self.middleware()
+        middleware(self.factory.get("/admin/"))
+        middleware(self.factory.delete("/api/station/stations/1/"))
+
+        self.assertEqual(list(load_requests(self.path)), [])
+        self.assertEqual(
+            len(list(load_requests(self.path, include_writes=True))), 1
+        )
+
+    def test_large_and_non_json_bodies_are_not_read(self):
+        middleware = self.middleware()
+        upload = self.factory.post(
+            "/api/station/trains/1/upload-image/",
+            {"image": "x" * 100},
+        )
+        large = self.factory.post(
+            "/api/station/stations/",
+            {"name": "x" * 100_000},
+            content_type="application/json",
+        )
+
+        for request in (upload, large):
+            middleware(request)
+            self.assertFalse(hasattr(request, "_body"))
+
+        records = [
+            json.loads(line) for line in self.path.read_text().splitlines()
+        ]
+        self.assertEqual(
+            records[0]["body"], {"unparsed": "multipart/form-data"}
+        )
+        self.assertEqual(records[1]["body"], {"truncated": True})
+        self.assertEqual(list(load_requests(self.path, True)), [])
+
+    def test_disabled_without_sample_rate(self):
+        with self.assertRaises(MiddlewareNotUsed):
+            self.middleware(sample_rate=0)
+
+
+class ReplayTests(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(
+            "replay@test.com", "testpass"
+        )
+        station = Station.objects.create(name="A", latitude=1, longitude=1)
+        self.records = [
+            {
+                "method": "GET",
+                "path": "/api/station/stations/",
+                "query": {},
+                "body": None,
+                "authenticated": True,
+            },
+            {
+                "method": "GET",
+                "path": f"/api/station/stations/{station.id}/",
+                "query": {},
+                "body": None,
+                "authenticated": True,
+            },
+            {
+                "method": "GET",
+                "path": "/api/station/stations/",
+                "query": {},
+                "body": None,
+                "authenticated": False,
+            },
+        ]
+
+    def test_reports_latency_errors_and_queries_per_route(self):
+        report = replay(self.records, InProcessTarget(self.user))
+
+        self.assertEqual(report["requests"], 3)
+        stations = report["routes"]["GET station:station-list"]
+        self.assertEqual(stations["requests"], 2)
+        self.assertEqual(stations["client_errors"], 1)
+        self.assertEqual(stations["error_rate"], 0)
+        self.assertGreater(stations["queries"], 0)
+        self.assertIsNotNone(stations["p95_ms"])
+        self.assertIn("GET station:station-detail", report["routes"])
+
+    def test_compare_pairs_metrics_of_shared_routes(self):
+        baseline = replay(self.records[:1], InProcessTarget(self.user))
+        report = replay(self.records, InProcessTarget(self.user))
+
+        changes = compare(baseline, report)
+
+        self.assertEqual(list(changes), ["GET station:station-list"])
+        before, after = changes["GET station:station-list"]["queries"]
+        self.assertIsNotNone(before)
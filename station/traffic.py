@@ -0,0 +1,352 @@
+"""
+Traffic capture and replay.
+
+``TrafficCaptureMiddleware`` appends a sample of API requests to a JSONL
+file: method, path, query, an anonymized JSON body, whether the client was
+authenticated, the status and the server-side duration. Credentials and
+personal values never reach the file; strings in bodies are replaced by
+stable pseudonyms so replayed requests keep their shape.
+
+``replay`` drives captured requests back through the app, in-process or
+against a running server, and reports latency percentiles, error rates
+and query counts per route. Saving two reports lets ``compare`` show what
+a change did.
+"""
+import hashlib
+import json
+import queue
+import random
+import re
+import threading
+import time
+import urllib.error
+import urllib.request
+from pathlib import Path
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import Resolver404, resolve
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.test import APIClient
+
+from .stress import percentile
+
+
+SENSITIVE_KEYS = {
+    "password",
+    "token",
+    "access",
+    "refresh",
+    "email",
+    "first_name",
+    "last_name",
+}
+# dates, times and numbers carry no personal data and keep bodies valid
+PLAIN_STRING = re.compile(r"^[\d:.\-+TZ ]*$")
+DEFAULT_CAPTURE = {
+    "PATH": None,
+    "SAMPLE_RATE": 0.0,
+    "PATH_PREFIXES": ("/api/",),
+    "MAX_BODY_BYTES": 64 * 1024,
+}
+
+_write_lock = threading.Lock()
+
+
+def capture_settings():
+    return {**DEFAULT_CAPTURE, **getattr(settings, "TRAFFIC_CAPTURE", {})}
+
+
+def pseudonym(value):
+    digest = hashlib.sha256(str(value).encode()).hexdigest()[:8]
+    return f"anon-{digest}"
+
+
+def anonymize(value, key=None):
+    """Copy of a JSON value with strings and sensitive fields masked"""
+    if isinstance(value, dict):
+        return {name: anonymize(item, name) for name, item in value.items()}
+    if isinstance(value, list):
+        return [anonymize(item, key) for item in value]
+    if key in SENSITIVE_KEYS:
+        return None if value is None else pseudonym(value)
+    if isinstance(value, str) and not PLAIN_STRING.match(value):
+        return pseudonym(value)
+    return value
+
+
+def _query(request):
+    return {
+        name: pseudonym(value) if name in SENSITIVE_KEYS else value
+        for name, value in request.GET.items()
+    }
+
+
+def _body(request, max_bytes):
+    """
+    The anonymized JSON body, read only when it is small enough to record.
+
+    Other bodies are left alone: uploads are streamed to the view instead
+    of being buffered in memory for a sample nobody can replay.
+    """
+    if request.method in SAFE_METHODS:
+        return None
+    try:
+        length = int(request.META.get("CONTENT_LENGTH") or 0)
+    except ValueError:
+        length = 0
+    if not length:
+        return None
+    if request.content_type != "application/json":
+        # form and multipart uploads are not replayable as JSON
+        return {"unparsed": request.content_type}
+    if length > max_bytes:
+        return {"truncated": True}
+    try:
+        return anonymize(json.loads(request.body))
+    except ValueError:
+        return {"unparsed": request.content_type}
+
+
+class TrafficCaptureMiddleware:
+    """Samples API requests into ``TRAFFIC_CAPTURE["PATH"]``"""
+
+    def __init__(self, get_response):
+        options = capture_settings()
+        if not options["PATH"] or not options["SAMPLE_RATE"]:
+            raise MiddlewareNotUsed
+
+        self.get_response = get_response
+        self.path = Path(options["PATH"])
+        self.sample_rate = options["SAMPLE_RATE"]
+        self.prefixes = tuple(options["PATH_PREFIXES"])
+        self.max_body_bytes = options["MAX_BODY_BYTES"]
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+    def __call__(self, request):
+        if (
+            not request.path.startswith(self.prefixes)
+            or random.random() >= self.sample_rate
+        ):
+            return self.get_response(request)
+
+        # read the body now, the view may consume the stream
+        body = _body(request, self.max_body_bytes)
+        started = time.perf_counter()
+        response = self.get_response(request)
+
+        record = {
+            "ts": time.time(),
+            "method": request.method,
+            "path": request.path,
+            "query": _query(request),
+            "body": body,
+            "authenticated": "HTTP_AUTHORIZATION" in request.META,
+            "status": response.status_code,
+            "duration_ms": round((time.perf_counter() - started) * 1000, 2),
+        }
+        with _write_lock, self.path.open("a") as file:
+            file.write(json.dumps(record) + "\n")
+        return response
+
+
+def load_requests(path, include_writes=False):
+    with Path(path).open() as file:
+        for line in file:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if record["method"] in SAFE_METHODS:
+                yield record
+            elif include_writes and not _unreplayable(record["body"]):
+                yield record
+
+
+def _unreplayable(body):
+    return isinstance(body, dict) and (
+        "unparsed" in body or "truncated" in body
+    )
+
+
+def route_name(record):
+    try:
+        match = resolve(record["path"])
+    except Resolver404:
+        return f"{record['method']} <unresolved>"
+    return f"{record['method']} {match.view_name}"
+
+
+def _server_name():
+    """A host ``ALLOWED_HOSTS`` accepts outside of the test runner"""
+    for host in settings.ALLOWED_HOSTS:
+        if "*" not in host and not host.startswith("."):
+            return host
+    return "testserver"
+
+
+class InProcessTarget:
+    """Sends requests through the Django test client in this process"""
+
+    def __init__(self, user=None):
+        self.user = user
+        self.local = threading.local()
+
+    def client(self):
+        if not hasattr(self.local, "client"):
+            self.local.client = APIClient(SERVER_NAME=_server_name())
+        return self.local.client
+
+    def send(self, record):
+        client = self.client()
+        client.force_authenticate(
+            self.user if record.get("authenticated") else None
+        )
+        with CaptureQueriesContext(connection) as queries:
+            response = client.generic(
+                record["method"],
+                record["path"] + _query_string(record),
+                data=(
+                    json.dumps(record["body"])
+                    if record["body"] is not None
+                    else ""
+                ),
+                content_type="application/json",
+            )
+            if response.streaming:
+                b"".join(response.streaming_content)
+        return response.status_code, len(queries)
+
+    def close(self):
+        connection.close()
+
+
+class HttpTarget:
+    """Sends requests to a running server"""
+
+    def __init__(self, base_url, token=None, timeout=30):
+        self.base_url = base_url.rstrip("/")
+        self.token = token
+        self.timeout = timeout
+
+    def send(self, record):
+        headers = {"Content-Type": "application/json"}
+        if self.token and record.get("authenticated"):
+            headers["Authorization"] = f"Bearer {self.token}"
+        body = record["body"]
+        data = json.dumps(body).encode() if body is not None else None
+        request = urllib.request.Request(
+            self.base_url + record["path"] + _query_string(record),
+            data=data,
+            headers=headers,
+            method=record["method"],
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as res:
+                res.read()
+                return res.status, None
+        except urllib.error.HTTPError as error:
+            return error.code, None
+
+    def close(self):
+        pass
+
+
+def _query_string(record):
+    return "?" + urlencode(record["query"]) if record["query"] else ""
+
+
+def _replay_worker(target, records, samples):
+    try:
+        while True:
+            try:
+                record = records.get_nowait()
+            except queue.Empty:
+                return
+            started = time.perf_counter()
+            try:
+                status, query_count = target.send(record)
+            except Exception:
+                status, query_count = None, None
+            samples.append(
+                (
+                    route_name(record),
+                    status,
+                    time.perf_counter() - started,
+                    query_count,
+                )
+            )
+    finally:
+        target.close()
+
+
+def replay(records, target, concurrency=1):
+    """Replay ``records`` from ``concurrency`` threads, report per route"""
+    pending = queue.Queue()
+    for record in records:
+        pending.put(record)
+
+    samples = []
+    threads = [
+        threading.Thread(
+            target=_replay_worker, args=(target, pending, samples)
+        )
+        for _ in range(concurrency)
+    ]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    by_route = {}
+    for route, status, latency, query_count in samples:
+        by_route.setdefault(route, []).append((status, latency, query_count))
+
+    routes = {}
+    for route, rows in sorted(by_route.items()):
+        latencies = sorted(latency for _, latency, _ in rows)
+        statuses = [status for status, _, _ in rows]
+        query_counts = [count for _, _, count in rows if count is not None]
+        errors = sum(
+            1 for status in statuses if status is None or status >= 500
+        )
+        routes[route] = {
+            "requests": len(rows),
+            "client_errors": sum(
+                1 for status in statuses if status and 400 <= status < 500
+            ),
+            "error_rate": errors / len(rows),
+            "p50_ms": percentile(latencies, 0.50) * 1000,
+            "p95_ms": percentile(latencies, 0.95) * 1000,
+            "p99_ms": percentile(latencies, 0.99) * 1000,
+            "queries": (
+                sum(query_counts) / len(query_counts)
+                if query_counts
+                else None
+            ),
+        }
+
+    return {
+        "requests": len(samples),
+        "seconds": elapsed,
+        "throughput": len(samples) / elapsed if elapsed else 0.0,
+        "routes": routes,
+    }
+
+
+def compare(baseline, report):
+    """``{route: {metric: (before, after)}}`` for routes in both reports"""
+    changes = {}
+    for route, after in report["routes"].items():
+        before = baseline["routes"].get(route)
+        if before is None:
+            continue
+        changes[route] = {
+            metric: (before[metric], after[metric])
+            for metric in ("p50_ms", "p95_ms", "error_rate", "queries")
+        }
+    return changes
@@ -9,7 +9,13 @@ from .views import (
     TicketViewSet,
     OrderViewSet,
     RouteViewSet,
-    StationViewSet
+    StationViewSet,
+    ScheduleViewSet,
+    RouteDailyStatsViewSet,
+    TrainTypeDailyStatsViewSet,
+    ProfileViewSet,
+    BatchView,
+    journey_seats_stream,
 )
 
 router = routers.DefaultRouter()
@@ -22,7 +28,25 @@ router.register("tickets", TicketViewSet)
 router.register("orders", OrderViewSet)
 router.register("routes", RouteViewSet)
 router.register("stations", StationViewSet)
+router.register("schedules", ScheduleViewSet)
+router.register(
+    "analytics/routes", RouteDailyStatsViewSet, basename="route-stats"
+)
+router.register(
+    "analytics/train-types",
+    TrainTypeDailyStatsViewSet,
+    basename="train-type-stats",
+)
+router.register("profiles", ProfileViewSet, basename="profile")
 
-urlpatterns = [path("", include(router.urls))]
+urlpatterns = [
+    path("", include(router.urls)),
+    path("batch/", BatchView.as_view(), name="batch"),
+    path(
+        "journeys/<int:pk>/seats/stream/",
+        journey_seats_stream,
+        name="journey-seats-stream",
+    ),
+]
 
 app_name = "station"
@@ -0,0 +1,53 @@
+"""
+Version stamps of process-local caches.
+
+Each cache built from the database (reference data, the fare table, the
+station graph, the crew index) is tagged with the stamp of its row in
+``CacheVersion``. A write that changes the underlying data calls
+``bump()`` in the same transaction; every process compares its copy's
+stamp with the stored one before using it and rebuilds the copy when they
+differ, so a change made by one worker is seen by all of them.
+
+The stamps are read in one query, at most once per request: ``recheck()``
+runs when a request starts.
+"""
+from contextvars import ContextVar
+
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from .models import CacheVersion
+
+_stamps = ContextVar("station_cache_versions", default=None)
+
+
+def current(name):
+    """Stored stamp of the cache called ``name``"""
+    stamps = _stamps.get()
+    if stamps is None:
+        stamps = dict(CacheVersion.objects.values_list("name", "version"))
+        _stamps.set(stamps)
+    return stamps.get(name, 0)
+
+
+def bump(name):
+    """Move the stamp on so every process rebuilds its copy; return it"""
+    updated = CacheVersion.objects.filter(name=name).update(
+        version=F("version") + 1
+    )
+    if not updated:
+        try:
+            with transaction.atomic():
+                CacheVersion.objects.create(name=name, version=1)
+        except IntegrityError:
+            CacheVersion.objects.filter(name=name).update(
+                version=F("version") + 1
+            )
+
+    recheck()
+    return current(name)
+
+
+def recheck():
+    """Read the stamps again on next use"""
+    _stamps.set(None)
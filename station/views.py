@@ -1,10 +1,21 @@
 from datetime import datetime
 
-from django.db.models import Count, F
-from rest_framework import viewsets, status
+from asgiref.sync import sync_to_async
+from django.db.models import Count, F, Prefetch
+from django.http import FileResponse, JsonResponse, StreamingHttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework import mixins, viewsets, status
+from rest_framework.exceptions import NotFound, ValidationError
 from rest_framework.response import Response
 from rest_framework.decorators import action
+from rest_framework.views import APIView
 from rest_framework.permissions import IsAuthenticated, IsAdminUser
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import (
+    AuthenticationFailed,
+    InvalidToken,
+)
 from drf_spectacular.types import OpenApiTypes
 from drf_spectacular.utils import extend_schema, OpenApiParameter
 
@@ -17,8 +28,32 @@ from .models import (
     Ticket,
     Order,
     Route,
-    Station
+    Station,
+    Tariff,
+    Schedule,
+    RouteDailyStats,
+    TrainTypeDailyStats,
+    ArchivedJourney,
+)
+from . import refdata
+from .fares import quote_journeys
+from .allocation import MAX_GROUP_SIZE, AllocationError, allocate
+from .batch import MultiGetMixin, run_batch
+from .fieldsets import SparseFieldsetMixin
+from .graph import get_graph, invalidate_graph
+from .live import event_stream
+from .profiling import (
+    HEADER,
+    list_profiles,
+    load_profile,
+    make_token,
+    profile_file,
+    profiling_settings,
 )
+from .streaming import TRUTHY, StreamingListMixin
+from .idempotency import IdempotentCreateMixin
+from .scheduling import available_crew_ids, crew_roster_ids
+from .schedules import virtual_journeys
 from .serializers import (
     TrainSerializer,
     TrainListSerializer,
@@ -28,8 +63,10 @@ from .serializers import (
     JourneySerializer,
     JourneyListSerializer,
     JourneyDetailSerializer,
+    JourneyQuoteSerializer,
     CrewSerializer,
     CrewListSerializer,
+    CrewRosterSerializer,
     TicketSerializer,
     OrderSerializer,
     OrderListSerializer,
@@ -37,18 +74,36 @@ from .serializers import (
     RouteListSerializer,
     RouteDetailSerializer,
     StationSerializer,
+    ScheduleSerializer,
+    RouteDailyStatsSerializer,
+    TrainTypeDailyStatsSerializer,
+    ShortestPathSerializer,
+    ReachableStationSerializer,
+    BatchSerializer,
+    BatchResponseSerializer,
 )
 from .permissions import IsAdminOrIfAuthenticatedReadOnly
 
 
-class StationViewSet(viewsets.ModelViewSet):
+class StationViewSet(
+    MultiGetMixin,
+    SparseFieldsetMixin,
+    StreamingListMixin,
+    viewsets.ModelViewSet,
+):
     queryset = Station.objects.all()
     serializer_class = StationSerializer
     permission_classes = (IsAdminOrIfAuthenticatedReadOnly,)
 
 
-class RouteViewSet(viewsets.ModelViewSet):
-    queryset = Route.objects.select_related("source", "destination")
+class RouteViewSet(
+    MultiGetMixin,
+    SparseFieldsetMixin,
+    StreamingListMixin,
+    viewsets.ModelViewSet,
+):
+    # station names and coordinates come from station.refdata
+    queryset = Route.objects.all()
     serializer_class = RouteSerializer
     permission_classes = (IsAdminOrIfAuthenticatedReadOnly,)
 
@@ -59,19 +114,126 @@ class RouteViewSet(viewsets.ModelViewSet):
         if self.action == "retrieve":
             return RouteDetailSerializer
 
+        if self.action == "shortest":
+            return ShortestPathSerializer
+
+        if self.action == "reachable":
+            return ReachableStationSerializer
+
         return RouteSerializer
 
+    def _station_param(self, name, graph):
+        value = self.request.query_params.get(name)
+        if not value:
+            raise ValidationError({name: "This parameter is required."})
+        try:
+            station_id = int(value)
+        except ValueError:
+            raise ValidationError({name: "Expected a station id."})
+
+        if station_id not in graph:
+            raise NotFound(f"Station {station_id} does not exist.")
+        return station_id
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                "from",
+                type=OpenApiTypes.INT,
+                required=True,
+                description="Departure station id",
+            ),
+            OpenApiParameter(
+                "to",
+                type=OpenApiTypes.INT,
+                required=True,
+                description="Arrival station id",
+            ),
+        ]
+    )
+    @action(methods=["GET"], detail=False)
+    def shortest(self, request):
+        """Shortest chain of routes between two stations"""
+        graph = get_graph()
+        source = self._station_param("from", graph)
+        target = self._station_param("to", graph)
+
+        path = graph.shortest_path(source, target)
+        if path is None:
+            data = {
+                "reachable": False,
+                "distance_km": None,
+                "stations": [],
+                "routes": [],
+            }
+        else:
+            distance, station_ids, route_ids = path
+            stations = Station.objects.in_bulk(station_ids)
+            missing = set(station_ids) - stations.keys()
+            if missing:
+                # deleted after the graph was read; rebuild it next time
+                invalidate_graph()
+                raise NotFound(f"Station {min(missing)} does not exist.")
+            data = {
+                "reachable": True,
+                "distance_km": distance,
+                "stations": [stations[pk] for pk in station_ids],
+                "routes": route_ids,
+            }
+
+        return Response(self.get_serializer(data).data)
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                "from",
+                type=OpenApiTypes.INT,
+                required=True,
+                description="Departure station id",
+            ),
+        ]
+    )
+    @action(methods=["GET"], detail=False)
+    def reachable(self, request):
+        """Stations reachable from a station, nearest first"""
+        graph = get_graph()
+        source = self._station_param("from", graph)
+
+        reachable = sorted(
+            graph.reachable(source).items(), key=lambda item: item[1]
+        )
+        serializer = self.get_serializer(
+            [
+                {"station": station_id, "distance_km": distance}
+                for station_id, distance in reachable
+            ],
+            many=True,
+        )
+        return Response(serializer.data)
+
 
-class TrainTypeViewSet(viewsets.ModelViewSet):
+class TrainTypeViewSet(
+    MultiGetMixin,
+    SparseFieldsetMixin,
+    StreamingListMixin,
+    viewsets.ModelViewSet,
+):
     queryset = TrainType.objects.all()
     serializer_class = TrainTypeSerializer
     permission_classes = (IsAdminOrIfAuthenticatedReadOnly,)
 
 
-class TrainViewSet(viewsets.ModelViewSet):
-    queryset = Train.objects.select_related("train_type")
+class TrainViewSet(
+    MultiGetMixin,
+    SparseFieldsetMixin,
+    StreamingListMixin,
+    viewsets.ModelViewSet,
+):
+    queryset = Train.objects.all()
     serializer_class = TrainSerializer
     permission_classes = (IsAdminOrIfAuthenticatedReadOnly,)
+    # variant URLs are only served while they match the current image
+    field_requires = {"image_variants": ("image",)}
 
     def get_serializer_class(self):
         if self.action == "list":
@@ -88,12 +250,14 @@ class TrainViewSet(viewsets.ModelViewSet):
     def get_queryset(self):
         """Retrieve the trains with filters"""
         train_type = self.request.query_params.get("type")
-        queryset = self.queryset
+        queryset = self.queryset.all()
 
         if train_type:
-            queryset = queryset.filter(train_type__name__icontains=train_type)
+            queryset = queryset.filter(
+                train_type_id__in=refdata.ids_matching(TrainType, train_type)
+            )
 
-        return queryset.distinct()
+        return queryset
 
     @action(
         methods=["POST"],
@@ -102,7 +266,7 @@ class TrainViewSet(viewsets.ModelViewSet):
         permission_classes=[IsAdminUser],
     )
     def upload_image(self, request, pk):
-        """Endpoint for uploading image to specific train"""
+        """Store the image now, its resized variants come later"""
         train = self.get_object()
         serializer = self.get_serializer(train, data=request.data)
 
@@ -123,37 +287,129 @@ class TrainViewSet(viewsets.ModelViewSet):
         return super().list(request, *args, **kwargs)
 
 
-class CrewViewSet(viewsets.ModelViewSet):
+class CrewViewSet(
+    MultiGetMixin,
+    SparseFieldsetMixin,
+    StreamingListMixin,
+    viewsets.ModelViewSet,
+):
     queryset = Crew.objects.all()
     serializer_class = CrewSerializer
     permission_classes = (IsAdminOrIfAuthenticatedReadOnly,)
 
     def get_serializer_class(self):
-        if self.action == "list":
+        if self.action in ("list", "available"):
             return CrewListSerializer
 
+        if self.action == "roster":
+            return CrewRosterSerializer
+
         return CrewSerializer
 
+    def _window_param(self, name, required=False):
+        value = self.request.query_params.get(name)
+        if not value:
+            if required:
+                raise ValidationError({name: "This parameter is required."})
+            return None
+
+        moment = parse_datetime(value)
+        if moment is None:
+            try:
+                moment = datetime.strptime(value, "%Y-%m-%d")
+            except ValueError:
+                raise ValidationError(
+                    {name: "Expected a date or an ISO 8601 datetime."}
+                )
+
+        if timezone.is_naive(moment):
+            moment = timezone.make_aware(moment)
+        return moment
+
+    def _window(self, required=False):
+        start = self._window_param("from", required)
+        end = self._window_param("to", required)
+        if start is not None and end is not None and start >= end:
+            raise ValidationError({"to": "Must be later than from."})
+        return start, end
 
-class JourneyViewSet(viewsets.ModelViewSet):
-    queryset = (
-        Journey.objects
-        .select_related(
-            "route__source",
-            "route__destination",
-            "train",
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                "from",
+                type=OpenApiTypes.DATETIME,
+                required=True,
+                description="Start of the window (ex. ?from=2024-01-11T08:00)",
+            ),
+            OpenApiParameter(
+                "to",
+                type=OpenApiTypes.DATETIME,
+                required=True,
+                description="End of the window (ex. ?to=2024-01-11T20:00)",
+            ),
+        ]
+    )
+    @action(methods=["GET"], detail=False)
+    def available(self, request):
+        """Crew members with no journey overlapping the window"""
+        start, end = self._window(required=True)
+
+        crew = list(self.get_queryset())
+        free_ids = set(
+            available_crew_ids([member.id for member in crew], start, end)
         )
-        .prefetch_related("crew")
-        .annotate(
-            tickets_available=(
-                F("train__cargo_num")
-                * F("train__places_in_cargo")
-                - Count("tickets")
-            )
+        serializer = self.get_serializer(
+            [member for member in crew if member.id in free_ids], many=True
         )
+        return Response(serializer.data)
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                "from",
+                type=OpenApiTypes.DATETIME,
+                description="Start of the window (ex. ?from=2024-01-11T08:00)",
+            ),
+            OpenApiParameter(
+                "to",
+                type=OpenApiTypes.DATETIME,
+                description="End of the window (ex. ?to=2024-01-11T20:00)",
+            ),
+        ]
+    )
+    @action(methods=["GET"], detail=True)
+    def roster(self, request, pk=None):
+        """Journeys of the crew member overlapping the window"""
+        member = self.get_object()
+        journey_ids = crew_roster_ids(member.id, *self._window())
+
+        journeys = Journey.objects.filter(id__in=journey_ids).select_related(
+            "train", "route__source", "route__destination"
+        ).order_by("departure_time")
+        serializer = self.get_serializer(journeys, many=True)
+        return Response(serializer.data)
+
+
+class JourneyViewSet(
+    MultiGetMixin,
+    SparseFieldsetMixin,
+    StreamingListMixin,
+    viewsets.ModelViewSet,
+):
+    queryset = Journey.objects.select_related("train").annotate(
+        tickets_available=F("capacity") - F("tickets_sold")
     )
     serializer_class = JourneySerializer
     permission_classes = (IsAdminOrIfAuthenticatedReadOnly,)
+    orderings = ("tickets_available", "-tickets_available")
+    field_querysets = {
+        "route": lambda queryset: queryset.select_related(
+            "route__source", "route__destination"
+        ),
+        "crew": lambda queryset: queryset.prefetch_related("crew"),
+    }
+    field_requires = {"fare": ("departure_time",)}
+    required_paths = ("departure_time", "train__name")
 
     def get_serializer_class(self):
         if self.action == "list":
@@ -162,20 +418,64 @@ class JourneyViewSet(viewsets.ModelViewSet):
         if self.action == "retrieve":
             return JourneyDetailSerializer
 
+        if self.action == "quote":
+            return JourneyQuoteSerializer
+
+        if self.action == "allocate":
+            return OrderSerializer
+
         return JourneySerializer
 
-    def get_queryset(self):
+    def _filter_params(self):
         date = self.request.query_params.get("date")
         train_id_str = self.request.query_params.get("train")
-        queryset = self.queryset.all()
 
         if date:
             date = datetime.strptime(date, "%Y-%m-%d").date()
 
+        train_id = int(train_id_str) if train_id_str else None
+
+        return date, train_id
+
+    def _ordering(self):
+        ordering = self.request.query_params.get("ordering")
+        if ordering and ordering not in self.orderings:
+            raise ValidationError(
+                {"ordering": f"Expected one of {list(self.orderings)}."}
+            )
+        return ordering
+
+    def _available(self):
+        available = self.request.query_params.get("available")
+        if not available:
+            return None
+        try:
+            available = int(available)
+        except ValueError:
+            available = -1
+        if available < 0:
+            raise ValidationError(
+                {"available": "Expected a non-negative number of places."}
+            )
+        return available
+
+    def get_queryset(self, filter_available=True):
+        date, train_id = self._filter_params()
+        queryset = self.queryset.all()
+
+        if date:
             queryset = queryset.filter(departure_time__date=date)
 
-        if train_id_str:
-            queryset = queryset.filter(train_id=int(train_id_str))
+        if train_id:
+            queryset = queryset.filter(train_id=train_id)
+
+        available = self._available() if filter_available else None
+        if available is not None:
+            queryset = queryset.filter(tickets_available__gte=available)
+
+        ordering = self._ordering()
+        if ordering:
+            queryset = queryset.order_by(ordering, "-departure_time")
 
         return queryset
 
@@ -194,13 +494,170 @@ class JourneyViewSet(viewsets.ModelViewSet):
                     "(ex. ?date=2022-10-23)"
                 ),
             ),
+            OpenApiParameter(
+                "available",
+                type=OpenApiTypes.INT,
+                description=(
+                    "Only journeys with at least this many free places "
+                    "(ex. ?available=2)"
+                ),
+            ),
+            OpenApiParameter(
+                "ordering",
+                type=OpenApiTypes.STR,
+                enum=orderings,
+                description=(
+                    "Sort by free places "
+                    "(ex. ?ordering=-tickets_available)"
+                ),
+            ),
         ]
     )
     def list(self, request, *args, **kwargs):
-        return super().list(request, *args, **kwargs)
+        """Journeys; with ?date= also unsold occurrences of schedules"""
+        date, train_id = self._filter_params()
+        if not date:
+            return super().list(request, *args, **kwargs)
+
+        # sold out journeys must stay in the list until the schedules are
+        # merged in, or their occurrences come back as virtual journeys
+        journeys = list(
+            self.filter_queryset(self.get_queryset(filter_available=False))
+        )
+        journeys += virtual_journeys(date, journeys, train_id)
+        available = self._available()
+        if available is not None:
+            journeys = [
+                journey
+                for journey in journeys
+                if journey.tickets_available >= available
+            ]
+        journeys.sort(key=lambda journey: journey.train.name)
+        journeys.sort(key=lambda journey: journey.departure_time, reverse=True)
+
+        ordering = self._ordering()
+        if ordering:
+            journeys.sort(
+                key=lambda journey: journey.tickets_available,
+                reverse=ordering.startswith("-"),
+            )
+
+        if self.wants_stream():
+            return self.stream_list(journeys)
+
+        page = self.paginate_queryset(journeys)
+        if page is not None:
+            serializer = self.get_serializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
+
+        serializer = self.get_serializer(journeys, many=True)
+        return Response(serializer.data)
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                "train",
+                type=OpenApiTypes.INT,
+                description="Filter by train id (ex. ?train=2)",
+            ),
+            OpenApiParameter(
+                "date",
+                type=OpenApiTypes.DATE,
+                description=(
+                    "Filter by date of departure "
+                    "(ex. ?date=2022-10-23)"
+                ),
+            ),
+        ]
+    )
+    @action(methods=["GET"], detail=False)
+    def quote(self, request):
+        """Standard and first class fares for the filtered journeys"""
+        journeys = list(self.get_queryset())
+        standard = quote_journeys(journeys, Tariff.STANDARD_CLASS)
+        first = quote_journeys(journeys, Tariff.FIRST_CLASS)
+
+        serializer = self.get_serializer(
+            [
+                {"id": journey.id, "standard": price, "first": first_price}
+                for journey, price, first_price in zip(
+                    journeys, standard, first
+                )
+            ],
+            many=True,
+        )
+        return Response(serializer.data)
+
+    @extend_schema(
+        request=None,
+        parameters=[
+            OpenApiParameter(
+                "count",
+                type=OpenApiTypes.INT,
+                required=True,
+                description=f"Seats to book (1..{MAX_GROUP_SIZE})",
+            ),
+            OpenApiParameter(
+                "together",
+                type=OpenApiTypes.BOOL,
+                description=(
+                    "Prefer adjacent seats in one cargo (default true)"
+                ),
+            ),
+            OpenApiParameter(
+                "cargo_class",
+                type=OpenApiTypes.STR,
+                enum=[Tariff.STANDARD_CLASS, Tariff.FIRST_CLASS],
+                description="Only use cargos of this class",
+            ),
+        ],
+    )
+    @action(methods=["POST"], detail=True)
+    def allocate(self, request, pk=None):
+        """Book free seats for a group in a single new order"""
+        try:
+            count = int(request.query_params.get("count", ""))
+        except ValueError:
+            raise ValidationError({"count": "Expected a number of seats."})
+        if not 1 <= count <= MAX_GROUP_SIZE:
+            raise ValidationError(
+                {"count": f"Must be in range (1, {MAX_GROUP_SIZE})."}
+            )
 
+        cargo_class = request.query_params.get("cargo_class")
+        if cargo_class not in (
+            None,
+            Tariff.STANDARD_CLASS,
+            Tariff.FIRST_CLASS,
+        ):
+            raise ValidationError({"cargo_class": "Unknown cargo class."})
+
+        together = request.query_params.get("together", "true")
+        journey = self.get_object()
+        try:
+            order, contiguous = allocate(
+                journey.id,
+                request.user,
+                count,
+                together=together.lower() in TRUTHY,
+                cargo_class=cargo_class,
+            )
+        except AllocationError as error:
+            return Response(
+                {"detail": str(error)}, status=status.HTTP_409_CONFLICT
+            )
 
-class TicketViewSet(viewsets.ModelViewSet):
+        data = self.get_serializer(order).data
+        data["together"] = contiguous
+        return Response(data, status=status.HTTP_201_CREATED)
+
+
+class TicketViewSet(
+    MultiGetMixin,
+    SparseFieldsetMixin,
+    IdempotentCreateMixin,
+    viewsets.ModelViewSet,
+):
     queryset = Ticket.objects.select_related(
         "journey__train"
     )
@@ -210,6 +667,10 @@ class TicketViewSet(viewsets.ModelViewSet):
 
     def list(self, request, *args, **kwargs):
         tickets = self.get_queryset()
+        page = self.paginate_queryset(tickets)
+        if page is not None:
+            return self.get_paginated_response(self.format_tickets(page))
+
         formatted_data = self.format_tickets(tickets)
         return Response(formatted_data)
 
@@ -236,17 +697,37 @@ class TicketViewSet(viewsets.ModelViewSet):
             )
 
 
-class OrderViewSet(viewsets.ModelViewSet):
-    queryset = Order.objects.prefetch_related(
-        "tickets__journey__train",
-        "tickets__journey__route",
-        "tickets__journey__route__source",
-    )
+class OrderViewSet(
+    MultiGetMixin,
+    SparseFieldsetMixin,
+    StreamingListMixin,
+    IdempotentCreateMixin,
+    viewsets.ModelViewSet,
+):
+    queryset = Order.objects.prefetch_related("tickets", "archived_tickets")
     serializer_class = OrderSerializer
     permission_classes = (IsAdminOrIfAuthenticatedReadOnly,)
 
     def get_queryset(self):
-        return self.queryset.filter(user=self.request.user)
+        queryset = self.queryset.filter(user=self.request.user)
+        if self.action == "list":
+            queryset = queryset.prefetch_related(
+                Prefetch(
+                    "tickets__journey",
+                    queryset=Journey.objects.select_related(
+                        "train", "route__source", "route__destination"
+                    ).annotate(
+                        tickets_available=F("capacity") - F("tickets_sold")
+                    ),
+                ),
+                Prefetch(
+                    "archived_tickets__journey",
+                    queryset=ArchivedJourney.objects.select_related(
+                        "train", "route__source", "route__destination"
+                    ),
+                ),
+            )
+        return queryset
 
     def get_serializer_class(self):
         if self.action == "list":
@@ -255,3 +736,202 @@ class OrderViewSet(viewsets.ModelViewSet):
 
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
+
+
+class ScheduleViewSet(
+    MultiGetMixin,
+    SparseFieldsetMixin,
+    StreamingListMixin,
+    viewsets.ModelViewSet,
+):
+    queryset = Schedule.objects.select_related(
+        "train", "route__source", "route__destination"
+    ).prefetch_related("exceptions")
+    serializer_class = ScheduleSerializer
+    permission_classes = (IsAdminOrIfAuthenticatedReadOnly,)
+
+
+class DailyStatsViewSet(
+    MultiGetMixin,
+    SparseFieldsetMixin,
+    StreamingListMixin,
+    mixins.ListModelMixin,
+    viewsets.GenericViewSet,
+):
+    permission_classes = (IsAdminUser,)
+    group_param = None
+
+    def _date(self, name):
+        value = self.request.query_params.get(name)
+        if not value:
+            return None
+        try:
+            return datetime.strptime(value, "%Y-%m-%d").date()
+        except ValueError:
+            raise ValidationError({name: "Expected a date as YYYY-MM-DD."})
+
+    def _group_id(self):
+        group_id = self.request.query_params.get(self.group_param)
+        if not group_id:
+            return None
+        try:
+            return int(group_id)
+        except ValueError:
+            raise ValidationError({self.group_param: "Expected an id."})
+
+    def get_queryset(self):
+        start = self._date("from")
+        end = self._date("to")
+        group_id = self._group_id()
+        queryset = self.queryset.all()
+
+        if start:
+            queryset = queryset.filter(date__gte=start)
+
+        if end:
+            queryset = queryset.filter(date__lte=end)
+
+        if group_id is not None:
+            queryset = queryset.filter(**{f"{self.group_param}_id": group_id})
+
+        return queryset
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                "from",
+                type=OpenApiTypes.DATE,
+                description="First departure date (ex. ?from=2024-01-01)",
+            ),
+            OpenApiParameter(
+                "to",
+                type=OpenApiTypes.DATE,
+                description="Last departure date (ex. ?to=2024-12-31)",
+            ),
+        ]
+    )
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+
+class RouteDailyStatsViewSet(DailyStatsViewSet):
+    """Load factor and sales per route per day"""
+
+    queryset = RouteDailyStats.objects.select_related(
+        "route__source", "route__destination"
+    )
+    serializer_class = RouteDailyStatsSerializer
+    group_param = "route"
+
+
+class TrainTypeDailyStatsViewSet(DailyStatsViewSet):
+    """Sales per train type per day"""
+
+    queryset = TrainTypeDailyStats.objects.select_related("train_type")
+    serializer_class = TrainTypeDailyStatsSerializer
+    group_param = "train_type"
+
+
+class BatchView(APIView):
+    """Run several GET requests to station endpoints in one call"""
+
+    permission_classes = (IsAuthenticated,)
+
+    @extend_schema(
+        request=BatchSerializer,
+        responses=BatchResponseSerializer(many=True),
+    )
+    def post(self, request):
+        serializer = BatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        results = run_batch(
+            request,
+            serializer.validated_data["requests"],
+            allowed_namespace="station",
+            excluded_view="batch",
+        )
+        return Response(BatchResponseSerializer(results, many=True).data)
+
+
+class ProfileViewSet(viewsets.ViewSet):
+    """Request profiles recorded by ProfilingMiddleware"""
+
+    permission_classes = (IsAdminUser,)
+    lookup_value_regex = "[0-9a-f]{32}"
+
+    @extend_schema(
+        operation_id="station_profiles_list",
+        responses=OpenApiTypes.OBJECT,
+    )
+    def list(self, request):
+        return Response(list_profiles())
+
+    @extend_schema(responses=OpenApiTypes.OBJECT)
+    def retrieve(self, request, pk=None):
+        profile = load_profile(pk)
+        if profile is None:
+            raise NotFound()
+        return Response(profile)
+
+    @extend_schema(responses={(200, "application/octet-stream"): bytes})
+    @action(detail=True, methods=["GET"])
+    def download(self, request, pk=None):
+        """The cProfile data in pstats format"""
+        path = profile_file(pk, ".prof")
+        if path is None:
+            raise NotFound()
+        return FileResponse(
+            path.open("rb"),
+            as_attachment=True,
+            filename=f"profile-{pk}.prof",
+            content_type="application/octet-stream",
+        )
+
+    @extend_schema(request=None, responses=OpenApiTypes.OBJECT)
+    @action(detail=False, methods=["POST"])
+    def token(self, request):
+        """Header value that gets your requests profiled"""
+        return Response(
+            {
+                "header": HEADER.removeprefix("HTTP_").replace("_", "-"),
+                "token": make_token(request.user),
+                "expires_in": profiling_settings()["TOKEN_MAX_AGE"],
+            },
+            status=status.HTTP_201_CREATED,
+        )
+
+
+def _stream_user(request):
+    """JWT user from the header, or from ``?token=`` for EventSource"""
+    authentication = JWTAuthentication()
+    authenticated = authentication.authenticate(request)
+    token = request.GET.get("token")
+    if authenticated is None and token:
+        validated = authentication.get_validated_token(token)
+        authenticated = authentication.get_user(validated), validated
+    return authenticated
+
+
+async def journey_seats_stream(request, pk):
+    """Server-sent events with the journey's seat map and its changes"""
+    try:
+        authenticated = await sync_to_async(_stream_user)(request)
+    except (AuthenticationFailed, InvalidToken) as error:
+        return JsonResponse(error.detail, status=401)
+
+    if authenticated is None:
+        return JsonResponse(
+            {"detail": "Authentication credentials were not provided."},
+            status=401,
+        )
+
+    if not await Journey.objects.filter(pk=pk).aexists():
+        return JsonResponse({"detail": "Not found."}, status=404)
+
+    response = StreamingHttpResponse(
+        event_stream(pk), content_type="text/event-stream"
+    )
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+    return response
@@ -3,16 +3,55 @@ ASGI config for train_station_api_service project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Async views (the seat streams) run on Django's ASGI handler. Every other
+request goes through the WSGI handler: Django's ASGI handler reads a
+synchronous streaming response into memory before sending it, which would
+undo ``?stream=true`` lists and chunked or ranged media downloads.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.0/howto/deployment/asgi/
 """
 
 import os
 
+from asgiref.sync import ThreadSensitiveContext, iscoroutinefunction
+from asgiref.wsgi import WsgiToAsgi
+from django.conf import settings
+from django.contrib.staticfiles.handlers import ASGIStaticFilesHandler
 from django.core.asgi import get_asgi_application
+from django.core.wsgi import get_wsgi_application
+from django.urls import Resolver404, resolve
 
 os.environ.setdefault(
     "DJANGO_SETTINGS_MODULE", "train_station_api_service.settings"
 )
 
-application = get_asgi_application()
+asgi_application = get_asgi_application()
+wsgi_application = WsgiToAsgi(get_wsgi_application())
+
+
+def is_async_view(scope):
+    path = scope["path"]
+    root_path = scope.get("root_path", "")
+    if root_path and path.startswith(root_path):
+        path = path[len(root_path):]
+    try:
+        view = resolve(path).func
+    except Resolver404:
+        return False
+    return iscoroutinefunction(view)
+
+
+async def application(scope, receive, send):
+    if scope["type"] != "http" or is_async_view(scope):
+        await asgi_application(scope, receive, send)
+        return
+
+    # a thread per request, as Django's ASGI handler gives sync views
+    async with ThreadSensitiveContext():
+        await wsgi_application(scope, receive, send)
+
+
+# runserver serves static files while debugging, uvicorn needs this
+if settings.DEBUG:
+    application = ASGIStaticFilesHandler(application)
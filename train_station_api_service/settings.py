@@ -66,6 +66,8 @@ MIDDLEWARE = [
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    "station.traffic.TrafficCaptureMiddleware",
+    "station.profiling.ProfilingMiddleware",
 ]
 
 ROOT_URLCONF = "train_station_api_service.urls"
@@ -145,6 +147,20 @@ STATIC_URL = "static/"
 MEDIA_URL = "/media/"
 MEDIA_ROOT = "/vol/web/media"
 
+# media URLs carry a content hash, see station.media
+STORAGES = {
+    "default": {"BACKEND": "station.media.MediaStorage"},
+    "staticfiles": {
+        "BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage",
+    },
+}
+
+# "x-sendfile" or "x-accel-redirect" lets the front server send media files
+MEDIA_SERVING = {
+    "SENDFILE": os.environ.get("MEDIA_SENDFILE") or None,
+    "ACCEL_PREFIX": "/protected-media/",
+}
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.0/ref/settings/#default-auto-field
 
@@ -161,6 +177,10 @@ REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": (
         "rest_framework_simplejwt.authentication.JWTAuthentication",
     ),
+    # only paginates when ?page= or ?page_size= is given
+    "DEFAULT_PAGINATION_CLASS": (
+        "station.pagination.EstimatedCountPagination"
+    ),
 }
 
 SPECTACULAR_SETTINGS = {
@@ -176,6 +196,39 @@ SPECTACULAR_SETTINGS = {
     },
 }
 
+OUTBOX_SINKS = [
+    {
+        "BACKEND": "station.outbox.JsonlSink",
+        "OPTIONS": {"path": BASE_DIR / "var" / "outbox.jsonl"},
+    },
+]
+
+IDEMPOTENCY_KEY_TTL = timedelta(hours=24)
+IDEMPOTENCY_WAIT_TIMEOUT = 10
+# an unfinished key older than this is taken over by the next request;
+# keep it above the longest create
+IDEMPOTENCY_CLAIM_LEASE = timedelta(minutes=2)
+
+# sampled request log for manage.py replay_traffic, off while the rate is 0
+TRAFFIC_CAPTURE = {
+    "PATH": BASE_DIR / "var" / "traffic.jsonl",
+    "SAMPLE_RATE": float(os.environ.get("TRAFFIC_SAMPLE_RATE", 0)),
+}
+
+# threads resizing uploaded train images, 0 resizes on commit instead
+IMAGE_VARIANTS = {
+    "WORKERS": int(os.environ.get("IMAGE_WORKERS", 2)),
+}
+
+# completed journeys older than this move to the archive tables
+ARCHIVE_RETENTION_DAYS = 180
+
+# staff profile requests with the X-Profile header, see station.profiling
+PROFILING = {
+    "DIR": BASE_DIR / "var" / "profiles",
+    "SAMPLE_RATE": float(os.environ.get("PROFILE_SAMPLE_RATE", 0)),
+}
+
 SIMPLE_JWT = {
     "ACCESS_TOKEN_LIFETIME": timedelta(minutes=3000),
     "REFRESH_TOKEN_LIFETIME": timedelta(days=7),